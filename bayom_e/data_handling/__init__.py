@@ -2,3 +2,4 @@
 
 from .data_interface import get_dataplate
 from .data_interface import get_loaded_data_handler_no_objective
+from .dataplate_batch import get_dataplates
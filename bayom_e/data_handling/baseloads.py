@@ -0,0 +1,171 @@
+""" Base loading rates (phi), translated to ids once per base loading file and stored partitioned by county
+"""
+
+# Generic/Built-in
+import os
+import json
+import hashlib
+import logging
+import threading
+
+# Computation
+import numpy as np
+import pandas as pd
+
+# BAYOTA
+from bayota_settings.base import get_source_pickles_dir, get_raw_data_dir
+from castjeeves.sqltables import TableCache, PartitionedTable
+from castjeeves.sqltables.TableCache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# The source tables that the base loading rates are translated with
+SOURCE_TABLES = ('TblAgency', 'TblLoadSource', 'TblGeography', 'TblGeographyType',
+                 'TblGeographyLrSeg', 'TblLandRiverSegment')
+# Load rate columns, and the pollutant of each
+RATE_COLUMNS = {'eotn': 'N', 'eotp': 'P', 'eots': 'S'}
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def read_baseloading_file(filepath, TblAgency, TblLoadSource) -> pd.DataFrame:
+    """ Read a base loading file (e.g. '2010NoActionLoads.csv'), and check its agencies and load sources
+
+    Raises:
+        ValueError, if the file has any agencies or load sources that aren't in the source tables (or vice versa)
+    """
+    # Make sure this base loading file has sufficient precision, we had an error caused by precision issues
+    BaseConditionLoadsTbl = pd.read_csv(filepath)
+
+    BaseConditionLoadsTbl.replace({'Agency': {'State Highway Administration': 'MD State Highway Administration',
+                                              'State': 'MD State'}}, inplace=True)
+
+    def compare_sets(a, b, typename) -> str:
+        msg = ''
+        if not (a == b):
+            amb = a - b
+            bma = b - a
+            if amb:
+                msg += f"{typename} {amb} are in the base loading table but not in the source table\n"
+            if bma:
+                msg += f"{typename}s {bma} are in the source table but not in the base loading table\n"
+        return msg
+
+    # Do a simple check of the base load table
+    errormessage = ''
+    errormessage += compare_sets(set(BaseConditionLoadsTbl['Agency']),
+                                 set(TblAgency['agencyfullname']), typename='agency(ies)')
+    errormessage += compare_sets(set(BaseConditionLoadsTbl['LoadSource']),
+                                 set(TblLoadSource['loadsource']), typename='load source(s)')
+    if errormessage:
+        raise ValueError(errormessage)
+
+    return BaseConditionLoadsTbl
+
+
+def base_loading_rates(BaseConditionLoadsTbl, TblGeography, TblGeographyType, TblGeographyLrSeg,
+                       TblLoadSource, TblAgency) -> pd.DataFrame:
+    """ The base loading rates (lb/ac) of every land river segment, load source and agency, keyed by ids
+
+    Unfortunately, the base loading table is from the website so doesn't have id numbers,
+    so the names in the table are translated to id numbers.
+
+    Returns:
+        pd.DataFrame with 'lrsegid', 'loadsourceid', 'agencycode' and load rate ('eotn', 'eotp', 'eots') columns
+    """
+    # Let's make sure the columns are all lowercase
+    loadstbl = BaseConditionLoadsTbl.rename(columns=str.lower)
+
+    # Only the land river segment geographies are kept.
+    gtypeid = TblGeographyType[TblGeographyType['geographytypefullname'] ==
+                               'Land River Segment indicating if in or out of CBWS'].geographytypeid.tolist()[0]
+    lrsegfullnames = TblGeography[TblGeography['geographytypeid'] == gtypeid].geographyfullname
+    loadstbl = loadstbl[loadstbl['geography'].isin(lrsegfullnames)]
+
+    # The load source table 'geographyfullname' column is translated to geographyid.
+    includecols = ['geography', 'loadsource', 'agency', 'sector',
+                   '2010 no action_amount',
+                   '2010 no action_nloadeot', '2010 no action_ploadeot',
+                   '2010 no action_sloadeot']
+    loadstbl = loadstbl.loc[:, includecols].merge(TblGeography, how='inner',
+                                                  left_on='geography',
+                                                  right_on='geographyfullname')
+    loadstbl.drop(columns=['geographyname', 'geographyfullname',
+                           'geography', 'geographytypeid'], inplace=True)
+
+    # If division by zero occurs, those values are set to zero.
+    for ratecol, loadcol in (('eotn', '2010 no action_nloadeot'),
+                             ('eotp', '2010 no action_ploadeot'),
+                             ('eots', '2010 no action_sloadeot')):
+        loadstbl[ratecol] = (loadstbl[loadcol] / loadstbl['2010 no action_amount']).fillna(0)
+        loadstbl[ratecol] = loadstbl[ratecol].replace([np.inf, -np.inf], 0)
+    loadstbl.drop(columns=['2010 no action_nloadeot', '2010 no action_ploadeot',
+                           '2010 no action_sloadeot'], inplace=True)
+
+    # The load source table 'geographyid' column is translated to 'lrsegid' and is then removed.
+    includecols = ['geographyid', 'lrsegid']
+    loadstbl = TblGeographyLrSeg.loc[:, includecols].merge(loadstbl, how='inner', on='geographyid')
+    loadstbl.drop(columns=['geographyid'], inplace=True)
+
+    # The load source table 'loadsource' column is translated to 'loadsourceid' and is then removed.
+    includecols = ['loadsourceid', 'loadsource']
+    loadstbl = TblLoadSource.loc[:, includecols].merge(loadstbl, how='inner', on='loadsource')
+    loadstbl.drop(columns=['loadsource'], inplace=True)
+
+    # The load source table 'agency' column is translated to 'agencycode' and is then removed.
+    loadstbl.rename(columns={"agency": "agencyfullname"}, inplace=True)
+    includecols = ['agencycode', 'agencyfullname']
+    loadstbl = TblAgency.loc[:, includecols].merge(loadstbl, how='inner', on='agencyfullname')
+    loadstbl.drop(columns=['agencyfullname'], inplace=True)
+
+    return loadstbl.loc[:, ['lrsegid', 'loadsourceid', 'agencycode'] + list(RATE_COLUMNS)].reset_index(drop=True)
+
+
+def base_loading_table_name(filepath, sourcefingerprint) -> str:
+    """ The name of the stored rates of a base loading file, which changes whenever the file or source tables do """
+    fileinfo = file_fingerprint(filepath, with_hash=False)
+    sha = hashlib.sha256(json.dumps([os.path.basename(filepath), fileinfo, sourcefingerprint]).encode())
+    return 'BaseLoads_%s_%s' % (os.path.splitext(os.path.basename(filepath))[0].replace(' ', '_'),
+                                sha.hexdigest()[:12])
+
+
+def base_loading_table(baseloadingfilename, TblAgency, TblLoadSource, TblGeography, TblGeographyType,
+                       TblGeographyLrSeg, TblLandRiverSegment, rawdatadir=None, partitionsdir=None,
+                       sourcefingerprint=None) -> PartitionedTable:
+    """ The base loading rates of a base loading file, as a PartitionedTable (generated the first time it's needed)
+
+    The base loading file is only read, checked and translated to ids when its rates haven't been stored yet
+    (or the file or the source tables have changed since), and the rates for any geography are then a read
+    of only that geography's partitions.
+
+    Args:
+        baseloadingfilename (str): name of the base loading file in the raw data directory
+        TblAgency, TblLoadSource, TblGeography, TblGeographyType, TblGeographyLrSeg, TblLandRiverSegment:
+            source tables used for translating names to ids (TblLoadSource's 'loadsource' names are stripped)
+        rawdatadir (str): Defaults to the raw data directory from the bayota settings.
+        partitionsdir (str): Defaults to the 'Partitioned' directory next to the cached source tables.
+        sourcefingerprint (str): Defaults to the fingerprint of the cached source tables that are used.
+    """
+    if rawdatadir is None:
+        rawdatadir = get_raw_data_dir()
+    if partitionsdir is None:
+        partitionsdir = os.path.join(get_source_pickles_dir(), 'Partitioned')
+    if sourcefingerprint is None:
+        sourcefingerprint = TableCache(os.path.join(get_source_pickles_dir(), 'SourceData')).fingerprint(
+            list(SOURCE_TABLES))
+    filepath = os.path.join(rawdatadir, baseloadingfilename)
+    partdir = os.path.join(partitionsdir, base_loading_table_name(filepath, sourcefingerprint))
+
+    with _tables_lock:
+        if partdir not in _tables:
+            partitioned = PartitionedTable(partdir)
+            if not partitioned.is_populated():
+                logger.info('<base loading rates of %s are not stored yet. Generating...>' % baseloadingfilename)
+                BaseConditionLoadsTbl = read_baseloading_file(filepath, TblAgency, TblLoadSource)
+                os.makedirs(partitionsdir, exist_ok=True)
+                partitioned.populate(base_loading_rates(BaseConditionLoadsTbl, TblGeography, TblGeographyType,
+                                                        TblGeographyLrSeg, TblLoadSource, TblAgency),
+                                     TblLandRiverSegment)
+            _tables[partdir] = partitioned
+        return _tables[partdir]
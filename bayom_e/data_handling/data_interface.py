@@ -2,7 +2,9 @@
 """
 
 # Generic/Built-in
+import os
 import string
+import logging
 
 # BAYOTA data handling
 from .randomizer import random_list_of_names, make_random_bmp_groupings, \
@@ -10,6 +12,13 @@ from .randomizer import random_list_of_names, make_random_bmp_groupings, \
 from .datahandler_base import DataHandlerBase
 from .dataloader_geography_mixins import DataCountyGeoentitiesMixin, DataLrsegGeoentitiesMixin
 from .dataplate import NLP_DataPlate
+from .dataplate_arrays import ArrayDataPlate
+from .dataplate_cache import DataplateCache, CACHE_ENV_VARIABLE
+
+logger = logging.getLogger(__name__)
+
+# Types of dataplate that get_dataplate() can build
+DATAPLATE_NAMES = ('nlp', 'nlp_arrays')
 
 
 def get_random_dataplate(name='nlp', num_lrsegs=1,
@@ -84,42 +93,56 @@ def get_random_dataplate(name='nlp', num_lrsegs=1,
 
 
 def get_dataplate(geoscale, geoentities, baseloadingfilename, name='nlp',
-                  savedata2file=False) -> NLP_DataPlate:
+                  savedata2file=False, cache=None) -> NLP_DataPlate:
     """ Create a dataplate object for a given geography.
 
     Args:
         geoscale:
         geoentities:
         baseloadingfilename:
-        name:
+        name: 'nlp' (an NLP_DataPlate), or 'nlp_arrays' (the same data as an array-backed ArrayDataPlate)
         savedata2file:
+        cache (bool or DataplateCache): If set, a dataplate that was already built from the same geography and
+            inputs is read from the on-disk cache instead of being rebuilt (and a newly built one is added to it).
+            Not used when savedata2file is True, since the data files are written while building.
+            Defaults to the value of the BAYOTA_DATAPLATE_CACHE environment variable (or False if unset).
 
     Returns:
 
+    Raises:
+        ValueError: for an unexpected name
     """
+    if name not in DATAPLATE_NAMES:
+        raise ValueError(f"unexpected dataplate name <{name}>; expected one of {DATAPLATE_NAMES}")
+    if cache is None:
+        cache = os.environ.get(CACHE_ENV_VARIABLE, '').lower() in ('1', 'true', 'yes')
+    if cache and (not savedata2file):
+        if not isinstance(cache, DataplateCache):
+            cache = DataplateCache()
+        key = cache.key(geoscale, geoentities, baseloadingfilename, name=name)
+        dataplate = cache.get(key)
+        if dataplate is None:
+            dataplate = get_dataplate(geoscale, geoentities, baseloadingfilename, name=name, cache=False)
+            cache.put(key, dataplate)
+        else:
+            logger.info('<dataplate for %s %s read from %s>' % (geoscale, geoentities, cache))
+        return dataplate
+
     dh = get_loaded_data_handler_no_objective(geoscale, geoentities,
                                               savedata2file=savedata2file, baseloadingfilename=baseloadingfilename)
 
     if name == 'nlp':
-        return NLP_DataPlate(PLTNTS=dh.PLTNTS,
-                             LRSEGS=dh.LRSEGS,
-                             LOADSRCS=dh.LOADSRCS,
-                             AGENCIES=dh.AGENCIES,
-                             PARCELS=dh.PARCELS,
-                             BMPS=dh.BMPS,
-                             BMPGRPS=dh.BMPGRPS,
-                             BMPGRPING=dh.BMPGRPING,
-                             BMPSRCLINKS=dh.BMPSRCLINKS,
-                             BMPGRPSRCLINKS=dh.BMPGRPSRCLINKS,
-                             theta=dh.Theta,
-                             alpha=dh.alpha,
-                             phi=dh.phi,
-                             tau=dh.tau,
-                             eta=dh.eta)
+        dataplate = NLP_DataPlate.from_datahandler(dh)
+    else:
+        dataplate = ArrayDataPlate.from_datahandler(dh)
+
+    # (any instance data files being written in the background are complete before the dataplate is used)
+    dh.wait_for_instance_data()
+    return dataplate
 
 
 def get_loaded_data_handler_no_objective(geoscale, geoentities,
-                                         savedata2file=False, baseloadingfilename=''):
+                                         savedata2file=False, baseloadingfilename='', jeeves=None):
     """ Create a DataHandler object for a given geography.
 
     Args:
@@ -127,14 +150,17 @@ def get_loaded_data_handler_no_objective(geoscale, geoentities,
         geoentities:
         savedata2file:
         baseloadingfilename:
+        jeeves (Jeeves): Source data to use. Defaults to a new (lazy, read-only) Jeeves.
 
     Returns:
 
     """
     if geoscale == 'lrseg':
-        datahandler = DataHandlerLrseg(save2file=savedata2file, geolist=geoentities, baseloadingfilename=baseloadingfilename)
+        datahandler = DataHandlerLrseg(save2file=savedata2file, geolist=geoentities,
+                                       baseloadingfilename=baseloadingfilename, jeeves=jeeves)
     elif geoscale == 'county':
-        datahandler = DataHandlerCounty(save2file=savedata2file, geolist=geoentities, baseloadingfilename=baseloadingfilename)
+        datahandler = DataHandlerCounty(save2file=savedata2file, geolist=geoentities,
+                                        baseloadingfilename=baseloadingfilename, jeeves=jeeves)
     else:
         raise ValueError('<%s> is an unrecognized "geoscale".' % geoscale)
 
@@ -142,8 +168,9 @@ def get_loaded_data_handler_no_objective(geoscale, geoentities,
 
 
 class DataHandlerLrseg(DataLrsegGeoentitiesMixin, DataHandlerBase):
-    def __init__(self, save2file=True, geolist=None, baseloadingfilename=''):
-        DataHandlerBase.__init__(self, save2file=save2file, geolist=geolist, baseloadingfilename=baseloadingfilename)
+    def __init__(self, save2file=True, geolist=None, baseloadingfilename='', jeeves=None):
+        DataHandlerBase.__init__(self, save2file=save2file, geolist=geolist, baseloadingfilename=baseloadingfilename,
+                                 jeeves=jeeves)
 
     def __repr__(self):
         obj_attributes = sorted([k for k in self.__dict__.keys()
@@ -161,14 +188,15 @@ class DataHandlerLrseg(DataLrsegGeoentitiesMixin, DataHandlerBase):
 
 
 class DataHandlerCounty(DataCountyGeoentitiesMixin, DataHandlerBase):
-    def __init__(self, save2file=True, geolist=None, baseloadingfilename=''):
+    def __init__(self, save2file=True, geolist=None, baseloadingfilename='', jeeves=None):
 
         self.countysetlist = []
         self.countysetidlist = []
         self.COUNTIES = []
         self.CNTYLRSEGLINKS = []
 
-        DataHandlerBase.__init__(self, save2file=save2file, geolist=geolist, baseloadingfilename=baseloadingfilename)
+        DataHandlerBase.__init__(self, save2file=save2file, geolist=geolist, baseloadingfilename=baseloadingfilename,
+                                 jeeves=jeeves)
 
     def __repr__(self):
         obj_attributes = sorted([k for k in self.__dict__.keys()
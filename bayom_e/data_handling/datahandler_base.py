@@ -2,19 +2,39 @@
 
 # Generic/Built-in
 import os
+import time
 import logging
 
 # Computation
-import numpy as np
 import pandas as pd
 
 # BAYOTA
 from bayota_settings.base import get_model_instances_dir, get_raw_data_dir
 from .bmp_exclusions import excluded_bmps_list
+from .instance_data import InstanceDataWriter
+from .baseloads import base_loading_table
 from castjeeves.jeeves import Jeeves
 
 logger = logging.getLogger(__name__)
 
+COSTPROFILEID = 4  # cost profile used for the bmp costs (tau)
+
+
+def first_value_per_key(df, keys, valuecol) -> dict:
+    """ The first value of 'valuecol' for each distinct combination of the 'keys' columns
+
+    Gives the same dictionary as df.groupby(keys)[valuecol].apply(lambda x: list(x)[0]).to_dict(),
+    i.e. {key: value} for a single key column and {(key1, key2, ...): value} otherwise, sorted by key,
+    and without rows that have a missing key; but without calling a Python function for every group.
+    """
+    keys = list(keys)
+    subset = df.loc[:, keys + [valuecol]].dropna(subset=keys)
+    subset = subset.drop_duplicates(subset=keys, keep='first').sort_values(keys, kind='mergesort')
+    values = subset[valuecol].tolist()
+    if len(keys) == 1:
+        return dict(zip(subset[keys[0]].tolist(), values))
+    return dict(zip(zip(*[subset[k].tolist() for k in keys]), values))
+
 
 class DataHandlerBase:
     """Base Class for data loader classes - provides formatted/parsed/wrangled data for efficiency BMP models
@@ -42,6 +62,7 @@ class DataHandlerBase:
         bmpsetidlist (list):
         loadsrcsetidlist (list):
         costsubtbl (pd.DataFrame):
+        stage_timings (dict): seconds taken by each loading stage (excluding the stages it used), in order
 
     Args:
         save2file (bool): Defaults to True.
@@ -49,59 +70,78 @@ class DataHandlerBase:
         baseloadingfilename (str):
         landchangemodelscenario (str):
         baseyear (int or str):
+        saveformat (str): 'tab' (a file for each set and parameter) or 'bundle' (one compressed archive),
+            used if save2file is True. Defaults to the BAYOTA_INSTANCE_DATA_FORMAT environment variable, or 'tab'.
+        savebackground (bool): If True, the files are written on a background thread (see InstanceDataWriter),
+            and wait_for_instance_data() has to be called to know that they are complete.
 
     """
     def __init__(self, save2file=True, geolist=None, baseloadingfilename='',
                  landchangemodelscenario='Historic Trends', baseyear='2010',
-                 ImpBmpScenarioId=None):
+                 ImpBmpScenarioId=None, jeeves=None, saveformat=None, savebackground=None):
         self._geolist = geolist
 
         logger.debug(locals())
-        jeeves = Jeeves()
+        if jeeves is None:
+            # The largest tables are read only for this geography (see below), and all source tables are read-only,
+            # so that they're used here without copies.
+            jeeves = Jeeves(lazy=True, read_only=True)
+        self._jeeves = jeeves
+
+        # Intermediate results of the loading stages (see _stage()), each computed only once
+        self._stages = {}
+        self._stage_nested = []
+        self.stage_timings = {}
 
         # Save instance data to file?
         self.save2file = save2file
         self.instdatadir = get_model_instances_dir()
+        self.instance_data_writer = InstanceDataWriter(self.instdatadir, fileformat=saveformat,
+                                                       background=savebackground) if save2file else None
 
         """ Instance Specifiers """
         self._landchangemodelscenario = landchangemodelscenario  # typically 'Historic Trends' or "Current Zoning"
         self._baseyear = baseyear
         self._baseconditionid = jeeves.scenario.get_baseconditionid(landchangemodelscenario=self._landchangemodelscenario,
                                                                     baseyear=self._baseyear)
-        self._costprofileid = 4
+        self._costprofileid = COSTPROFILEID
 
         # **********************************************************************
         # Load Source Data tables into memory
         # **********************************************************************
 
         """ Data tables for the set definitions """
-        TblBmp = jeeves.source.TblBmp.copy()
-        TblBmpGroup = jeeves.source.TblBmpGroup.copy()
-        TblBmpLoadSourceGroup = jeeves.source.TblBmpLoadSourceGroup.copy()
-        TblBmpType = jeeves.source.TblBmpLoadSourceGroup.copy()
+        TblBmp = jeeves.source.TblBmp
+        TblBmpGroup = jeeves.source.TblBmpGroup
+        TblBmpLoadSourceGroup = jeeves.source.TblBmpLoadSourceGroup
+        TblBmpType = jeeves.source.TblBmpLoadSourceGroup
 
+        # (the only table modified here, so it's the only one that's copied; it's small)
         TblLoadSource = jeeves.source.TblLoadSource.copy()
         TblLoadSource['loadsource'] = TblLoadSource[
             'loadsource'].str.strip()  # There is an extra space after "Specialty Crop Low" that needs to be removed.
 
-        TblLandRiverSegment = jeeves.source.TblLandRiverSegment.copy()
+        TblLandRiverSegment = jeeves.source.TblLandRiverSegment
 
-        TblGeography = jeeves.source.TblGeography.copy()
-        TblGeographyLrSeg = jeeves.source.TblGeographyLrSeg.copy()
-        TblGeographyType = jeeves.source.TblGeographyType.copy()
+        TblGeography = jeeves.source.TblGeography
+        TblGeographyLrSeg = jeeves.source.TblGeographyLrSeg
+        TblGeographyType = jeeves.source.TblGeographyType
 
         """ Data tables for the parameter definitions """
-        TblAgency = jeeves.source.TblAgency.copy()
-        TblBmpEfficiency = jeeves.source.TblBmpEfficiency.copy()
+        TblAgency = jeeves.source.TblAgency
+        # (TblBmpEfficiency and TblLandUsePreBmp are read once the land river segments are known)
         # Target load reductions ???  (set this ourselves??)
-        TblLandUsePreBmp = jeeves.source.TblLandUsePreBmp.copy()
-        TblCostBmpLand = jeeves.metadata_tables.TblCostBmpLand.copy()
+        TblCostBmpLand = jeeves.metadata_tables.TblCostBmpLand
 
         # **********************************************************************
         # Load auxiliary data into memory
         # **********************************************************************
 
-        BaseConditionLoadsTbl = self._load_the_baseloading_data(baseloadingfilename, TblAgency, TblLoadSource)
+        # The base loading rates are translated to ids (and stored by county) only once for each base loading file.
+        baseloadstbl = self._stage('base loading table',
+                                   lambda: base_loading_table(baseloadingfilename, TblAgency, TblLoadSource,
+                                                              TblGeography, TblGeographyType, TblGeographyLrSeg,
+                                                              TblLandRiverSegment))
 
         # Data table generated by separate python script, the set of load source *groups* where each load source *group* contains one and only one load source
         singlelsgrpdf = pd.read_csv(os.path.join(get_raw_data_dir(), 'single-ls_groups.csv'))
@@ -130,6 +170,11 @@ class DataHandlerBase:
         # self.totalcostupperbound = pd.DataFrame()
         self.alpha = pd.DataFrame()
 
+        # The tables that the geography-dependent sets and parameters are taken from, each with 'lrsegid'
+        # (and, where relevant, 'loadsourceid') columns, kept so they can be split by geography (see dataplate_batch)
+        self._joined_tables = {'singlelsgroups': singlelsgrpdf,
+                               'agencycodes': TblAgency.loc[:, ['agencyid', 'agencycode']]}
+
         # lists that will be populated by loading the Set data
         self.lrsegsetlist = []
         self.lrsegsetidlist = []
@@ -142,36 +187,54 @@ class DataHandlerBase:
         # Populate the Sets and Parameters with appropriate data
         # **********************************************************************
 
+        # The loading is a series of stages, each run (and timed) once; stages that are used by more than one
+        # set or parameter (e.g. the filtered land use, and the named parcels) are shared between them:
+        #   land use (of the geography) -> named parcels -> PARCELS, alpha
+        #                               -> LOADSRCS, AGENCIES
+        #   efficiencies (of the geography) -> BMPSRCLINKS, eta
+
         # Populate the data - SETS
-        self._load_set_pollutants()
+        self._stage('PLTNTS', self._load_set_pollutants)
+
+        self._stage('LRSEGS', lambda: self._load_set_geographies(jeeves, geolist=self._geolist))
 
-        self._load_set_geographies(jeeves, geolist=self._geolist)
+        # Only the partitions of these (large) tables for the geography's land river segments are read.
+        TblBmpEfficiency = self._stage('TblBmpEfficiency', lambda: jeeves.source_table_for_lrsegs(
+            'TblBmpEfficiency', self.lrsegsetidlist))
+        TblLandUsePreBmp = self._stage('TblLandUsePreBmp', lambda: jeeves.source_table_for_lrsegs(
+            'TblLandUsePreBmp', self.lrsegsetidlist))
 
-        self._load_set_BMPs(jeeves, TblBmpLoadSourceGroup, TblBmpGroup)
+        self._stage('BMPS', lambda: self._load_set_BMPs(jeeves, TblBmpLoadSourceGroup, TblBmpGroup))
 
-        df_parcels = self._load_set_Parcels(TblLandUsePreBmp, TblLandRiverSegment,
-                                            TblLoadSource, TblAgency, self._baseconditionid)
+        self._stage('PARCELS', lambda: self._load_set_Parcels(TblLandUsePreBmp, TblLandRiverSegment,
+                                                              TblLoadSource, TblAgency, self._baseconditionid))
 
-        self._load_set_LoadSources(TblLandUsePreBmp, singlelsgrpdf, self._baseconditionid)
-        self._load_set_Agencies(TblLandUsePreBmp, TblAgency, self._baseconditionid)
-        self._load_set_BmpLoadSourceAssociations(TblBmp, TblBmpEfficiency, TblBmpGroup,
-                                                 TblBmpLoadSourceGroup, TblLoadSource, singlelsgrpdf)
+        self._stage('LOADSRCS', lambda: self._load_set_LoadSources(TblLandUsePreBmp, singlelsgrpdf,
+                                                                   self._baseconditionid))
+        self._stage('AGENCIES', lambda: self._load_set_Agencies(TblLandUsePreBmp, TblAgency, self._baseconditionid))
+        self._stage('BMPSRCLINKS', lambda: self._load_set_BmpLoadSourceAssociations(
+            TblBmp, TblBmpEfficiency, TblBmpGroup, TblBmpLoadSourceGroup, TblLoadSource, singlelsgrpdf))
 
         self.costsubtbl = pd.DataFrame()
 
         # Populate the data - PARAMETERS
-        self._load_param_CostPerAcreOfBmps(TblBmp, TblCostBmpLand, self._costprofileid)
-        self._load_param_EffectivenessOfBmps(TblBmp, TblBmpEfficiency, TblLandRiverSegment, TblLoadSource)
+        self._stage('tau', lambda: self._load_param_CostPerAcreOfBmps(TblBmp, TblCostBmpLand, self._costprofileid))
+        self._stage('eta', lambda: self._load_param_EffectivenessOfBmps(TblBmp, TblBmpEfficiency,
+                                                                        TblLandRiverSegment, TblLoadSource))
 
-        self._load_constraint()
+        self._stage('constraint', self._load_constraint)
 
-        self._load_param_PhiBaseLoadingRates(TblLandRiverSegment, TblGeography, TblGeographyType,
-                                             TblGeographyLrSeg, TblLoadSource, BaseConditionLoadsTbl,
-                                             TblAgency)
-        self._load_param_TotalAcresAvailableForLoadSources(TblLandRiverSegment, TblLoadSource,
-                                                           TblLandUsePreBmp, TblAgency, self._baseconditionid)
+        self._stage('phi', lambda: self._load_param_PhiBaseLoadingRates(TblLandRiverSegment, TblLoadSource,
+                                                                        baseloadstbl))
+        self._stage('alpha', lambda: self._load_param_TotalAcresAvailableForLoadSources(
+            TblLandRiverSegment, TblLoadSource, TblLandUsePreBmp, TblAgency, self._baseconditionid))
+
+        if self.save2file:
+            self.instance_data_writer.close()
 
         logger.info('LRsegs loaded: %s' % self.lrsegsetlist)
+        logger.info('loading stage timings (s): %s' % ', '.join('%s=%.3f' % (k, v)
+                                                               for k, v in self.stage_timings.items()))
 
     def __repr__(self):
         obj_attributes = sorted([k for k in self.__dict__.keys()
@@ -188,39 +251,69 @@ class DataHandlerBase:
 
         return strrep
 
-    def _load_the_baseloading_data(self, baseloadingfilename, TblAgency, TblLoadSource):
-        """ Load baseloading data from a file
+    def wait_for_instance_data(self):
+        """ Block until the instance data files have all been written, if save2file is True
 
-        'baseloadingfilename' e.g. could be '2010NoActionLoads.csv'
+        With savebackground, the files may still be being written when the DataHandler has been created.
 
+        Raises:
+            any error from writing the files
         """
-        # Make sure this base loading file has sufficient precision, we had an error caused by precision issues
-        BaseConditionLoadsTbl = pd.read_csv(os.path.join(get_raw_data_dir(), baseloadingfilename))
-
-        BaseConditionLoadsTbl.replace({'Agency': {'State Highway Administration': 'MD State Highway Administration',
-                                                  'State': 'MD State'}}, inplace=True)
-
-        def compare_sets(a, b, typename) -> str:
-            msg = ''
-            if not (a == b):
-                amb = a - b
-                bma = b - a
-                if amb:
-                    msg += f"{typename} {amb} are in the base loading table but not in the source table\n"
-                if bma:
-                    msg += f"{typename}s {bma} are in the source table but not in the base loading table\n"
-            return msg
-
-        # Do a simple check of the base load table
-        errormessage = ''
-        errormessage += compare_sets(set(BaseConditionLoadsTbl['Agency']),
-                                    set(TblAgency['agencyfullname']), typename='agency(ies)')
-        errormessage += compare_sets(set(BaseConditionLoadsTbl['LoadSource']),
-                                    set(TblLoadSource['loadsource']), typename='load source(s)')
-        if errormessage:
-            raise ValueError(errormessage)
-
-        return BaseConditionLoadsTbl
+        if self.save2file:
+            self.instance_data_writer.wait()
+
+    def _save_instance_data(self, name, df, header=None, temporary=False):
+        """ Save a table of instance data (see InstanceDataWriter.add()), if save2file is True """
+        if self.save2file:
+            self.instance_data_writer.add(name, df, header=header, temporary=temporary)
+
+    def _stage(self, name, build):
+        """ The result of a loading stage, built (and timed) the first time it's needed, and reused after that
+
+        The time recorded in stage_timings for a stage doesn't include the time of any stages that it uses,
+        so that the slow stage for a geography can be seen directly.
+        """
+        if name not in self._stages:
+            self._stage_nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                self._stages[name] = build()
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = self._stage_nested.pop()
+            self.stage_timings[name] = elapsed - nested
+            if self._stage_nested:
+                self._stage_nested[-1] += elapsed
+            logger.debug('<loading stage %s took %.3f s>' % (name, elapsed - nested))
+        return self._stages[name]
+
+    def _landuse(self, TblLandUsePreBmp, baseconditionid) -> pd.DataFrame:
+        """ (stage) the land use of the land river segments, for the base condition """
+        def build():
+            landusedf = TblLandUsePreBmp[(TblLandUsePreBmp['baseconditionid'] == baseconditionid) &
+                                         (TblLandUsePreBmp['lrsegid'].isin(self.lrsegsetidlist))]
+            landusedf = landusedf.drop(columns=['baseconditionid'])
+            self._joined_tables['landuse'] = landusedf
+            return landusedf
+        return self._stage('land use', build)
+
+    def _named_parcels(self, TblLandUsePreBmp, TblLandRiverSegment, TblLoadSource,
+                       TblAgency, baseconditionid) -> pd.DataFrame:
+        """ (stage) the land use, with land river segment names, loadsource names, and agency codes """
+        def build():
+            df = self._landuse(TblLandUsePreBmp, baseconditionid)
+
+            # Land river segment names, loadsource names, and agency codes are added to the table.
+            df = TblLandRiverSegment.loc[:, ['lrsegid', 'landriversegment']].merge(df, how='inner')
+            df = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(df, how='inner')
+            df = TblAgency.loc[:, ['agencyid', 'agencycode']].merge(df, how='inner')
+            return df
+        return self._stage('named parcels', build)
+
+    def _efficiencies(self, TblBmpEfficiency) -> pd.DataFrame:
+        """ (stage) the BMP efficiencies in the land river segments """
+        return self._stage('efficiencies', lambda: TblBmpEfficiency[
+            TblBmpEfficiency['lrsegid'].isin(self.lrsegsetidlist)])
 
     def _load_constraint(self):
         """ overridden in the Mixins """
@@ -230,8 +323,7 @@ class DataHandlerBase:
         """ Pollutants """
         self.pltntslist = ['N', 'P', 'S']
         self.PLTNTS = self.pltntslist
-        if self.save2file:
-            pd.DataFrame(self.pltntslist, columns=['PLTNTS']).to_csv(os.path.join(self.instdatadir, 'data_PLTNTS.tab'), sep=' ', index=False)
+        self._save_instance_data('data_PLTNTS', pd.DataFrame(self.pltntslist, columns=['PLTNTS']))
 
     def _load_set_geographies(self, jeeves, geolist=None):
         """ overridden in the Mixins """
@@ -257,8 +349,7 @@ class DataHandlerBase:
             raise ValueError('No LRSEGS found matching the input list')
 
         self.LRSEGS = lrsegs_list
-        if self.save2file:
-            pd.DataFrame(lrsegs_list, columns=['LRSEGS']).to_csv(os.path.join(self.instdatadir, 'data_LRSEGS.tab'), sep=' ', index=False)
+        self._save_instance_data('data_LRSEGS', pd.DataFrame(lrsegs_list, columns=['LRSEGS']))
 
     def _load_set_BMPs(self, jeeves, TblBmpLoadSourceGroup, TblBmpGroup):
         """ BMPs """
@@ -279,17 +370,13 @@ class DataHandlerBase:
         self.bmpsetlist = bmp_list.copy()
         self.bmpsetidlist = bmpsdf['bmpid'].tolist()
         self.BMPS = bmp_list
-        if self.save2file:
-            pd.DataFrame(self.bmpsetlist, columns=['BMPS']).to_csv(os.path.join(self.instdatadir, 'data_BMPS.tab'),
-                                                                   sep=' ', index=False)
+        self._save_instance_data('data_BMPS', pd.DataFrame(self.bmpsetlist, columns=['BMPS']))
 
         # BMP group names (and group ids) are retrieved for Bmps in the set.
         bmpgrpsdf = TblBmpGroup.loc[:, ['bmpgroupid', 'bmpgroupname']].merge(bmpsdf[['bmpgroupid', 'bmpshortname']])
         bmpgrpsetlist = list([int(x) for x in set(bmpgrpsdf.bmpgroupid)])
         self.BMPGRPS = bmpgrpsetlist
-        if self.save2file:
-            pd.DataFrame(bmpgrpsetlist, columns=['BMPGRPS']).to_csv(os.path.join(self.instdatadir, 'data_BMPGRPS.tab'),
-                                                                    sep=' ', index=False)
+        self._save_instance_data('data_BMPGRPS', pd.DataFrame(bmpgrpsetlist, columns=['BMPGRPS']))
 
         # Get correspondences between bmp names and group names (and group ids)
         # first, as dataframe column
@@ -298,12 +385,8 @@ class DataHandlerBase:
         grouped = bmpgrpsdf.groupby(['bmpgroupid'])
         bmpgrping_dict = grouped['bmpshortname'].apply(lambda x: list(x)).to_dict()
         self.BMPGRPING = bmpgrping_dict
-        if self.save2file:
-            BMPGRPING_df_asseparatecolumns = bmpgrpsdf.loc[:, ['bmpshortname', 'bmpgroupid']].rename(
-                columns={'bmpshortname': 'BMPS',
-                         'bmpgroupid': 'BMPGRPS'})
-            BMPGRPING_df_asseparatecolumns.to_csv(os.path.join(self.instdatadir, 'data_BMPGRPING.tab'),
-                                                  sep=' ', index=False, header=['BMPS', 'BMPGRPS'])
+        self._save_instance_data('data_BMPGRPING', bmpgrpsdf.loc[:, ['bmpshortname', 'bmpgroupid']],
+                                 header=['BMPS', 'BMPGRPS'])
 
     def _load_set_LoadSources(self, TblLandUsePreBmp, singlelsgrpdf, baseconditionid):
         """ Load Sources """
@@ -311,22 +394,18 @@ class DataHandlerBase:
         #  - that have base loading rates defined in the No Action data,
         #  - that have an acreage defined in TblLandUsePreBmp
         #  - "loadsource groups" that represent only a single load source
-        landusedf = TblLandUsePreBmp[(TblLandUsePreBmp['baseconditionid'] == baseconditionid) &
-                                     (TblLandUsePreBmp['lrsegid'].isin(self.lrsegsetidlist))].copy()
+        landusedf = self._landuse(TblLandUsePreBmp, baseconditionid)
         landusedf = singlelsgrpdf[singlelsgrpdf['loadsourceid'].isin(landusedf['loadsourceid'])]
         loadsrc_list = landusedf['loadsourceshortname'].tolist()
 
         # The load sources list is retrieved.
         self.loadsrcsetidlist = landusedf['loadsourceid'].tolist()
         self.LOADSRCS = loadsrc_list.copy()
-        if self.save2file:
-            pd.DataFrame(loadsrc_list, columns=['LOADSRCS']).to_csv(os.path.join(self.instdatadir, 'data_LOADSRCS.tab'),
-                                                                    sep=' ', index=False)
+        self._save_instance_data('data_LOADSRCS', pd.DataFrame(loadsrc_list, columns=['LOADSRCS']))
 
     def _load_set_Agencies(self, TblLandUsePreBmp, TblAgency, baseconditionid):
         """ Agencies """
-        landusedf = TblLandUsePreBmp[(TblLandUsePreBmp['baseconditionid'] == baseconditionid) &
-                                     (TblLandUsePreBmp['lrsegid'].isin(self.lrsegsetidlist))].copy()
+        landusedf = self._landuse(TblLandUsePreBmp, baseconditionid)
 
         # Agency codes are added to the table.
         landusedf = TblAgency.loc[:, ['agencyid', 'agencycode']].merge(landusedf, how='inner')
@@ -334,9 +413,7 @@ class DataHandlerBase:
         # The agencies list is retrieved.
         agencies_set = set(landusedf['agencycode'].tolist())
         self.AGENCIES = agencies_set
-        if self.save2file:
-            pd.DataFrame(agencies_set, columns=['AGENCIES']).to_csv(os.path.join(self.instdatadir, 'data_AGENCIES.tab'),
-                                                                    sep=' ', index=False)
+        self._save_instance_data('data_AGENCIES', pd.DataFrame(list(agencies_set), columns=['AGENCIES']))
 
     def _load_set_Parcels(self, TblLandUsePreBmp, TblLandRiverSegment, TblLoadSource,
                           TblAgency, baseconditionid):
@@ -346,25 +423,18 @@ class DataHandlerBase:
         in the specified geography
 
         """
-        df_parcels = TblLandUsePreBmp[(TblLandUsePreBmp['baseconditionid'] == baseconditionid) &
-                                     (TblLandUsePreBmp['lrsegid'].isin(self.lrsegsetidlist))].copy()
-        df_parcels.drop(columns=['baseconditionid'], inplace=True)
-
-        # Land river segment names, loadsource names, and agency codes are added to the table.
-        df_parcels = TblLandRiverSegment.loc[:, ['lrsegid', 'landriversegment']].merge(df_parcels, how='inner')
-        df_parcels = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(df_parcels, how='inner')
-        df_parcels = TblAgency.loc[:, ['agencyid', 'agencycode']].merge(df_parcels, how='inner')
+        df_parcels = self._named_parcels(TblLandUsePreBmp, TblLandRiverSegment, TblLoadSource,
+                                         TblAgency, baseconditionid)
 
+        self._joined_tables['parcels'] = df_parcels
         # Groupby groups are converted to a dictionary ( with tuple->value structure ).
         self.PARCELS = list(zip(df_parcels['landriversegment'],
                                 df_parcels['loadsourceshortname'],
                                 df_parcels['agencycode']))
-        if self.save2file:
-            df_parcels.loc[:, ['landriversegment',
-                               'loadsourceshortname',
-                               'agencycode']].to_csv(os.path.join(self.instdatadir, 'data_PARCELS.tab'),
-                                                     sep=' ', index=False,
-                                                     header=['LRSEGS', 'LOADSRCS', 'AGENCIES'])
+        self._save_instance_data('data_PARCELS', df_parcels.loc[:, ['landriversegment',
+                                                                   'loadsourceshortname',
+                                                                   'agencycode']],
+                                 header=['LRSEGS', 'LOADSRCS', 'AGENCIES'])
         return df_parcels
 
 
@@ -380,22 +450,24 @@ class DataHandlerBase:
         srcbmpsubtbl = TblBmp.loc[:, ['bmpid', 'bmpgroupid']].merge(srcbmpsubtbl)
 
         # Membership is restricted to land river segments in self.LRSEGS, so we can filter srcbmpsubtbl by effsubtable
-        effsubtable = TblBmpEfficiency[TblBmpEfficiency['lrsegid'].isin(self.lrsegsetidlist)]
+        effsubtable = self._efficiencies(TblBmpEfficiency)
 
         # (bmp, loadsource) pairs are included in BMPSRCLINKS only if the bmp has an efficiency value
         # for that loadsource (and its associated loadsourcegroup) in TblBmpEfficiency
-        bmpsrclinkssubtbl = srcbmpsubtbl.loc[:, :].merge(effsubtable.loc[:, ['bmpid', 'loadsourceid']],
+        # (the lrsegid of each efficiency value is kept, so the links can also be found for part of the geography)
+        bmpsrclinkssubtbl = srcbmpsubtbl.loc[:, :].merge(effsubtable.loc[:, ['bmpid', 'loadsourceid', 'lrsegid']],
                                                          on=['bmpid', 'loadsourceid'])
 
         # BMP, bmpgroup, and loadsource names are added to the table.
         bmpsrclinkssubtbl = TblBmp.loc[:, ['bmpid', 'bmpshortname']].merge(bmpsrclinkssubtbl)
         bmpsrclinkssubtbl = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(bmpsrclinkssubtbl)
         bmpsrclinkssubtbl = TblBmpGroup.loc[:, ['bmpgroupid', 'bmpgroupname']].merge(bmpsrclinkssubtbl)
-        if self.save2file:
-            bmpsrclinkssubtbl.to_csv(os.path.join(self.instdatadir, 'tempBMPSRCLINKS.csv'))
+        self._save_instance_data('tempBMPSRCLINKS', bmpsrclinkssubtbl, temporary=True)
+
+        self._joined_tables['bmpsrclinks'] = bmpsrclinkssubtbl
 
         # Duplicate pairs are removed.
-        bmpsrclinkssubtbl.drop_duplicates(['bmpshortname', 'loadsourceshortname'], inplace=True)
+        bmpsrclinkssubtbl = bmpsrclinkssubtbl.drop_duplicates(['bmpshortname', 'loadsourceshortname']).copy()
         # Get correspondences between bmp names and loadsource names
         # first, as dataframe column
         bmpsrclinkssubtbl['BMPSRCLINKS'] = list(zip(bmpsrclinkssubtbl.bmpshortname.tolist(),
@@ -403,18 +475,15 @@ class DataHandlerBase:
         # then, also as a {loadsource: bmps} dictionary
         grouped = bmpsrclinkssubtbl.groupby(['loadsourceshortname'])
         self.BMPSRCLINKS = grouped['bmpshortname'].apply(lambda x: list(x)).to_dict()
-        if self.save2file:
-            bmpsrclinkssubtbl.loc[:, ['bmpshortname',
-                                      'loadsourceshortname']].to_csv(os.path.join(self.instdatadir, 'data_BMPSRCLINKS.tab'),
-                                                                     sep=' ', index=False,
-                                                                     header=['BMPS', 'LOADSRCS'])
+        self._save_instance_data('data_BMPSRCLINKS', bmpsrclinkssubtbl.loc[:, ['bmpshortname',
+                                                                              'loadsourceshortname']],
+                                 header=['BMPS', 'LOADSRCS'])
 
         # retain only bmp groups for the BMPGRPSRCLINKS set, and remove duplicate group pairs
         bmpsrcgrplinkssubtbl = bmpsrclinkssubtbl.loc[:, ['bmpgroupid', 'bmpgroupname',
                                                          'loadsourceshortname']].drop_duplicates(['bmpgroupname',
                                                                                                   'loadsourceshortname']).copy()
-        if self.save2file:
-            bmpsrcgrplinkssubtbl.to_csv(os.path.join(self.instdatadir, 'tempBMPGRPSRCLINKS.csv'))
+        self._save_instance_data('tempBMPGRPSRCLINKS', bmpsrcgrplinkssubtbl, temporary=True)
         # Get correspondences between bmpgrp ids and loadsource names
         # first, as dataframe column
         bmpsrcgrplinkssubtbl['BMPGRPSRCLINKS'] = list(zip(bmpsrcgrplinkssubtbl.bmpgroupid.tolist(),
@@ -423,11 +492,9 @@ class DataHandlerBase:
         grouped = bmpsrcgrplinkssubtbl.groupby(['loadsourceshortname'])
         bmpgrpsrclinks_dict = grouped['bmpgroupid'].apply(lambda x: list(x)).to_dict()
         self.BMPGRPSRCLINKS = bmpgrpsrclinks_dict
-        if self.save2file:
-            bmpsrcgrplinkssubtbl.loc[:, ['bmpgroupid',
-                                         'loadsourceshortname']].to_csv(os.path.join(self.instdatadir, 'data_BMPGRPSRCLINKS.tab'),
-                                                                        sep=' ', index=False,
-                                                                        header=['BMPGRPS', 'LOADSRCS'])
+        self._save_instance_data('data_BMPGRPSRCLINKS', bmpsrcgrplinkssubtbl.loc[:, ['bmpgroupid',
+                                                                                    'loadsourceshortname']],
+                                 header=['BMPGRPS', 'LOADSRCS'])
 
     def _load_param_CostPerAcreOfBmps(self, TblBmp, TblCostBmpLand, costprofileid):
         """ (tau) Cost per acre ($ ac^-1) of BMP b (for cost profile κ)
@@ -439,20 +506,17 @@ class DataHandlerBase:
         self.costsubtbl = costsdf
         costsdf = costsdf[costsdf['bmpshortname'].isin(self.bmpsetlist)]
 
-        # Groupby groups are converted to a dictionary ( with tuple->value structure ).
-        grouped = costsdf.groupby(['bmpshortname'])
-        self.tau = grouped['totalannualizedcostperunit'].apply(lambda x: list(x)[0]).to_dict()
-        if True:  # self.save2file:
-            costsdf.loc[:, ['bmpshortname',
-                            'totalannualizedcostperunit']].to_csv(os.path.join(self.instdatadir, 'data_tau.tab'),
-                                                                  sep=' ', index=False, header=['BMPS', 'tau'])
+        # The first value for each key is put in a dictionary ( with tuple->value structure ).
+        self.tau = first_value_per_key(costsdf, ['bmpshortname'], 'totalannualizedcostperunit')
+        self._save_instance_data('data_tau', costsdf.loc[:, ['bmpshortname', 'totalannualizedcostperunit']],
+                                 header=['BMPS', 'tau'])
 
     def _load_param_EffectivenessOfBmps(self, TblBmp, TblBmpEfficiency, TblLandRiverSegment, TblLoadSource):
         """ (eta) effectiveness (unitless) of BMP b on reducing pollutant p, in land-river segment l and load source u
         """
         # Pre-processing is necessary to build the parameter dictionary
         #  - get efficiency bmps that are in the landriversegments
-        effsubtable = TblBmpEfficiency[TblBmpEfficiency['lrsegid'].isin(self.lrsegsetidlist)]
+        effsubtable = self._efficiencies(TblBmpEfficiency)
         # Pollutant names are made into an index instead of separate columns.
         listofdataframes = []
         pltntdict = {'tn': 'N', 'tp': 'P', 'sed': 'S'}
@@ -472,80 +536,22 @@ class DataHandlerBase:
         df = TblLandRiverSegment.loc[:, ['lrsegid', 'landriversegment']].merge(df)
         df = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(df)
 
-        # Groupby groups are converted to a dictionary ( with tuple->value structure ).
-        grouped = df.groupby(['bmpshortname', 'landriversegment', 'loadsourceshortname', 'pltnt'])
-        self.eta = grouped['effvalue'].apply(lambda x: list(x)[0]).to_dict()
-        if self.save2file:
-            df.loc[:, ['bmpshortname', 'landriversegment', 'loadsourceshortname', 'pltnt',
-                       'effvalue']].to_csv(os.path.join(self.instdatadir, 'data_eta.tab'),
-                                           sep=' ', index=False,
-                                           header=['BMPS', 'LRSEGS', 'LOADSRCS', 'PLTNTS',
-                                                   'eta'])
-
-    def _load_param_PhiBaseLoadingRates(self, TblLandRiverSegment,
-                                        TblGeography, TblGeographyType, TblGeographyLrSeg,
-                                        TblLoadSource, Tbl2010NoActionLoads, TblAgency):
+        self._joined_tables['eta'] = df
+        # The first value for each key is put in a dictionary ( with tuple->value structure ).
+        self.eta = first_value_per_key(df, ['bmpshortname', 'landriversegment', 'loadsourceshortname', 'pltnt'],
+                                       'effvalue')
+        self._save_instance_data('data_eta', df.loc[:, ['bmpshortname', 'landriversegment', 'loadsourceshortname',
+                                                        'pltnt', 'effvalue']],
+                                 header=['BMPS', 'LRSEGS', 'LOADSRCS', 'PLTNTS', 'eta'])
+
+    def _load_param_PhiBaseLoadingRates(self, TblLandRiverSegment, TblLoadSource, baseloadstbl):
         """ (Phi) base loading rate (lb. ac-1) of pollutant p per load source per land river segment (for year y)
 
-        Some pre-processing is necessary to build the parameter dictionary
-          - Unfortunately, the NoActionLoads table is from the website so doesn't have id numbers.
-            - We'll first translate the names in the table to id numbers...
+        The base loading table was translated to ids (and the rates were computed) beforehand,
+        see baseloads.base_loading_table(), so only the rates for our land river segments are read here.
 
         """
-        # Let's make sure the columns are all lowercase
-        Tbl2010NoActionLoads.columns = map(str.lower, Tbl2010NoActionLoads.columns)
-
-        # First, let's translate our lrseg list to full names so we can subset it before translating.
-        gtypeid = TblGeographyType[TblGeographyType['geographytypefullname'] ==
-                                   'Land River Segment indicating if in or out of CBWS'].geographytypeid.tolist()[0]
-        geolrsegsubtbl = TblGeographyLrSeg.loc[TblGeographyLrSeg['lrsegid'].isin(self.lrsegsetidlist)]
-        geosubtbl = geolrsegsubtbl.merge(TblGeography, on='geographyid', how='inner')
-        lrsegfullnames = geosubtbl[geosubtbl['geographytypeid'] == gtypeid].geographyfullname.tolist()
-
-        loadssubtbl = Tbl2010NoActionLoads[Tbl2010NoActionLoads['geography'].isin(lrsegfullnames)]
-
-        # The load source table 'geographyfullname' column is translated to geographyid.
-        includecols = ['geography', 'loadsource', 'agency', 'sector',
-                       '2010 no action_amount',
-                       '2010 no action_nloadeot', '2010 no action_ploadeot',
-                       '2010 no action_sloadeot']
-        loadssubtbl = loadssubtbl.loc[:, includecols].merge(TblGeography, how='inner',
-                                                            left_on='geography',
-                                                            right_on='geographyfullname')
-        loadssubtbl.drop(columns=['geographyname', 'geographyfullname',
-                                  'geography', 'geographytypeid'], inplace=True)
-
-        # # Drop agencies that are not to be included
-        # mask = loadssubtbl[(loadssubtbl['agency'] != self.agencyfullname)].index
-        # if mask.empty:
-        #     logger.warning("expected agencies besides 'Non-Federal' to be dropped")
-        # loadssubtbl.drop(mask, inplace=True)
-
-        # If division by zero occurs, those values are set to zero.
-        loadssubtbl['eotn'] = (loadssubtbl['2010 no action_nloadeot'] / loadssubtbl['2010 no action_amount']).fillna(0)
-        loadssubtbl["eotn"].replace([np.inf, -np.inf], 0, inplace=True)
-        loadssubtbl['eotp'] = (loadssubtbl['2010 no action_ploadeot'] / loadssubtbl['2010 no action_amount']).fillna(0)
-        loadssubtbl["eotp"].replace([np.inf, -np.inf], 0, inplace=True)
-        loadssubtbl['eots'] = (loadssubtbl['2010 no action_sloadeot'] / loadssubtbl['2010 no action_amount']).fillna(0)
-        loadssubtbl["eots"].replace([np.inf, -np.inf], 0, inplace=True)
-        loadssubtbl.drop(columns=['2010 no action_nloadeot', '2010 no action_ploadeot',
-                                  '2010 no action_sloadeot'], inplace=True)
-
-        # The load source table 'geographyid' column is translated to 'lrsegid' and is then removed.
-        includecols = ['geographyid', 'lrsegid']
-        loadssubtbl = TblGeographyLrSeg.loc[:, includecols].merge(loadssubtbl, how='inner', on='geographyid')
-        loadssubtbl.drop(columns=['geographyid'], inplace=True)
-
-        # The load source table 'loadsource' column is translated to 'loadsourceid' and is then removed.
-        includecols = ['loadsourceid', 'loadsource']
-        loadssubtbl = TblLoadSource.loc[:, includecols].merge(loadssubtbl, how='inner', on='loadsource')
-        loadssubtbl.drop(columns=['loadsource'], inplace=True)
-
-        # The load source table 'agency' column is translated to 'agencycode' and is then removed.
-        loadssubtbl.rename(columns={"agency": "agencyfullname"}, inplace=True)
-        includecols = ['agencycode', 'agencyfullname']
-        loadssubtbl = TblAgency.loc[:, includecols].merge(loadssubtbl, how='inner', on='agencyfullname')
-        loadssubtbl.drop(columns=['agencyfullname'], inplace=True)
+        loadssubtbl = baseloadstbl.read(lrsegids=self.lrsegsetidlist)
 
         # Only loadsources that are represented by a single-ls loadsource group are retained.
         loadssubtbl = loadssubtbl[loadssubtbl['loadsourceid'].isin(self.loadsrcsetidlist)]
@@ -567,14 +573,13 @@ class DataHandlerBase:
         df = TblLandRiverSegment.loc[:, ['lrsegid', 'landriversegment']].merge(df)
         df = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(df)
 
-        # Groupby groups are converted to a dictionary ( with tuple->value structure ).
-        grouped = df.groupby(['landriversegment', 'loadsourceshortname', 'agencycode', 'pltnt'])
-        self.phi = grouped['loadratelbsperyear'].apply(lambda x: list(x)[0]).to_dict()
-        if self.save2file:
-            df.loc[:, ['landriversegment', 'loadsourceshortname', 'agencycode',
-                       'pltnt', 'loadratelbsperyear']].to_csv(os.path.join(self.instdatadir, 'data_phi.tab'),
-                                                              sep=' ', index=False,
-                                                              header=['LRSEGS', 'LOADSRCS', 'AGENCIES', 'PLTNTS', 'phi'])
+        self._joined_tables['phi'] = df
+        # The first value for each key is put in a dictionary ( with tuple->value structure ).
+        self.phi = first_value_per_key(df, ['landriversegment', 'loadsourceshortname', 'agencycode', 'pltnt'],
+                                       'loadratelbsperyear')
+        self._save_instance_data('data_phi', df.loc[:, ['landriversegment', 'loadsourceshortname', 'agencycode',
+                                                        'pltnt', 'loadratelbsperyear']],
+                                 header=['LRSEGS', 'LOADSRCS', 'AGENCIES', 'PLTNTS', 'phi'])
 
     def _load_param_TotalAcresAvailableForLoadSources(self, TblLandRiverSegment, TblLoadSource,
                                                       TblLandUsePreBmp, TblAgency, baseconditionid):
@@ -583,24 +588,15 @@ class DataHandlerBase:
         Some pre-processing is necessary to build the parameter dictionary
 
         """
-        df = TblLandUsePreBmp[(TblLandUsePreBmp['baseconditionid'] == baseconditionid) &
-                              (TblLandUsePreBmp['lrsegid'].isin(self.lrsegsetidlist))].copy()
-        df.drop(columns=['baseconditionid'], inplace=True)
-
-        # Land river segment names, loadsource names, and agency codes are added to the table.
-        df = TblLandRiverSegment.loc[:, ['lrsegid', 'landriversegment']].merge(df, how='inner')
-        df = TblLoadSource.loc[:, ['loadsourceid', 'loadsourceshortname']].merge(df, how='inner')
-        df = TblAgency.loc[:, ['agencyid', 'agencycode']].merge(df, how='inner')
-
-        # Groupby groups are converted to a dictionary ( with tuple->value structure ).
-        grouped = df.groupby(['landriversegment', 'loadsourceshortname', 'agencycode'])
-        self.alpha = grouped['acres'].apply(lambda x: list(x)[0]).to_dict()
-        if self.save2file:
-            df.loc[:, ['landriversegment',
-                       'loadsourceshortname',
-                       'agencycode',
-                       'acres']].to_csv(os.path.join(self.instdatadir, 'data_alpha.tab'), sep=' ', index=False,
-                                        header=['LRSEGS', 'LOADSRCS', 'AGENCIES', 'alpha'])
+        # (the same table as the PARCELS set)
+        df = self._named_parcels(TblLandUsePreBmp, TblLandRiverSegment, TblLoadSource, TblAgency, baseconditionid)
+
+        self._joined_tables['alpha'] = df
+        # The first value for each key is put in a dictionary ( with tuple->value structure ).
+        self.alpha = first_value_per_key(df, ['landriversegment', 'loadsourceshortname', 'agencycode'], 'acres')
+        self._save_instance_data('data_alpha', df.loc[:, ['landriversegment', 'loadsourceshortname', 'agencycode',
+                                                          'acres']],
+                                 header=['LRSEGS', 'LOADSRCS', 'AGENCIES', 'alpha'])
 
     def _load_already_implemented_bmps_in_a_given_scenario(self, ImpBmpSubmittedLand, ImpBmpScenarioId,
                                                            TblGeography, TblGeographyType,
@@ -1,6 +1,5 @@
 
 # Generic/Built-in
-import os
 import logging
 
 # Computation
@@ -19,9 +18,8 @@ class DataCostConstraintMixin(object):
         logger.debug('loading total cost constraint')
         """ Total Cost constraint for entire  """
         self.totalcostupperbound = 100000  # a default
-        if self.save2file:
-            totalcostupperbound_df = pd.DataFrame(list(self.totalcostupperbound), columns=['totalcostupperbound'])
-            totalcostupperbound_df.to_csv('data_totalcostupperbound.tab', sep=' ', index=False)
+        self._save_instance_data('data_totalcostupperbound',
+                                 pd.DataFrame([self.totalcostupperbound], columns=['totalcostupperbound']))
 
 
 class DataLoadConstraintAtCountyLevelMixin(object):
@@ -41,7 +39,7 @@ class DataLoadConstraintAtCountyLevelMixin(object):
         if self.save2file:
             theta_df = pd.DataFrame(list(Thetadict.items()), columns=['theta'])
             theta_df[['PLTNTS']] = theta_df.apply(pd.Series)
-            theta_df.loc[:, ['PLTNTS', 'theta']].to_csv(os.path.join(self.instdatadir, 'data_theta.tab'), sep=' ', index=False)
+            self._save_instance_data('data_theta', theta_df.loc[:, ['PLTNTS', 'theta']])
 
 
 class DataLoadConstraintAtLrsegLevelMixin(object):
@@ -64,4 +62,4 @@ class DataLoadConstraintAtLrsegLevelMixin(object):
         if self.save2file:
             theta_df = pd.DataFrame(list(Thetadict.items()), columns=['LRSEGS', 'theta'])
             theta_df[['LRSEGS', 'PLTNTS']] = theta_df['LRSEGS'].apply(pd.Series)
-            theta_df.loc[:, ['LRSEGS', 'PLTNTS', 'theta']].to_csv(os.path.join(self.instdatadir, 'data_theta.tab'), sep=' ', index=False)
+            self._save_instance_data('data_theta', theta_df.loc[:, ['LRSEGS', 'PLTNTS', 'theta']])
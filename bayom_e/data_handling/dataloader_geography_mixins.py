@@ -8,9 +8,8 @@ class DataCountyGeoentitiesMixin(object):
     def _load_set_geographies(self, jeeves, geolist=None):
         logger.debug('loading county geoentities')
 
-        geodf = jeeves.county.add_lrsegs_to_counties(countystatestrs=[x.replace('Washington, DC',
-                                                                                'District of Columbia, DC')
-                                                                      for x in geolist])
+        # (raises a ValueError listing every name in geolist that isn't a county)
+        geodf = jeeves.county.add_lrsegs_to_counties(countystatestrs=geolist)
 
         if geodf.empty:
             raise ValueError('** no matching geographies found. please check scale and entities **')
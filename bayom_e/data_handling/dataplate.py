@@ -4,7 +4,7 @@
 # Generic/Built-in
 import types
 from typing import List, Tuple, Dict, Set
-from dataclasses import dataclass, InitVar
+from dataclasses import dataclass, InitVar, replace
 
 # Computation
 import pandas as pd
@@ -168,3 +168,138 @@ class NLP_DataPlate:
             total area in acres (int)
         """
         return sum(self.alpha.values())
+
+    @classmethod
+    def from_datahandler(cls, dh):
+        """ The dataplate of a loaded DataHandler """
+        return cls(PLTNTS=dh.PLTNTS,
+                   LRSEGS=dh.LRSEGS,
+                   LOADSRCS=dh.LOADSRCS,
+                   AGENCIES=dh.AGENCIES,
+                   PARCELS=dh.PARCELS,
+                   BMPS=dh.BMPS,
+                   BMPGRPS=dh.BMPGRPS,
+                   BMPGRPING=dh.BMPGRPING,
+                   BMPSRCLINKS=dh.BMPSRCLINKS,
+                   BMPGRPSRCLINKS=dh.BMPGRPSRCLINKS,
+                   theta=dh.Theta,
+                   alpha=dh.alpha,
+                   phi=dh.phi,
+                   tau=dh.tau,
+                   eta=dh.eta)
+
+    def subset(self, lrsegs=None, loadsources=None):
+        """ A dataplate with only some of the land river segments and/or load sources
+
+        Parcels (and alpha) are kept for the given land river segments and load sources, and the load sources and
+        agencies are then those of the remaining parcels. eta, phi and the bmp-loadsource links are kept only for
+        the remaining land river segments and load sources (a bmp stays linked to a load source only if it still
+        has an effectiveness value for it). The bmps, bmp groups, tau and theta don't depend on the geography.
+
+        Args:
+            lrsegs (list of str): land river segments to keep. Defaults to all of them.
+            loadsources (list of str): load sources to keep. Defaults to all of them.
+
+        Returns:
+            NLP_DataPlate
+        """
+        lrsegset = set(self.LRSEGS if lrsegs is None else lrsegs)
+        loadsrcset = None if loadsources is None else set(loadsources)
+
+        def keep(l, u):
+            return (l in lrsegset) and ((loadsrcset is None) or (u in loadsrcset))
+
+        parcels = [p for p in self.PARCELS if keep(p[0], p[1])]
+        parcelloadsrcs = set(p[1] for p in parcels)
+        loadsrcs = [u for u in self.LOADSRCS if u in parcelloadsrcs]
+        loadsrcs_in = set(loadsrcs)
+
+        eta = {k: v for k, v in self.eta.items() if (k[1] in lrsegset) and (k[2] in loadsrcs_in)}
+        linked = set((k[0], k[2]) for k in eta)
+        bmpsrclinks = {u: [b for b in bmps if (b, u) in linked]
+                       for u, bmps in self.BMPSRCLINKS.items() if u in loadsrcs_in}
+        bmpsrclinks = {u: bmps for u, bmps in bmpsrclinks.items() if bmps}
+
+        bmpgroup = {b: g for g, bmps in self.BMPGRPING.items() for b in bmps}
+        bmpgrpsrclinks = {}
+        for u, grps in self.BMPGRPSRCLINKS.items():
+            linkedgrps = set(bmpgroup.get(b) for b in bmpsrclinks.get(u, []))
+            grps = [g for g in grps if g in linkedgrps]
+            if grps:
+                bmpgrpsrclinks[u] = grps
+
+        return replace(self,
+                       LRSEGS=[l for l in self.LRSEGS if l in lrsegset],
+                       LOADSRCS=loadsrcs,
+                       AGENCIES=set(p[2] for p in parcels),
+                       PARCELS=parcels,
+                       BMPSRCLINKS=bmpsrclinks,
+                       BMPGRPSRCLINKS=bmpgrpsrclinks,
+                       alpha={k: v for k, v in self.alpha.items() if keep(k[0], k[1])},
+                       phi={k: v for k, v in self.phi.items() if (k[0] in lrsegset) and (k[1] in loadsrcs_in)},
+                       eta=eta)
+
+    def merge(self, other):
+        """ A dataplate with the land river segments of this one and those of another (with different segments)
+
+        The sets are combined (keeping this dataplate's order, then the other's), and the parameters are
+        combined per land river segment; the bmps, bmp groups, tau and theta are this dataplate's.
+
+        Returns:
+            NLP_DataPlate
+        """
+        def combined_lists(a, b) -> list:
+            return list(a) + [x for x in b if x not in set(a)]
+
+        def combined_links(a, b) -> dict:
+            links = {k: list(v) for k, v in a.items()}
+            for k, v in b.items():
+                links[k] = combined_lists(links.get(k, []), v)
+            return links
+
+        return replace(self,
+                       LRSEGS=combined_lists(self.LRSEGS, other.LRSEGS),
+                       LOADSRCS=combined_lists(self.LOADSRCS, other.LOADSRCS),
+                       AGENCIES=set(self.AGENCIES) | set(other.AGENCIES),
+                       PARCELS=list(self.PARCELS) + list(other.PARCELS),
+                       BMPSRCLINKS=combined_links(self.BMPSRCLINKS, other.BMPSRCLINKS),
+                       BMPGRPSRCLINKS=combined_links(self.BMPGRPSRCLINKS, other.BMPGRPSRCLINKS),
+                       alpha={**self.alpha, **other.alpha},
+                       phi={**self.phi, **other.phi},
+                       eta={**self.eta, **other.eta})
+
+    def extend(self, geoentities, geoscale, baseloadingfilename, jeeves=None):
+        """ A dataplate that also includes other counties or land river segments
+
+        Only the data for the land river segments that aren't in this dataplate yet are loaded (see merge()).
+        Unlike a dataplate built for the whole geography at once, eta and phi aren't added for land river
+        segments and load sources that are only in different parts of the geography (which no parcel uses).
+
+        Args:
+            geoentities (list of str): names of the counties or land river segments to add
+            geoscale (str): 'county' or 'lrseg'
+            baseloadingfilename (str): the base loading file this dataplate was built with
+            jeeves (Jeeves): Source data to use. Defaults to a new (lazy, read-only) Jeeves.
+
+        Returns:
+            NLP_DataPlate
+        """
+        # (imported here, since both of these modules use NLP_DataPlate, and so that this module
+        #  doesn't need the source data code)
+        from castjeeves.jeeves import Jeeves
+        from .dataplate_batch import geography_lrsegs
+        from .data_interface import get_loaded_data_handler_no_objective
+
+        if jeeves is None:
+            jeeves = Jeeves(lazy=True, read_only=True)
+        present = set(self.LRSEGS)
+        newlrsegs = []
+        for geography in geoentities:
+            newlrsegs.extend(l for l in geography_lrsegs(jeeves, geoscale, geography)
+                             if (l not in present) and (l not in newlrsegs))
+        if not newlrsegs:
+            return replace(self)
+
+        dh = get_loaded_data_handler_no_objective('lrseg', newlrsegs, savedata2file=False,
+                                                  baseloadingfilename=baseloadingfilename, jeeves=jeeves)
+        return self.merge(NLP_DataPlate.from_datahandler(dh))
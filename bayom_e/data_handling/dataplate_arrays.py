@@ -0,0 +1,343 @@
+""" Keep track of data for a particular kind of model, as integer-coded sets and sparse parameter arrays
+"""
+
+# Generic/Built-in
+import collections.abc
+
+# Computation
+import numpy as np
+import pandas as pd
+
+# BAYOTA
+from bayota_util.str_manip import numstr
+from .dataplate import NLP_DataPlate
+
+ETA_DIMS = ('BMPS', 'LRSEGS', 'LOADSRCS', 'PLTNTS')
+PHI_DIMS = ('LRSEGS', 'LOADSRCS', 'AGENCIES', 'PLTNTS')
+ALPHA_DIMS = ('LRSEGS', 'LOADSRCS', 'AGENCIES')
+
+
+def member_labels(setmembers, *columns) -> list:
+    """ The members of a set, followed by any other (non-null) values that appear in the given key columns """
+    labels = list(setmembers)
+    known = set(labels)
+    for col in columns:
+        for x in pd.unique(pd.Series(col, dtype=object)):
+            if (x not in known) and pd.notnull(x):
+                labels.append(x)
+                known.add(x)
+    return labels
+
+
+def codes_for(values, labels) -> np.ndarray:
+    """ The positions of values in a list of labels (-1 for values that aren't in it) """
+    return pd.Categorical(pd.Series(values, dtype=object), categories=labels).codes.astype(np.int32)
+
+
+class SparseParameter(collections.abc.Mapping):
+    """ A parameter indexed by tuples of set members, stored as (COO) arrays of integer codes and values.
+
+    It is a read-only dict view, so it can be used wherever the parameter dictionaries of NLP_DataPlate are,
+    but keys are found with a binary search of each row's combined code instead of a hash table of tuples.
+    Rows are grouped by the members of any one set (CSR-style, see rows_by()) when that's first needed.
+
+    Attributes:
+        dims (tuple of str): names of the sets that index the parameter, e.g. ('LRSEGS', 'LOADSRCS', 'AGENCIES')
+        labels (tuple of list): the members of each of those sets; each code is a position in one of these lists
+        codes (np.ndarray): (rows x dims) integer codes of the key of each row
+        data (np.ndarray): the value for each row
+
+    """
+    def __init__(self, dims, labels, codes, data):
+        self.dims = tuple(dims)
+        self.labels = tuple(labels)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.codes = np.asarray(codes, dtype=np.int32).reshape(len(self.data), len(self.dims))
+        self._reset()
+
+    def _reset(self):
+        self._positions = None
+        self._sortedkeys = None
+        self._sortorder = None
+        self._csr = {}
+
+    def __getstate__(self):
+        # The lookup tables are rebuilt when needed, rather than being pickled.
+        return {'dims': self.dims, 'labels': self.labels, 'codes': self.codes, 'data': self.data}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def __repr__(self):
+        return f"SparseParameter({', '.join(self.dims)}; {len(self)} values)"
+
+    @classmethod
+    def from_frame(cls, df, keycols, valuecol, dims, labels):
+        """ A parameter from the rows of a table, keeping the first value for each key (as first_value_per_key does)
+
+        Rows with a key member that isn't in the labels (e.g. a missing value) are left out.
+        """
+        codes = np.column_stack([codes_for(df[c].values, l) for c, l in zip(keycols, labels)]) \
+            if len(df) else np.empty((0, len(keycols)), dtype=np.int32)
+        data = df[valuecol].values.astype(np.float64)
+        keep = (codes >= 0).all(axis=1)
+        codes, data = codes[keep], data[keep]
+
+        combined = cls._combine(codes, [len(l) for l in labels])
+        _, first = np.unique(combined, return_index=True)
+        first.sort()
+        return cls(dims, labels, codes[first], data[first])
+
+    @classmethod
+    def from_dict(cls, d, dims, labels):
+        """ A parameter from a dictionary of {key tuple (or member, for one dimension): value} """
+        keys = list(d.keys())
+        if len(dims) == 1:
+            df = pd.DataFrame({0: pd.Series(keys, dtype=object)})
+        else:
+            df = pd.DataFrame(keys, columns=list(range(len(dims)))) if keys else \
+                pd.DataFrame(columns=list(range(len(dims))))
+        df['value'] = list(d.values())
+        return cls.from_frame(df, list(range(len(dims))), 'value', dims, labels)
+
+    @staticmethod
+    def _combine(codes, sizes) -> np.ndarray:
+        """ One int64 per row, from the codes of all of its dimensions (mixed-radix) """
+        combined = np.zeros(len(codes), dtype=np.int64)
+        for d, size in enumerate(sizes):
+            combined = combined * max(size, 1) + codes[:, d]
+        return combined
+
+    def _key_codes(self, key) -> list:
+        if self._positions is None:
+            self._positions = [{x: i for i, x in enumerate(l)} for l in self.labels]
+        if len(self.dims) == 1:
+            key = (key,)
+        if (not isinstance(key, tuple)) or (len(key) != len(self.dims)):
+            raise KeyError(key)
+        return [p[k] for p, k in zip(self._positions, key)]
+
+    def _row(self, key) -> int:
+        try:
+            codes = self._key_codes(key)
+        except (KeyError, TypeError):
+            raise KeyError(key)
+        if self._sortedkeys is None:
+            combined = self._combine(self.codes, [len(l) for l in self.labels])
+            self._sortorder = np.argsort(combined, kind='mergesort')
+            self._sortedkeys = combined[self._sortorder]
+        target = self._combine(np.array([codes], dtype=np.int64), [len(l) for l in self.labels])[0]
+        i = np.searchsorted(self._sortedkeys, target)
+        if (i == len(self._sortedkeys)) or (self._sortedkeys[i] != target):
+            raise KeyError(key)
+        return self._sortorder[i]
+
+    def __getitem__(self, key):
+        return float(self.data[self._row(key)])
+
+    def __contains__(self, key):
+        try:
+            self._row(key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        columns = [np.asarray(l, dtype=object)[self.codes[:, d]] if len(l) else np.empty(len(self), dtype=object)
+                   for d, l in enumerate(self.labels)]
+        if len(self.dims) == 1:
+            return iter(columns[0].tolist())
+        return zip(*[c.tolist() for c in columns])
+
+    def items(self):
+        return zip(iter(self), self.data.tolist())
+
+    def values(self):
+        return self.data.tolist()
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.data.nbytes
+
+    def rows_by(self, dim):
+        """ The rows grouped by their member of one set (compressed sparse row form)
+
+        Returns:
+            (indptr, rows), where the rows for the set member with code k are rows[indptr[k]:indptr[k + 1]]
+        """
+        d = self.dims.index(dim)
+        if d not in self._csr:
+            rows = np.argsort(self.codes[:, d], kind='mergesort')
+            counts = np.bincount(self.codes[:, d], minlength=len(self.labels[d]))
+            self._csr[d] = (np.concatenate([[0], np.cumsum(counts)]), rows)
+        return self._csr[d]
+
+    def select(self, **members):
+        """ A parameter with only the rows whose keys have the given members, e.g. select(LRSEGS=['N1', 'N2'])
+
+        The labels (and so the codes) are the same as this parameter's, so selections can be combined cheaply.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for dim, wanted in members.items():
+            if dim not in self.dims:
+                raise ValueError(f"<{dim}> is not a dimension of this parameter {self.dims}")
+            indptr, rows = self.rows_by(dim)
+            wantedcodes = codes_for(list(wanted), self.labels[self.dims.index(dim)])
+            wantedcodes = wantedcodes[wantedcodes >= 0]
+            inset = np.zeros(len(self), dtype=bool)
+            for k in wantedcodes:
+                inset[rows[indptr[k]:indptr[k + 1]]] = True
+            keep &= inset
+        keep = np.flatnonzero(keep)
+        return SparseParameter(self.dims, self.labels, self.codes[keep], self.data[keep])
+
+
+class ArrayDataPlate:
+    """ The data of an NLP_DataPlate, with integer-coded parcels and sparse (array-backed) parameters.
+
+    The set attributes and the small parameters (tau, theta) are the same as NLP_DataPlate's, and eta, phi
+    and alpha are SparseParameters, so model builders can use either kind of dataplate. It is much smaller
+    than an NLP_DataPlate for large geographies, and it pickles (e.g. into a DataplateCache) as a few arrays.
+
+    Attributes:
+        members (dict): {set name: list of members}, whose positions are the codes used by the parameters
+            (any member that appears in a parameter but not in the set itself is listed after the set's members)
+        parcelcodes (np.ndarray): (parcels x 3) codes of the LRSEGS, LOADSRCS and AGENCIES members of each parcel
+
+    """
+    def __init__(self, PLTNTS, LRSEGS, LOADSRCS, AGENCIES, parcelcodes, members,
+                 BMPS, BMPGRPS, BMPGRPING, BMPSRCLINKS, BMPGRPSRCLINKS,
+                 theta, tau, eta: SparseParameter, phi: SparseParameter, alpha: SparseParameter):
+        self.PLTNTS = PLTNTS
+        self.LRSEGS = LRSEGS
+        self.LOADSRCS = LOADSRCS
+        self.AGENCIES = AGENCIES
+        self.parcelcodes = np.asarray(parcelcodes, dtype=np.int32).reshape(-1, len(ALPHA_DIMS))
+        self.members = members
+        self.BMPS = BMPS
+        self.BMPGRPS = BMPGRPS
+        self.BMPGRPING = BMPGRPING
+        self.BMPSRCLINKS = BMPSRCLINKS
+        self.BMPGRPSRCLINKS = BMPGRPSRCLINKS
+        self.theta = theta
+        self.tau = tau
+        self.eta = eta
+        self.phi = phi
+        self.alpha = alpha
+
+    def __repr__(self):
+        strrep = f"ARRAY DATAPLATE: \n" \
+                 f"\t- includes <{len(self.LRSEGS)}> land river segments\n" \
+                 f"\t- total area = {numstr(self.total_area(), 2)} acres (rounded to 2 decimal places)\n" \
+                 f"\t- parameter arrays = {numstr(self.nbytes / 1e6, 2)} MB\n"
+        return strrep
+
+    @property
+    def PARCELS(self) -> list:
+        columns = [np.asarray(self.members[dim], dtype=object)[self.parcelcodes[:, d]].tolist()
+                   for d, dim in enumerate(ALPHA_DIMS)]
+        return list(zip(*columns))
+
+    @property
+    def nbytes(self) -> int:
+        return self.parcelcodes.nbytes + self.eta.nbytes + self.phi.nbytes + self.alpha.nbytes
+
+    def total_area(self):
+        """ Get the total area (ac) of the LRsegs in this dataplate, from the 'alpha' attribute """
+        return float(self.alpha.data.sum())
+
+    @classmethod
+    def _members(cls, dp_sets, eta_keys, phi_keys, alpha_keys, parcel_keys) -> dict:
+        """ {set name: members}, from the sets and the key columns (lists, by dimension) that use each set """
+        columns = {dim: [] for dim in dp_sets}
+        for dims, keys in ((ETA_DIMS, eta_keys), (PHI_DIMS, phi_keys),
+                           (ALPHA_DIMS, alpha_keys), (ALPHA_DIMS, parcel_keys)):
+            for dim, col in zip(dims, keys):
+                columns[dim].append(col)
+        return {dim: member_labels(setmembers, *columns[dim]) for dim, setmembers in dp_sets.items()}
+
+    @classmethod
+    def from_dataplate(cls, dataplate: NLP_DataPlate):
+        """ The array-backed version of a (dictionary-backed) NLP_DataPlate """
+        def key_columns(d, ndims):
+            keys = list(d.keys())
+            return [[k[i] for k in keys] for i in range(ndims)]
+
+        dp_sets = {'BMPS': dataplate.BMPS, 'LRSEGS': dataplate.LRSEGS, 'LOADSRCS': dataplate.LOADSRCS,
+                   'AGENCIES': sorted(dataplate.AGENCIES), 'PLTNTS': dataplate.PLTNTS}
+        parcel_keys = [[p[i] for p in dataplate.PARCELS] for i in range(len(ALPHA_DIMS))]
+        members = cls._members(dp_sets,
+                               key_columns(dataplate.eta, len(ETA_DIMS)),
+                               key_columns(dataplate.phi, len(PHI_DIMS)),
+                               key_columns(dataplate.alpha, len(ALPHA_DIMS)),
+                               parcel_keys)
+
+        def labels(dims):
+            return [members[d] for d in dims]
+
+        parcelcodes = np.column_stack([codes_for(col, members[dim]) for col, dim in zip(parcel_keys, ALPHA_DIMS)]) \
+            if dataplate.PARCELS else np.empty((0, len(ALPHA_DIMS)), dtype=np.int32)
+        return cls(PLTNTS=dataplate.PLTNTS, LRSEGS=dataplate.LRSEGS, LOADSRCS=dataplate.LOADSRCS,
+                   AGENCIES=dataplate.AGENCIES, parcelcodes=parcelcodes, members=members,
+                   BMPS=dataplate.BMPS, BMPGRPS=dataplate.BMPGRPS, BMPGRPING=dataplate.BMPGRPING,
+                   BMPSRCLINKS=dataplate.BMPSRCLINKS, BMPGRPSRCLINKS=dataplate.BMPGRPSRCLINKS,
+                   theta=dataplate.theta, tau=dataplate.tau,
+                   eta=SparseParameter.from_dict(dataplate.eta, ETA_DIMS, labels(ETA_DIMS)),
+                   phi=SparseParameter.from_dict(dataplate.phi, PHI_DIMS, labels(PHI_DIMS)),
+                   alpha=SparseParameter.from_dict(dataplate.alpha, ALPHA_DIMS, labels(ALPHA_DIMS)))
+
+    @classmethod
+    def from_datahandler(cls, dh):
+        """ The array-backed dataplate of a loaded DataHandler, made from its joined tables (not its dictionaries) """
+        eta, phi, alpha = (dh._joined_tables[t] for t in ('eta', 'phi', 'alpha'))
+        parcels = dh._joined_tables['parcels']
+        etacols = ['bmpshortname', 'landriversegment', 'loadsourceshortname', 'pltnt']
+        phicols = ['landriversegment', 'loadsourceshortname', 'agencycode', 'pltnt']
+        alphacols = ['landriversegment', 'loadsourceshortname', 'agencycode']
+
+        dp_sets = {'BMPS': dh.BMPS, 'LRSEGS': dh.LRSEGS, 'LOADSRCS': dh.LOADSRCS,
+                   'AGENCIES': sorted(dh.AGENCIES), 'PLTNTS': dh.PLTNTS}
+        members = cls._members(dp_sets,
+                               [eta[c].values for c in etacols],
+                               [phi[c].values for c in phicols],
+                               [alpha[c].values for c in alphacols],
+                               [parcels[c].values for c in alphacols])
+
+        def labels(dims):
+            return [members[d] for d in dims]
+
+        parcelcodes = np.column_stack([codes_for(parcels[c].values, members[dim])
+                                       for c, dim in zip(alphacols, ALPHA_DIMS)])
+        return cls(PLTNTS=dh.PLTNTS, LRSEGS=dh.LRSEGS, LOADSRCS=dh.LOADSRCS,
+                   AGENCIES=dh.AGENCIES, parcelcodes=parcelcodes, members=members,
+                   BMPS=dh.BMPS, BMPGRPS=dh.BMPGRPS, BMPGRPING=dh.BMPGRPING,
+                   BMPSRCLINKS=dh.BMPSRCLINKS, BMPGRPSRCLINKS=dh.BMPGRPSRCLINKS,
+                   theta=dh.Theta, tau=dh.tau,
+                   eta=SparseParameter.from_frame(eta, etacols, 'effvalue', ETA_DIMS, labels(ETA_DIMS)),
+                   phi=SparseParameter.from_frame(phi, phicols, 'loadratelbsperyear', PHI_DIMS, labels(PHI_DIMS)),
+                   alpha=SparseParameter.from_frame(alpha, alphacols, 'acres', ALPHA_DIMS, labels(ALPHA_DIMS)))
+
+    def to_dataplate(self) -> NLP_DataPlate:
+        """ The (dictionary-backed) NLP_DataPlate with the same data """
+        return NLP_DataPlate(PLTNTS=self.PLTNTS,
+                             LRSEGS=self.LRSEGS,
+                             LOADSRCS=self.LOADSRCS,
+                             AGENCIES=self.AGENCIES,
+                             PARCELS=self.PARCELS,
+                             BMPS=self.BMPS,
+                             BMPGRPS=self.BMPGRPS,
+                             BMPGRPING=self.BMPGRPING,
+                             BMPSRCLINKS=self.BMPSRCLINKS,
+                             BMPGRPSRCLINKS=self.BMPGRPSRCLINKS,
+                             theta=self.theta,
+                             alpha=self.alpha.to_dict(),
+                             phi=self.phi.to_dict(),
+                             tau=self.tau,
+                             eta=self.eta.to_dict())
@@ -0,0 +1,180 @@
+""" Build the dataplates for many geographies in one pass
+"""
+
+# Generic/Built-in
+import os
+import logging
+
+# Computation
+import numpy as np
+
+# BAYOTA
+from castjeeves.jeeves import Jeeves
+from .datahandler_base import first_value_per_key
+from .data_interface import get_loaded_data_handler_no_objective, DATAPLATE_NAMES
+from .dataplate import NLP_DataPlate
+from .dataplate_arrays import ArrayDataPlate
+from .dataplate_cache import DataplateCache, CACHE_ENV_VARIABLE
+
+logger = logging.getLogger(__name__)
+
+
+def geography_lrsegs(jeeves, geoscale, geography) -> list:
+    """ The (in-watershed) land river segment names of one county or land river segment """
+    if geoscale == 'county':
+        geodf = jeeves.county.add_lrsegs_to_counties(countystatestrs=[geography])
+        if geodf.empty:
+            return []
+        return jeeves.lrseg.remove_outofcbws_lrsegs(lrsegdf=geodf).landriversegment.tolist()
+    elif geoscale == 'lrseg':
+        return jeeves.lrseg.remove_outofcbws_lrsegs(lrseglist=[geography])
+    else:
+        raise ValueError('<%s> is an unrecognized "geoscale".' % geoscale)
+
+
+class JoinedTableSplitter:
+    """ Takes the rows of a DataHandler's joined tables for part of its geography.
+
+    The row positions of each land river segment are found once (with a groupby on 'lrsegid'),
+    so that taking the rows for each of many geographies doesn't scan the whole table again.
+
+    Args:
+        datahandler (DataHandlerBase): loaded for the union of the geographies
+
+    """
+    def __init__(self, datahandler):
+        self.datahandler = datahandler
+        self._positions = {}
+
+    def rows_for(self, tblname, lrsegids):
+        df = self.datahandler._joined_tables[tblname]
+        if tblname not in self._positions:
+            self._positions[tblname] = df.groupby('lrsegid', sort=False).indices
+        positions = [self._positions[tblname][i] for i in lrsegids if i in self._positions[tblname]]
+        if not positions:
+            return df.iloc[0:0]
+        # The rows are kept in their original order, as they would be when loading the geography on its own.
+        return df.iloc[np.sort(np.concatenate(positions))]
+
+    def dataplate_for(self, lrsegs, name='nlp') -> NLP_DataPlate:
+        """ The dataplate for a subset of the DataHandler's land river segments
+
+        Args:
+            lrsegs (list of str): land river segment names (in the order that they'd be loaded)
+            name (str): type of dataplate, one of DATAPLATE_NAMES
+
+        Raises:
+            ValueError: for an unexpected name, or if none of the land river segments were loaded
+        """
+        if name not in DATAPLATE_NAMES:
+            raise ValueError(f"unexpected dataplate name <{name}>; expected one of {DATAPLATE_NAMES}")
+        dh = self.datahandler
+        loaded = set(dh.lrsegsetlist)
+        lrsegs = [l for l in lrsegs if l in loaded]
+        lrsegids = dh._jeeves.geo.lrsegids_from(lrsegnames=lrsegs)
+        if not lrsegids:
+            raise ValueError('No LRSEGS found matching the input list')
+
+        # Load sources (represented by single-ls groups) and agencies on these land river segments
+        landusedf = self.rows_for('landuse', lrsegids)
+        singlelsgrpdf = dh._joined_tables['singlelsgroups']
+        singlelsgrpdf = singlelsgrpdf[singlelsgrpdf['loadsourceid'].isin(landusedf['loadsourceid'])]
+        loadsrcids = singlelsgrpdf['loadsourceid'].tolist()
+        agencydf = dh._joined_tables['agencycodes'].merge(landusedf, how='inner')
+
+        parcels = self.rows_for('parcels', lrsegids)
+
+        # (bmp, loadsource) pairs with an efficiency value on these land river segments
+        bmpsrclinks = self.rows_for('bmpsrclinks', lrsegids)
+        bmpsrclinks = bmpsrclinks[bmpsrclinks['loadsourceid'].isin(loadsrcids)]
+        bmpsrclinks = bmpsrclinks.drop_duplicates(['bmpshortname', 'loadsourceshortname'])
+        bmpgrpsrclinks = bmpsrclinks.loc[:, ['bmpgroupid', 'bmpgroupname',
+                                             'loadsourceshortname']].drop_duplicates(['bmpgroupname',
+                                                                                      'loadsourceshortname'])
+
+        eta = self.rows_for('eta', lrsegids)
+        eta = eta[eta['loadsourceid'].isin(loadsrcids)]
+        phi = self.rows_for('phi', lrsegids)
+        phi = phi[phi['loadsourceid'].isin(loadsrcids)]
+        alpha = self.rows_for('alpha', lrsegids)
+
+        dataplate = NLP_DataPlate(PLTNTS=dh.PLTNTS,
+                                  LRSEGS=lrsegs,
+                                  LOADSRCS=singlelsgrpdf['loadsourceshortname'].tolist(),
+                                  AGENCIES=set(agencydf['agencycode']),
+                                  PARCELS=list(zip(parcels.landriversegment,
+                                                   parcels.loadsourceshortname,
+                                                   parcels.agencycode)),
+                                  BMPS=dh.BMPS,
+                                  BMPGRPS=dh.BMPGRPS,
+                                  BMPGRPING=dh.BMPGRPING,
+                                  BMPSRCLINKS=bmpsrclinks.groupby(['loadsourceshortname'])['bmpshortname'].apply(
+                                      lambda x: list(x)).to_dict(),
+                                  BMPGRPSRCLINKS=bmpgrpsrclinks.groupby(['loadsourceshortname'])['bmpgroupid'].apply(
+                                      lambda x: list(x)).to_dict(),
+                                  theta=dh.Theta,
+                                  alpha=first_value_per_key(alpha, ['landriversegment', 'loadsourceshortname',
+                                                                    'agencycode'], 'acres'),
+                                  phi=first_value_per_key(phi, ['landriversegment', 'loadsourceshortname',
+                                                                'agencycode', 'pltnt'], 'loadratelbsperyear'),
+                                  tau=dh.tau,
+                                  eta=first_value_per_key(eta, ['bmpshortname', 'landriversegment',
+                                                                'loadsourceshortname', 'pltnt'], 'effvalue'))
+        return dataplate if name == 'nlp' else ArrayDataPlate.from_dataplate(dataplate)
+
+
+def get_dataplates(geoscale, geographies, baseloadingfilename, name='nlp', cache=None) -> dict:
+    """ Create a dataplate object for each of many geographies, loading the source data only once.
+
+    Each dataplate is the same as the one from get_dataplate(geoscale, [geography], ...), but the source
+    tables are read and joined once for all of the geographies together, and are then split by geography.
+
+    Args:
+        geoscale (str): 'county' or 'lrseg'
+        geographies (list of str): names of the counties or land river segments
+        baseloadingfilename (str):
+        name (str): type of dataplate, one of DATAPLATE_NAMES
+        cache (bool or DataplateCache): as in get_dataplate(); only the geographies that
+            aren't already in the cache are built.
+
+    Returns:
+        dict of {geography: NLP_DataPlate}, in the order of the geographies
+    """
+    if name not in DATAPLATE_NAMES:
+        raise ValueError(f"unexpected dataplate name <{name}>; expected one of {DATAPLATE_NAMES}")
+    geographies = list(dict.fromkeys(geographies))
+    if cache is None:
+        cache = os.environ.get(CACHE_ENV_VARIABLE, '').lower() in ('1', 'true', 'yes')
+    if cache and (not isinstance(cache, DataplateCache)):
+        cache = DataplateCache()
+
+    dataplates = {}
+    keys = {}
+    if cache:
+        for geography in geographies:
+            keys[geography] = cache.key(geoscale, [geography], baseloadingfilename, name=name)
+            dataplate = cache.get(keys[geography])
+            if dataplate is not None:
+                dataplates[geography] = dataplate
+    tobuild = [g for g in geographies if g not in dataplates]
+
+    if tobuild:
+        jeeves = Jeeves(lazy=True, read_only=True)
+        if geoscale == 'county':
+            # (raises one ValueError that lists every name that isn't a county)
+            jeeves.county.resolve_countystatestrs(tobuild)
+        lrsegs = {g: geography_lrsegs(jeeves, geoscale, g) for g in tobuild}
+        missing = [g for g in tobuild if not lrsegs[g]]
+        if missing:
+            raise ValueError('** no matching geographies found for %s. please check scale and entities **' % missing)
+
+        dh = get_loaded_data_handler_no_objective(geoscale, tobuild, savedata2file=False,
+                                                  baseloadingfilename=baseloadingfilename, jeeves=jeeves)
+        splitter = JoinedTableSplitter(dh)
+        for geography in tobuild:
+            dataplates[geography] = splitter.dataplate_for(lrsegs[geography], name=name)
+            if cache:
+                cache.put(keys[geography], dataplates[geography])
+        logger.info('<built dataplates for %d geographies in one pass>' % len(tobuild))
+
+    return {g: dataplates[g] for g in geographies}
@@ -0,0 +1,145 @@
+""" Keep built dataplates on disk, so that studies that share a geography and inputs don't rebuild them
+"""
+
+# Generic/Built-in
+import os
+import gzip
+import json
+import pickle
+import hashlib
+import logging
+import threading
+
+# BAYOTA
+from bayota_settings.base import version, get_source_pickles_dir, get_raw_data_dir, \
+    get_source_csvs_dir, get_metadata_csvs_dir
+from castjeeves.sqltables import TableCache, SourceData, Metadata
+from castjeeves.sqltables.TableCache import file_fingerprint
+from .bmp_exclusions import excluded_bmps_list
+from .datahandler_base import COSTPROFILEID
+from .dataplate import NLP_DataPlate
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENV_VARIABLE = 'BAYOTA_DATAPLATE_CACHE'
+FILE_EXTENSION = '.pkl.gz'
+
+
+def tables_version(cache, csvdir, tblNames) -> list:
+    """ The size and mtime of each table's csv file (or, if it has no csv file, its cached table's source)
+
+    The csv files themselves are fingerprinted, rather than the cache, so that a newly dropped-in extract
+    changes the version before its tables have been re-ingested, and so that ingesting them while a
+    dataplate is built (e.g. lazily) doesn't change it afterwards.
+    """
+    retval = []
+    for tblName in sorted(tblNames):
+        csvpath = os.path.join(csvdir, tblName + '.csv')
+        if os.path.exists(csvpath):
+            retval.append([tblName, file_fingerprint(csvpath, with_hash=False)])
+        else:
+            source = cache.manifest.get(tblName, {}).get('source') or {}
+            retval.append([tblName, {k: source.get(k) for k in ('size', 'mtime_ns')}])
+    return retval
+
+
+def source_data_version() -> str:
+    """ Changes whenever the code version or any of the source or metadata csv files changes """
+    parts = [version]
+    for cachename, csvdir, tblNames in (('SourceData', get_source_csvs_dir(), SourceData().getTblList()),
+                                        ('MetaData', get_metadata_csvs_dir(), Metadata().getTblList())):
+        cache = TableCache(os.path.join(get_source_pickles_dir(), cachename))
+        parts.append(tables_version(cache, csvdir, tblNames))
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:24]
+
+
+class DataplateCache:
+    """ A directory of dataplates, each stored under a hash of everything it was built from (see key()).
+
+    Dataplates are stored as compressed pickles, written to a temporary file first and then renamed
+    into place, so that studies running at the same time never read a partially written dataplate.
+
+    Attributes:
+        cachedir (str): directory holding the dataplate files
+
+    Args:
+        cachedir (str): Defaults to a 'Dataplates' directory next to the cached source tables.
+
+    """
+    def __init__(self, cachedir=None):
+        if cachedir is None:
+            cachedir = os.path.join(get_source_pickles_dir(), 'Dataplates')
+        self.cachedir = cachedir
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    def __repr__(self):
+        return f"DataplateCache(<{self.cachedir}>)"
+
+    @staticmethod
+    def key(geoscale, geoentities, baseloadingfilename, name='nlp',
+            landchangemodelscenario='Historic Trends', baseyear='2010', costprofileid=COSTPROFILEID,
+            rawdatadir=None, source_version=None) -> str:
+        """ The hash of everything a dataplate is built from
+
+        The base condition is identified by its land change model scenario and base year, and the
+        base loading file and the single-load-source-group file by the hashes of their contents.
+
+        Args:
+            geoscale (str): 'county' or 'lrseg'
+            geoentities (list of str): names of the counties or land river segments, in order
+            baseloadingfilename (str): name of the base loading file in the raw data directory
+            name (str): type of dataplate
+            landchangemodelscenario (str): e.g. 'Historic Trends'
+            baseyear (str): e.g. '2010'
+            costprofileid (int): cost profile used for the bmp costs
+            rawdatadir (str): Defaults to the raw data directory from the bayota settings.
+            source_version (str): Defaults to source_data_version().
+
+        Returns:
+            str
+        """
+        if rawdatadir is None:
+            rawdatadir = get_raw_data_dir()
+        if source_version is None:
+            source_version = source_data_version()
+        keyparts = {'name': name,
+                    'geoscale': geoscale,
+                    'geoentities': list(geoentities),
+                    'landchangemodelscenario': landchangemodelscenario,
+                    'baseyear': str(baseyear),
+                    'costprofileid': int(costprofileid),
+                    'baseloading': file_fingerprint(os.path.join(rawdatadir, baseloadingfilename))['sha256'],
+                    'singlelsgroups': file_fingerprint(os.path.join(rawdatadir, 'single-ls_groups.csv'))['sha256'],
+                    'excludedbmps': sorted(excluded_bmps_list()),
+                    'source': source_version}
+        return hashlib.sha256(json.dumps(keyparts, sort_keys=True).encode()).hexdigest()[:24]
+
+    def path(self, key) -> str:
+        return os.path.join(self.cachedir, key + FILE_EXTENSION)
+
+    def has(self, key) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """ The cached dataplate for a key, or None if there isn't one (or it can't be read) """
+        if not self.has(key):
+            return None
+        try:
+            with gzip.open(self.path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as e:
+            logger.warning('<cached dataplate %s could not be read (%s); it will be rebuilt>' % (key, e))
+            return None
+
+    def put(self, key, dataplate: NLP_DataPlate):
+        """ Store a dataplate under a key """
+        tmppath = self.path(key) + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        with gzip.open(tmppath, 'wb', compresslevel=1) as f:
+            pickle.dump(dataplate, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, self.path(key))
+
+    def clear(self):
+        """ Remove all of the cached dataplates, e.g. after the dataplate-building code has changed """
+        for filename in os.listdir(self.cachedir):
+            if filename.endswith(FILE_EXTENSION):
+                os.remove(os.path.join(self.cachedir, filename))
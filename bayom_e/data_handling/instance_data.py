@@ -0,0 +1,140 @@
+""" Write the sets and parameters of a model instance to files, as '.tab' tables or as a single compressed bundle
+"""
+
+# Generic/Built-in
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Computation
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_ENV_VARIABLE = 'BAYOTA_INSTANCE_DATA_FORMAT'
+BACKGROUND_ENV_VARIABLE = 'BAYOTA_INSTANCE_DATA_BACKGROUND'
+FORMATS = ('tab', 'bundle')
+BUNDLE_NAME = 'instance_data.npz'
+BUNDLE_INDEX = '__tables__'
+
+
+def column_array(col) -> np.ndarray:
+    """ A numpy array of a table column, with text (object) and categorical columns stored as fixed-width unicode
+
+    (so that the archive can be read without unpickling anything)
+    """
+    if (col.dtype == object) or isinstance(col.dtype, pd.CategoricalDtype):
+        return np.asarray(col.astype(str)).astype(str)
+    return np.asarray(col)
+
+
+def write_bundle(path, tables):
+    """ Write tables to one compressed, column-oriented (.npz) archive
+
+    Args:
+        path (str): path of the archive
+        tables (dict): {table name: pd.DataFrame}
+    """
+    arrays = {}
+    index = {}
+    for name, df in tables.items():
+        index[name] = [str(c) for c in df.columns]
+        for i, col in enumerate(df.columns):
+            arrays['%s/%d' % (name, i)] = column_array(df[col])
+    arrays[BUNDLE_INDEX] = np.array(json.dumps(index))
+
+    tmppath = path + '.%d.%d.tmp.npz' % (os.getpid(), threading.get_ident())
+    np.savez_compressed(tmppath, **arrays)
+    os.replace(tmppath, path)
+
+
+def read_bundle(path) -> dict:
+    """ The tables in an archive written by write_bundle(), as {table name: pd.DataFrame} """
+    with np.load(path, allow_pickle=False) as archive:
+        index = json.loads(str(archive[BUNDLE_INDEX]))
+        return {name: pd.DataFrame({c: archive['%s/%d' % (name, i)] for i, c in enumerate(columns)},
+                                   columns=columns)
+                for name, columns in index.items()}
+
+
+class InstanceDataWriter:
+    """ Saves the tables of a model instance's sets and parameters in the instance data directory.
+
+    In 'tab' format, each table is its own space-delimited 'data_<...>.tab' file (and temporary tables are
+    '.csv' files), as they've always been written. In 'bundle' format, the (non-temporary) tables are kept
+    until close(), and are then written together as one compressed, column-oriented archive (instance_data.npz).
+
+    With background=True, files are written by a worker thread, so that building the data isn't held up by
+    writing it; wait() blocks until everything has been written (and raises any error from writing).
+
+    Args:
+        instdatadir (str): directory for the files
+        fileformat (str): 'tab' or 'bundle'. Defaults to the value of the BAYOTA_INSTANCE_DATA_FORMAT
+            environment variable (or 'tab' if unset).
+        background (bool): Defaults to the value of the BAYOTA_INSTANCE_DATA_BACKGROUND environment variable
+            (or False if unset).
+
+    """
+    def __init__(self, instdatadir, fileformat=None, background=None):
+        if fileformat is None:
+            fileformat = os.environ.get(FORMAT_ENV_VARIABLE, '') or 'tab'
+        if fileformat not in FORMATS:
+            raise ValueError(f"unexpected instance data format <{fileformat}>")
+        if background is None:
+            background = os.environ.get(BACKGROUND_ENV_VARIABLE, '').lower() in ('1', 'true', 'yes')
+        self.instdatadir = instdatadir
+        self.fileformat = fileformat
+        self._tables = {}
+        self._executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self._futures = []
+
+    def __repr__(self):
+        return f"InstanceDataWriter(<{self.instdatadir}>, fileformat={self.fileformat})"
+
+    def _submit(self, func, *args, **kwargs):
+        if self._executor is None:
+            func(*args, **kwargs)
+        else:
+            self._futures.append(self._executor.submit(func, *args, **kwargs))
+
+    def add(self, name, df, header=None, temporary=False):
+        """ Save a table
+
+        Args:
+            name (str): file name, without extension (e.g. 'data_eta')
+            df (pd.DataFrame): the table
+            header (list of str): column names to write instead of the table's own
+            temporary (bool): if True, the table is only for inspecting intermediate results,
+                and isn't included in a bundle
+        """
+        # (a shallow copy, so columns that the caller adds later aren't written)
+        df = df.copy(deep=False)
+        if self.fileformat == 'bundle':
+            if temporary:
+                logger.debug('<temporary table %s is not included in the instance data bundle>' % name)
+                return
+            if header is not None:
+                df.columns = header
+            self._tables[name] = df
+        elif temporary:
+            self._submit(df.to_csv, os.path.join(self.instdatadir, name + '.csv'))
+        else:
+            self._submit(df.to_csv, os.path.join(self.instdatadir, name + '.tab'), sep=' ', index=False,
+                         header=True if header is None else header)
+
+    def close(self):
+        """ Write the bundle (in 'bundle' format), and stop accepting tables """
+        if self._tables:
+            tables, self._tables = self._tables, {}
+            self._submit(write_bundle, os.path.join(self.instdatadir, BUNDLE_NAME), tables)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def wait(self):
+        """ Block until all of the tables have been written """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
@@ -74,7 +74,8 @@ def check_for_problems_post_model_construction(model, logger):
         logger.debug(original_loadsource_problems_dataframe(model).head())
 
 
-def build_model(model_spec_name, geoscale, geoentities, baseloadingfilename, savedata2file=False, log_level='INFO'):
+def build_model(model_spec_name, geoscale, geoentities, baseloadingfilename, savedata2file=False, log_level='INFO',
+                dataplate_cache=None):
     """Generate a model for the efficiency BMPs.
 
     Args:
@@ -84,6 +85,8 @@ def build_model(model_spec_name, geoscale, geoentities, baseloadingfilename, sav
         baseloadingfilename (str):
         savedata2file (bool):
         log_level (:obj:`str`, optional): The log-level for the model generation logger. Defaults to 'INFO'.
+        dataplate_cache (bool, optional): Whether to reuse a dataplate already built for the same geography and inputs
+            (see get_dataplate()). Defaults to the value of the BAYOTA_DATAPLATE_CACHE environment variable.
 
     Returns
         a Pyomo ConcreteModel
@@ -99,7 +102,8 @@ def build_model(model_spec_name, geoscale, geoentities, baseloadingfilename, sav
     """ Initialization; Get Data """
     specdict = read_spec(spec_file_name=model_spec_name, spectype='model')
     dataplate = get_dataplate(geoscale=geoscale, geoentities=[geoentities],
-                              savedata2file=savedata2file, baseloadingfilename=baseloadingfilename)
+                              savedata2file=savedata2file, baseloadingfilename=baseloadingfilename,
+                              cache=dataplate_cache)
     check_for_problems_in_data_before_model_construction(data=dataplate, logger=logger)
 
     """ Build the model skeleton (sets, parameters, and variables) """
@@ -8,7 +8,7 @@ import pyomo.environ as pyo
 from bayom_e.model_handling.utils import get_list_of_index_sets
 from castjeeves.jeeves import Jeeves
 
-jeeves = Jeeves()
+jeeves = Jeeves(lazy=True)
 
 
 def print_lens(model):
@@ -76,7 +76,8 @@ def get_dataframe_of_original_load_for_each_loadsource(mdl, pltnt):
                       'v': pyo.value(v)})
 
     df = pd.DataFrame(d).sort_values('loadsourceshortname', ascending=True).reset_index()
-    df['loadsource'] = jeeves.loadsource.fullnames_from_shortnames(df['loadsourceshortname'])
+    df['loadsource'] = jeeves.translate_array(df['loadsourceshortname'], tbls='TblLoadSource',
+                                              column_sequence=['loadsourceshortname', 'loadsource'])
     return df
 
 def get_dataframe_of_new_load_for_each_loadsource(mdl, pltnt):
@@ -91,7 +92,8 @@ def get_dataframe_of_new_load_for_each_loadsource(mdl, pltnt):
                       'v': pyo.value(v)})
 
     df = pd.DataFrame(d).sort_values('loadsourceshortname', ascending=True).reset_index()
-    df['loadsource'] = jeeves.loadsource.fullnames_from_shortnames(df['loadsourceshortname'])
+    df['loadsource'] = jeeves.translate_array(df['loadsourceshortname'], tbls='TblLoadSource',
+                                              column_sequence=['loadsourceshortname', 'loadsource'])
     return df
 
 
@@ -110,8 +112,8 @@ def get_dataframe_of_original_load_for_each_loadsource_for_a_specific_lrseg(mdl,
                           'v': pyo.value(v)})
 
     df = pd.DataFrame(d).sort_values('loadsourceshortname', ascending=True).reset_index()
-    df['loadsource'] = jeeves.loadsource.fullnames_from_shortnames(df['loadsourceshortname'],
-                                                                   use_order_of_sourcetbl=False)
+    df['loadsource'] = jeeves.translate_array(df['loadsourceshortname'], tbls='TblLoadSource',
+                                              column_sequence=['loadsourceshortname', 'loadsource'])
     return df
 
 
@@ -127,8 +129,8 @@ def get_dataframe_of_phi_for_each_loadsource_for_a_specific_lrseg(mdl, pltnt, lr
                           'v': pyo.value(v)})
 
     df = pd.DataFrame(d).sort_values('loadsourceshortname', ascending=True).reset_index()
-    df['loadsource'] = jeeves.loadsource.fullnames_from_shortnames(df['loadsourceshortname'],
-                                                                   use_order_of_sourcetbl=False)
+    df['loadsource'] = jeeves.translate_array(df['loadsourceshortname'], tbls='TblLoadSource',
+                                              column_sequence=['loadsourceshortname', 'loadsource'])
     return df
 
 
@@ -153,6 +155,7 @@ def get_dataframe_of_T_for_each_loadsource_aggregating_all_lrsegs(mdl):
 
     df = pd.DataFrame(d)
     df = df.groupby('loadsourceshortname').sum().reset_index()
-    df['loadsource'] = jeeves.loadsource.fullnames_from_shortnames(df, use_order_of_sourcetbl=False)
+    df['loadsource'] = jeeves.translate_array(df['loadsourceshortname'], tbls='TblLoadSource',
+                                              column_sequence=['loadsourceshortname', 'loadsource'])
 
     return df
\ No newline at end of file
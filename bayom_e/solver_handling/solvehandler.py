@@ -31,7 +31,7 @@ logger = logging.getLogger(__name__)
 
 class SolveHandler:
     def __init__(self, instance=None, localsolver=False, solvername=''):
-        self.jeeves = Jeeves()
+        self.jeeves = Jeeves(lazy=True)  # only a few lookup tables are needed for post-processing
 
         self.instance = instance
         self.solvername = solvername
@@ -174,7 +174,8 @@ class SolveHandler:
             merged_df = initial_solution_parse_to_dataframe(get_suffixes, solved_instance)
 
             # Add BMP full name
-            merged_df['bmpfullname'] = self.jeeves.bmp.fullnames_from_shortnames(merged_df)
+            merged_df['bmpfullname'] = self.jeeves.translate_array(merged_df['bmpshortname'], tbls='TblBmp',
+                                                                   column_sequence=['bmpshortname', 'bmpfullname'])
 
             # Add Nutrient Load information
             merged_df['original_load_N'] = pyo.value(solved_instance.original_load_expr['N'])
@@ -198,8 +199,9 @@ class SolveHandler:
                                                                                     right_on='loadsource')
 
                 # Add state abbreviations to the solution table
-                lrsegids = self.jeeves.geo.lrseg.ids_from_names(cast_formatted_df['landriversegment'])
-                cast_formatted_df['StateAbbreviation'] = self.jeeves.geo.statenames_from_lrsegids(lrsegids)
+                cast_formatted_df['StateAbbreviation'] = self.jeeves.translate_array(
+                    cast_formatted_df['landriversegment'], tbls=['TblLandRiverSegment', 'TblState'],
+                    column_sequence=['landriversegment', 'stateid', 'stateabbreviation'])
 
                 # Rename Columns
                 cast_formatted_df = cast_formatted_df.rename(index=str, columns={"landriversegment": "GeographyName"})
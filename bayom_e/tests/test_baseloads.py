@@ -0,0 +1,52 @@
+import pytest
+import pandas as pd
+
+from bayom_e.data_handling.baseloads import base_loading_table
+
+
+@pytest.fixture(scope='function')
+def tables(request):
+    return dict(TblAgency=pd.DataFrame({'agencyid': [1, 2], 'agencycode': ['nonfed', 'dod'],
+                                        'agencyfullname': ['Non-Federal', 'Department of Defense']}),
+                TblLoadSource=pd.DataFrame({'loadsourceid': [1, 2], 'loadsourceshortname': ['aop', 'soy'],
+                                            'loadsource': ['Pasture', 'Soybeans']}),
+                TblGeography=pd.DataFrame({'geographyid': [10, 20, 30], 'geographytypeid': [5, 5, 6],
+                                           'geographyname': ['N1', 'N2', 'Adams'],
+                                           'geographyfullname': ['N1 (in)', 'N2 (in)', 'Adams, PA']}),
+                TblGeographyType=pd.DataFrame({'geographytypeid': [5, 6],
+                                               'geographytypefullname': ['Land River Segment indicating if in '
+                                                                         'or out of CBWS', 'County']}),
+                TblGeographyLrSeg=pd.DataFrame({'geographyid': [10, 20, 30, 30], 'lrsegid': [1, 2, 1, 2]}),
+                TblLandRiverSegment=pd.DataFrame({'lrsegid': [1, 2], 'stateid': [1, 1], 'countyid': [10, 11]}))
+
+
+@pytest.fixture(scope='function')
+def rawdatadir(request, tmp_path):
+    pd.DataFrame({'Geography': ['N1 (in)', 'N1 (in)', 'N2 (in)', 'Adams, PA'],
+                  'LoadSource': ['Pasture', 'Soybeans', 'Pasture', 'Pasture'],
+                  'Agency': ['Non-Federal', 'Department of Defense', 'Non-Federal', 'Non-Federal'],
+                  'Sector': ['Agriculture'] * 4,
+                  '2010 No Action_Amount': [10., 4., 0., 100.],
+                  '2010 No Action_NLoadEOT': [20., 2., 5., 1000.],
+                  '2010 No Action_PLoadEOT': [1., 1., 1., 1.],
+                  '2010 No Action_SLoadEOT': [0., 0., 0., 0.]}).to_csv(str(tmp_path / 'baseloads.csv'), index=False)
+    return tmp_path
+
+
+def test_rates_are_stored_by_id_and_read_by_lrseg(tables, rawdatadir, tmp_path):
+    partitioned = base_loading_table('baseloads.csv', rawdatadir=str(rawdatadir),
+                                     partitionsdir=str(tmp_path / 'Partitioned'), sourcefingerprint='test', **tables)
+    retval = partitioned.read(lrsegids=[1]).sort_values('loadsourceid').reset_index(drop=True)
+    assert list(retval['loadsourceid']) == [1, 2]
+    assert list(retval['agencycode']) == ['nonfed', 'dod']
+    assert list(retval['eotn']) == [2.0, 0.5]
+
+    # (division by zero gives a zero rate)
+    assert list(partitioned.read(lrsegids=[2])['eotn']) == [0.0]
+
+
+def test_unknown_load_source_raises_error(tables, rawdatadir, tmp_path):
+    tables['TblLoadSource'] = tables['TblLoadSource'].iloc[:1]
+    with pytest.raises(ValueError):
+        base_loading_table('baseloads.csv', rawdatadir=str(rawdatadir),
+                           partitionsdir=str(tmp_path / 'Partitioned'), sourcefingerprint='test', **tables)
@@ -1,6 +1,10 @@
 import pytest
+import numpy as np
+import pandas as pd
 
-from bayom_e.data_handling.data_interface import get_loaded_data_handler_no_objective
+from bayom_e.data_handling.data_interface import get_loaded_data_handler_no_objective, get_dataplate
+from bayom_e.data_handling.dataplate_batch import get_dataplates
+from bayom_e.data_handling.datahandler_base import first_value_per_key
 
 
 @pytest.fixture(scope='module')
@@ -87,3 +91,59 @@ def test_default_Lrseg_DataHandler_inMontgomeryCountyMD():
 #
 #     # Verify the lrseg list is populated correctly
 #     assert county.lrsegsetlist == ['N51133RL0_6450_0000', 'N51133RL0_6530_0000', 'N51133RL0_6501_0000', 'N51133PL0_6272_0000', 'N51133PL0_6271_0000', 'N51133PL0_6270_0000', 'N51133PL0_6140_0000']
+
+
+def test_first_value_per_key_matches_groupby_apply():
+    df = pd.DataFrame({'lrseg': ['b', 'a', 'b', 'a', None, 'c'],
+                       'pltnt': ['N', 'P', 'N', 'P', 'N', 'S'],
+                       'value': [np.nan, 2.0, 3.0, 4.0, 5.0, 6.0]})
+    for keys in (['lrseg'], ['lrseg', 'pltnt']):
+        expected = df.groupby(keys)['value'].apply(lambda x: list(x)[0]).to_dict()
+        retval = first_value_per_key(df, keys, 'value')
+        assert list(retval.keys()) == list(expected.keys())
+        assert np.allclose(list(retval.values()), list(expected.values()), equal_nan=True)
+
+
+def test_batch_dataplates_match_single_geography_dataplates():
+    counties = ['Adams, PA', 'Northumberland, VA']
+    dataplates = get_dataplates('county', counties, '2010NoActionLoads_updated.csv', cache=False)
+    assert list(dataplates.keys()) == counties
+    for county in counties:
+        expected = get_dataplate('county', [county], '2010NoActionLoads_updated.csv', cache=False)
+        retval = dataplates[county]
+        assert retval.LRSEGS == expected.LRSEGS
+        assert retval.LOADSRCS == expected.LOADSRCS
+        assert retval.AGENCIES == expected.AGENCIES
+        assert retval.PARCELS == expected.PARCELS
+        assert retval.BMPSRCLINKS == expected.BMPSRCLINKS
+        assert retval.BMPGRPSRCLINKS == expected.BMPGRPSRCLINKS
+        assert (retval.eta == expected.eta) and (retval.phi == expected.phi) and (retval.alpha == expected.alpha)
+
+
+def test_unexpected_dataplate_name_raises_error():
+    with pytest.raises(ValueError):
+        get_dataplate('county', ['Adams, PA'], '2010NoActionLoads_updated.csv', name='lp')
+    with pytest.raises(ValueError):
+        get_dataplates('county', ['Adams, PA'], '2010NoActionLoads_updated.csv', name='lp')
+
+
+def test_unknown_counties_are_all_reported_in_one_error():
+    with pytest.raises(ValueError, match="Nowhere, VA.*Elsewhere, WV"):
+        get_loaded_data_handler_no_objective(geoscale='county',
+                                             geoentities=['Nowhere, VA', 'Adams, PA', 'Elsewhere, WV'],
+                                             savedata2file=False, baseloadingfilename='2010NoActionLoads_updated.csv')
+    with pytest.raises(ValueError, match="Nowhere, VA.*Elsewhere, WV"):
+        get_dataplates('county', ['Nowhere, VA', 'Adams, PA', 'Elsewhere, WV'], '2010NoActionLoads_updated.csv',
+                       cache=False)
+
+
+def test_stages_are_shared_and_timed(resource_dh_adamsPA):
+    dh = resource_dh_adamsPA
+    # The parcels and the acres available (alpha) are taken from the same (named parcels) stage
+    assert dh._joined_tables['alpha'] is dh._joined_tables['parcels']
+    assert list(dh.stage_timings)[:2] == ['base loading table', 'PLTNTS']
+    assert {'land use', 'named parcels', 'efficiencies', 'alpha'} <= set(dh.stage_timings)
+    assert all(t >= 0 for t in dh.stage_timings.values())
+
+    # A stage that has been run is not run again
+    assert dh._stage('land use', lambda: None) is dh._joined_tables['landuse']
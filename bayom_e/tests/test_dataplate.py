@@ -1,6 +1,6 @@
 import pytest
 
-from bayom_e.data_handling.data_interface import get_dataplate
+from bayom_e.data_handling.data_interface import get_dataplate, get_random_dataplate
 
 
 @pytest.fixture(scope='module')
@@ -18,3 +18,26 @@ def test_county_DataPlate_AdamsPA(nlp_dp_2010):
            ({'N42001PU0_3000_3090', 'N42001PU2_2790_3290', 'N42001PM2_2860_3040',
              'N42001PM3_3040_3340', 'N42001SL3_2460_2430', 'N42001SL3_2400_2440'} == set(retval))
 
+
+def test_subsets_merge_back_into_the_whole_dataplate():
+    dataplate = get_random_dataplate(num_lrsegs=4, num_loadsources=3)
+    first = dataplate.subset(lrsegs=dataplate.LRSEGS[:2])
+    assert first.LRSEGS == dataplate.LRSEGS[:2]
+    assert all(k[1] in first.LRSEGS for k in first.eta) and all(p[0] in first.LRSEGS for p in first.PARCELS)
+
+    retval = first.merge(dataplate.subset(lrsegs=dataplate.LRSEGS[2:]))
+    assert retval.LRSEGS == dataplate.LRSEGS
+    assert set(retval.PARCELS) == set(dataplate.PARCELS)
+    assert (retval.eta == dataplate.eta) and (retval.phi == dataplate.phi) and (retval.alpha == dataplate.alpha)
+    assert {u: set(b) for u, b in retval.BMPSRCLINKS.items()} == \
+           {u: set(b) for u, b in dataplate.BMPSRCLINKS.items()}
+
+
+def test_subset_of_loadsources():
+    dataplate = get_random_dataplate(num_lrsegs=2, num_loadsources=3)
+    loadsource = dataplate.LOADSRCS[0]
+    retval = dataplate.subset(loadsources=[loadsource])
+    assert retval.LOADSRCS == [loadsource] and retval.LRSEGS == dataplate.LRSEGS
+    assert set(retval.BMPSRCLINKS.keys()) <= {loadsource}
+    assert all(k[1] == loadsource for k in retval.alpha) and all(k[2] == loadsource for k in retval.eta)
+    assert retval.BMPS == dataplate.BMPS
@@ -0,0 +1,49 @@
+import pickle
+import pytest
+import pandas as pd
+
+from bayom_e.data_handling.data_interface import get_random_dataplate
+from bayom_e.data_handling.dataplate_arrays import ArrayDataPlate, SparseParameter
+
+
+@pytest.fixture(scope='module')
+def dataplates(request):
+    dataplate = get_random_dataplate(num_lrsegs=4, num_loadsources=3)
+    return dataplate, ArrayDataPlate.from_dataplate(dataplate)
+
+
+def test_parameters_are_read_only_dict_views(dataplates):
+    dataplate, arrays = dataplates
+    assert arrays.alpha == dataplate.alpha
+    assert arrays.phi == dataplate.phi
+    assert arrays.eta == dataplate.eta
+    assert arrays.PARCELS == dataplate.PARCELS
+    assert arrays.total_area() == pytest.approx(dataplate.total_area())
+
+    key = next(iter(dataplate.phi))
+    assert (key in arrays.phi) and (arrays.phi[key] == dataplate.phi[key])
+    assert ('missing', 'key', 'nonfed', 'N') not in arrays.phi
+    with pytest.raises(KeyError):
+        arrays.alpha['missing', 'key', 'nonfed']
+
+
+def test_roundtrip_through_pickle_and_dictionaries(dataplates):
+    dataplate, arrays = dataplates
+    retval = pickle.loads(pickle.dumps(arrays)).to_dataplate()
+    assert (retval.eta == dataplate.eta) and (retval.phi == dataplate.phi) and (retval.alpha == dataplate.alpha)
+    assert retval.LRSEGS == dataplate.LRSEGS
+
+
+def test_select_keeps_rows_for_given_members(dataplates):
+    dataplate, arrays = dataplates
+    lrsegs = dataplate.LRSEGS[1:3]
+    retval = arrays.phi.select(LRSEGS=lrsegs, PLTNTS=['N'])
+    assert retval.to_dict() == {k: v for k, v in dataplate.phi.items() if (k[0] in lrsegs) and (k[3] == 'N')}
+
+
+def test_first_value_is_kept_for_duplicate_keys():
+    df = pd.DataFrame({'bmp': ['b', 'a', 'b', None], 'value': [1.0, 2.0, 3.0, 4.0]})
+    param = SparseParameter.from_frame(df, ['bmp'], 'value', ('BMPS',), [['a', 'b']])
+    assert param.to_dict() == {'b': 1.0, 'a': 2.0}
+    indptr, rows = param.rows_by('BMPS')
+    assert list(indptr) == [0, 1, 2] and (param.codes[rows[0], 0] == 0)
@@ -0,0 +1,59 @@
+import pytest
+
+from bayom_e.data_handling.data_interface import get_random_dataplate
+from castjeeves.sqltables import TableCache
+from bayom_e.data_handling.dataplate_cache import DataplateCache, tables_version
+
+
+@pytest.fixture(scope='function')
+def rawdatadir(request, tmp_path):
+    (tmp_path / 'baseloads.csv').write_text('Geography,LoadSource\nN1,aop\n')
+    (tmp_path / 'single-ls_groups.csv').write_text('loadsourcegroupid,loadsourceid\n1,1\n')
+    return tmp_path
+
+
+def make_key(rawdatadir, **kwargs):
+    keyargs = dict(geoscale='county', geoentities=['Adams, PA'], baseloadingfilename='baseloads.csv',
+                   rawdatadir=str(rawdatadir), source_version='test')
+    keyargs.update(kwargs)
+    return DataplateCache.key(**keyargs)
+
+
+def test_dataplate_roundtrip(rawdatadir, tmp_path):
+    cache = DataplateCache(str(tmp_path / 'dataplates'))
+    key = make_key(rawdatadir)
+    assert cache.get(key) is None
+
+    dataplate = get_random_dataplate(num_lrsegs=3)
+    cache.put(key, dataplate)
+    retval = DataplateCache(str(tmp_path / 'dataplates')).get(key)
+    assert (retval.LRSEGS == dataplate.LRSEGS) and (retval.eta == dataplate.eta) and (retval.alpha == dataplate.alpha)
+
+
+def test_key_changes_with_any_input(rawdatadir):
+    key = make_key(rawdatadir)
+    assert make_key(rawdatadir) == key
+    assert make_key(rawdatadir, geoentities=['Hardy, WV']) != key
+    assert make_key(rawdatadir, baseyear='2015') != key
+    assert make_key(rawdatadir, source_version='newer') != key
+
+    (rawdatadir / 'baseloads.csv').write_text('Geography,LoadSource\nN1,soy\n')
+    assert make_key(rawdatadir) != key
+
+
+def test_unreadable_dataplate_is_treated_as_missing(rawdatadir, tmp_path):
+    cache = DataplateCache(str(tmp_path))
+    key = make_key(rawdatadir)
+    with open(cache.path(key), 'wb') as f:
+        f.write(b'not a dataplate')
+    assert cache.get(key) is None
+
+
+def test_tables_version_changes_with_csv_files_before_they_are_ingested(tmp_path):
+    (tmp_path / 'TblA.csv').write_text('a\n1\n')
+    cache = TableCache(str(tmp_path / 'cache'), fmt='pickle')
+    version = tables_version(cache, str(tmp_path), ['TblA', 'TblB'])
+    assert tables_version(cache, str(tmp_path), ['TblA', 'TblB']) == version
+
+    (tmp_path / 'TblA.csv').write_text('a\n1\n2\n')
+    assert tables_version(cache, str(tmp_path), ['TblA', 'TblB']) != version
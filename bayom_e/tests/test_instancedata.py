@@ -0,0 +1,54 @@
+import os
+import pytest
+import pandas as pd
+
+from bayom_e.data_handling.instance_data import InstanceDataWriter, read_bundle, BUNDLE_NAME
+
+
+@pytest.fixture(scope='function')
+def eta(request):
+    return pd.DataFrame({'bmpshortname': ['conplan', 'advancedgi'], 'landriversegment': ['N1', 'N2'],
+                         'effvalue': [0.25, 0.5]})
+
+
+def test_tab_files_are_written_as_before(tmp_path, eta):
+    writer = InstanceDataWriter(str(tmp_path), fileformat='tab')
+    writer.add('data_eta', eta, header=['BMPS', 'LRSEGS', 'eta'])
+    writer.add('tempETA', eta, temporary=True)
+    writer.close()
+    assert (tmp_path / 'data_eta.tab').read_text().splitlines() == ['BMPS LRSEGS eta',
+                                                                    'conplan N1 0.25',
+                                                                    'advancedgi N2 0.5']
+    assert os.path.exists(str(tmp_path / 'tempETA.csv'))
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_bundle_holds_all_tables(tmp_path, eta, background):
+    writer = InstanceDataWriter(str(tmp_path), fileformat='bundle', background=background)
+    writer.add('data_PLTNTS', pd.DataFrame({'PLTNTS': ['N', 'P', 'S']}))
+    writer.add('data_eta', eta, header=['BMPS', 'LRSEGS', 'eta'])
+    writer.add('tempETA', eta, temporary=True)
+    eta['later'] = 1  # columns added after a table is saved aren't written
+    writer.close()
+    writer.wait()
+
+    assert os.listdir(str(tmp_path)) == [BUNDLE_NAME]
+    tables = read_bundle(str(tmp_path / BUNDLE_NAME))
+    assert sorted(tables) == ['data_PLTNTS', 'data_eta']
+    assert list(tables['data_PLTNTS']['PLTNTS']) == ['N', 'P', 'S']
+    assert list(tables['data_eta'].columns) == ['BMPS', 'LRSEGS', 'eta']
+    assert list(tables['data_eta']['eta']) == [0.25, 0.5]
+
+
+def test_categorical_columns_are_stored_as_text(tmp_path, eta):
+    eta['bmpshortname'] = eta['bmpshortname'].astype('category')
+    writer = InstanceDataWriter(str(tmp_path), fileformat='bundle')
+    writer.add('data_eta', eta, header=['BMPS', 'LRSEGS', 'eta'])
+    writer.close()
+    writer.wait()
+    assert list(read_bundle(str(tmp_path / BUNDLE_NAME))['data_eta']['BMPS']) == ['conplan', 'advancedgi']
+
+
+def test_unexpected_format_raises_error(tmp_path):
+    with pytest.raises(ValueError):
+        InstanceDataWriter(str(tmp_path), fileformat='xlsx')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""
+Benchmark building the (eta-shaped) parameter dictionaries of a dataplate, comparing the
+  groupby(...).apply(lambda x: list(x)[0]).to_dict() construction that DataHandlerBase used to use
+with first_value_per_key(), for synthetic tables the size of a county-scale and a watershed-scale dataplate.
+
+Example usage command:
+    ./bin/python_scripts/benchmark_param_dicts.py --repeats 3
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from argparse import ArgumentParser
+
+from bayom_e.data_handling.datahandler_base import first_value_per_key
+
+# (number of land river segments, number of bmps, number of load sources) for each scale
+SCALES = {'county': (40, 150, 60),
+          'watershed': (2000, 150, 60)}
+KEYS = ['bmpshortname', 'landriversegment', 'loadsourceshortname', 'pltnt']
+
+
+def make_eta_table(nlrsegs, nbmps, nloadsources, density=0.02, seed=0):
+    """ A table shaped like the one _load_param_EffectivenessOfBmps() builds its dictionary from """
+    rng = np.random.default_rng(seed)
+    nrows = int(nlrsegs * nbmps * nloadsources * density)
+    df = pd.DataFrame({'bmpshortname': np.array(['bmp%d' % i for i in range(nbmps)])[rng.integers(nbmps, size=nrows)],
+                       'landriversegment': np.array(['N%05d' % i for i in range(nlrsegs)])[rng.integers(nlrsegs,
+                                                                                                     size=nrows)],
+                       'loadsourceshortname': np.array(['ls%d' % i for i in range(nloadsources)])[
+                           rng.integers(nloadsources, size=nrows)]})
+    df = pd.concat([df.assign(pltnt=p) for p in ['N', 'P', 'S']], ignore_index=True)
+    df['effvalue'] = rng.random(len(df))
+    return df
+
+
+def timed(func, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        retval = func()
+        best = min(best, time.perf_counter() - start)
+    return best, retval
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-r", "--repeats", dest="repeats", default=1, type=int,
+                        help="number of times each construction is timed (the best time is reported)")
+    opts = parser.parse_args()
+
+    for scale, sizes in SCALES.items():
+        df = make_eta_table(*sizes)
+        groupby_time, expected = timed(lambda: df.groupby(KEYS)['effvalue'].apply(lambda x: list(x)[0]).to_dict(),
+                                       opts.repeats)
+        vectorized_time, retval = timed(lambda: first_value_per_key(df, KEYS, 'effvalue'), opts.repeats)
+        assert retval == expected
+
+        print('%s scale (%d rows, %d keys): groupby-apply %.3f s, first_value_per_key %.3f s (%.1fx faster)'
+              % (scale, len(df), len(retval), groupby_time, vectorized_time, groupby_time / vectorized_time))
+
+
+if __name__ == '__main__':
+    main()
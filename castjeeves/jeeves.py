@@ -3,18 +3,31 @@
 
 # Generic/Built-in
 import os
+import time
+import getpass
 import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 # Computation
-import pickle
 import numpy as np
 import pandas as pd
 
 # BAYOTA
-from bayota_settings.base import get_source_pickles_dir, get_source_csvs_dir, get_metadata_csvs_dir
+from bayota_settings.base import version, get_source_pickles_dir, get_source_csvs_dir, get_metadata_csvs_dir
 
 from castjeeves.sqltables import SourceData
 from castjeeves.sqltables import Metadata as sqlMetaData
+from castjeeves.sqltables import TableCache
+from castjeeves.sqltables.TableCache import file_fingerprint
+from castjeeves.sqltables import TableCatalog
+from castjeeves.sqltables.TableCatalog import CATALOG_NAME
+from castjeeves.sqltables import SharedTableStore
+from castjeeves.sqltables import SharedCategories
+from castjeeves.sqltables import PartitionedTable
+from castjeeves.sqltables import QueryEngine
+from castjeeves.sqltables.QueryEngine import default_backend as default_query_backend
 
 from castjeeves.sourcehooks import Agency
 from castjeeves.sourcehooks import Animal
@@ -27,15 +40,24 @@ from castjeeves.sourcehooks import Meta
 from castjeeves.sourcehooks import Scenario
 from castjeeves.sourcehooks import Sector
 from castjeeves.sourcehooks import Translator
+from castjeeves.sourcehooks.indexes import chained_translation_index_for, translate_array_along
 
 logger = logging.getLogger(__name__)
 
+SHARED_ENV_VARIABLE = 'BAYOTA_SHARED_SOURCE_DATA'
+DEFAULT_INGEST_WORKERS = min(8, os.cpu_count() or 1)
+# Large tables that are also stored partitioned by state and county, see Jeeves.source_table_for_lrsegs().
+PARTITIONED_TABLES = ('TblBmpEfficiency', 'TblLandUsePreBmp')
+
 
 class Jeeves:
     """ This class provides a framework for querying the CAST source data files.
 
     Access to parts of the source data is split among hopefully-intuitive groupings.
 
+    The sourcehooks don't modify the source tables (or their arguments), so one Jeeves object
+    (and its one in-memory copy of the tables) can serve queries from a thread pool.
+
     Attributes:
         agency ():
         animal ():
@@ -50,10 +72,43 @@ class Jeeves:
         translator ():
         source (str): Description of `attr1`.
         metadata_tables (:obj:`int`, optional): Description of `attr2`.
+
+    Args:
+        lazy (bool): If True, each table is only read from disk the first time it is accessed. Defaults to False.
+        max_loaded_tables (int): In lazy mode, the least recently used tables are released from memory
+            once more than this number of them are loaded (they're re-read if needed). Defaults to None (no limit).
+        shared (bool): If True, tables are attached read-only from a node-local shared memory store, so that
+            concurrent processes on one node share a single copy of the source data. Requires pyarrow.
+            Defaults to the value of the BAYOTA_SHARED_SOURCE_DATA environment variable (or False if unset).
+        categorical (bool): If True, the name columns that tables are merged on (bmpshortname, loadsourceshortname,
+            landriversegment, agencycode, geographyfullname) are encoded as categoricals, with one shared dictionary
+            per column, so merges become integer joins. Defaults to False.
+        workers (int): Number of threads used to read (or, on a cache miss, ingest from csv) the tables concurrently,
+            so a cold start takes about as long as the largest table rather than the sum of all of them.
+            Use 1 to read them one at a time. Defaults to min(8, number of cpus).
+        csv_engine (str): pandas.read_csv engine used when ingesting csv files, e.g. 'pyarrow' (which is itself
+            multithreaded). Defaults to None (the pandas default parser).
+        sql_backend (str): If specified ('duckdb', 'sqlite' or 'auto'), some multi-table sourcehook queries are run
+            as joins in an embedded, file-backed SQL database instead of chains of pandas merges (see QueryEngine).
+            'auto' uses the default backend, sqlite, whose database file any number of processes can share.
+            Defaults to None (pandas only).
+        read_only (bool): If True, the source and metadata tables are flagged read-only (see TableLoader.setReadOnly),
+            so callers can use them without defensive copies; any attempt to modify one in place raises an error.
+            Defaults to False.
     """
-    def __init__(self):
-        self.source = self.loadInSourceDataFromSQL()
-        self.metadata_tables = self.loadInMetaDataFromSQL()
+    def __init__(self, lazy=False, max_loaded_tables=None, shared=None, categorical=False,
+                 workers=None, csv_engine=None, sql_backend=None, read_only=False):
+        if shared is None:
+            shared = os.environ.get(SHARED_ENV_VARIABLE, '').lower() in ('1', 'true', 'yes')
+
+        self.source = self.loadInSourceDataFromSQL(lazy=lazy, max_loaded_tables=max_loaded_tables,
+                                                   shared=shared, categorical=categorical,
+                                                   workers=workers, csv_engine=csv_engine)
+        self.metadata_tables = self.loadInMetaDataFromSQL(lazy=lazy, max_loaded_tables=max_loaded_tables,
+                                                          shared=shared, workers=workers, csv_engine=csv_engine)
+        if read_only:
+            self.source.setReadOnly()
+            self.metadata_tables.setReadOnly()
 
         self.agency = Agency(sourcedata=self.source)
         self.animal = Animal(sourcedata=self.source)
@@ -67,72 +122,324 @@ class Jeeves:
         self.sector = Sector(sourcedata=self.source)
         self.translator = Translator(sourcedata=self.source)
 
+        self._partitioned_tables = {}
+        self._partitioned_tables_lock = threading.Lock()
+
+        self.engine = None
+        if sql_backend is not None:
+            self.engine = self._queryEngine(self.source, backend=None if sql_backend == 'auto' else sql_backend)
+            for hook in (self.agency, self.animal, self.bmp, self.county, self.geo, self.loadsource, self.lrseg,
+                         self.meta, self.scenario, self.sector, self.translator):
+                hook.engine = self.engine
+
+    @staticmethod
+    def _queryEngine(sourcedata, backend=None, enginedir=None):
+        """Opens the embedded SQL database for the source data, which is filled with tables as queries need them
+
+        Its file name includes a fingerprint of the cached tables, so a refreshed csv extract gets a new database.
+        """
+        if enginedir is None:
+            enginedir = os.path.join(get_source_pickles_dir(), 'QueryEngine')
+        fingerprint = TableCache(os.path.join(get_source_pickles_dir(), 'SourceData')).fingerprint(
+            sourcedata.getTblList())
+        backend = default_query_backend() if backend is None else backend
+        return QueryEngine(os.path.join(enginedir, 'SourceData_%s.%s' % (fingerprint, backend)),
+                           reader=partial(getattr, sourcedata), backend=backend)
+
+    def translate_array(self, values, tbls, column_sequence, fill_value=None):
+        """ Translate a whole column of values at once, e.g. the bmp short names in a solution table to full names
+
+        Args:
+            values (list, numpy.ndarray, pd.Series, or pd.Categorical): the values to translate
+            tbls (str or list of str): name(s) of the source table(s) used for each step of the translation
+            column_sequence (list of str): the column to translate FROM, then the column each step translates TO
+            fill_value: value to use where a value isn't found. If None (the default), a KeyError is raised instead.
+
+        Note:
+            len(tbls) must be one less than len(column_sequence)
+
+        Returns:
+            numpy.ndarray with the same length and order as 'values'
+
+        Example:
+            translate_array(df['landriversegment'], tbls=['TblLandRiverSegment', 'TblState'],
+                            column_sequence=['landriversegment', 'stateid', 'stateabbreviation'])
+        """
+        if isinstance(tbls, str):
+            tbls = [tbls]
+        assert len(column_sequence) == (len(tbls) + 1)
+
+        index = chained_translation_index_for(self.source, tbls, column_sequence)
+        return translate_array_along([index], values, fill_value=fill_value)
+
+    def source_table_for_lrsegs(self, tblName, lrsegids, columns=None):
+        """ The rows of a large source table for only some land river segments, e.g. for a single-county study
+
+        TblBmpEfficiency and TblLandUsePreBmp are stored partitioned by state and county, so that only the
+        partitions for the requested lrsegids are read (and the full table needn't be loaded, in lazy mode).
+        The partitions are generated from the full table the first time they are needed, and again whenever
+        the cached table (or TblLandRiverSegment) changes.
+
+        Args:
+            tblName (str): name of the source table, one of PARTITIONED_TABLES
+            lrsegids (list of int): land river segment ids
+            columns (list of str): if specified, only these columns are read
+
+        Returns:
+            pd.DataFrame with the table's rows for those lrsegids
+        """
+        if tblName not in PARTITIONED_TABLES:
+            raise ValueError(f"<{tblName}> is not stored partitioned; expected one of {PARTITIONED_TABLES}")
+        with self._partitioned_tables_lock:
+            if tblName not in self._partitioned_tables:
+                self._partitioned_tables[tblName] = self._partitionedTable(self.source, tblName)
+        return self._partitioned_tables[tblName].read(lrsegids=lrsegids, columns=columns)
+
+    @staticmethod
+    def _partitionedTable(sourcedata, tblName, partitionsdir=None):
+        """Gets the PartitionedTable for a source table, populating it from the full table if needed
+
+        Its directory name includes a fingerprint of the cached tables it's generated from,
+        so a refreshed csv extract gets new partitions.
+        """
+        if partitionsdir is None:
+            partitionsdir = os.path.join(get_source_pickles_dir(), 'Partitioned')
+        fingerprint = TableCache(os.path.join(get_source_pickles_dir(), 'SourceData')).fingerprint(
+            [tblName, 'TblLandRiverSegment'])
+        partitioned = PartitionedTable(os.path.join(partitionsdir, '%s_%s' % (tblName, fingerprint)))
+        if not partitioned.is_populated():
+            logger.info('<%s table is not partitioned yet. Generating...>' % tblName)
+            wasloaded = sourcedata.isLoaded(tblName)
+            os.makedirs(partitionsdir, exist_ok=True)
+            partitioned.populate(getattr(sourcedata, tblName), sourcedata.TblLandRiverSegment)
+            if not wasloaded:
+                sourcedata.releaseTable(tblName)  # (lazy mode) the full table is only needed to generate the partitions
+        return partitioned
+
     @classmethod
-    def loadInSourceDataFromSQL(cls):
-        """Loads in the source data from a pickle object,
-        or if it doesn't exist, makes a pickle file from the csv files.
+    def loadInSourceDataFromSQL(cls, tables=None, lazy=False, max_loaded_tables=None, shared=False,
+                                categorical=False, workers=None, csv_engine=None):
+        """Loads in the source data from the per-table cache,
+        or if a table isn't cached yet, reads it from its csv file and adds it to the cache.
+
+        Args:
+            tables (list of str): names of the tables to load. Defaults to all of the SourceData tables.
+            lazy (bool): If True, tables are not loaded now, but instead the first time each one is accessed.
+            max_loaded_tables (int): (lazy mode only) maximum number of tables to hold in memory at once.
+            shared (bool): If True, tables are attached (read-only) from a node-local shared memory store.
+            categorical (bool): If True, name columns are encoded as categoricals with shared dictionaries.
+            workers (int): number of threads used to read/ingest tables concurrently. Defaults to min(8, ncpus).
+            csv_engine (str): pandas.read_csv engine used when ingesting csv files (e.g. 'pyarrow').
 
         Returns:
             a SourceData object
         """
-        savename = os.path.join(get_source_pickles_dir(), 'SourceData.obj')
-        if os.path.exists(savename):
-            with open(savename, 'rb') as f:
-                sourcedata = pickle.load(f)
-        else:
-            logger.info('<%s object does not exist yet. Generating...>' % SourceData.__name__)
-            # Source tables are loaded.
-            sourcedata = SourceData()
-            tbllist = sourcedata.getTblList()
-            for tblName in tbllist:
-                # for tblName in tbllist:
-                # print("loading source:", tblName)
-                df = cls.loadDataframe(tblName, get_source_csvs_dir())
-                sourcedata.addTable(tblName, df)
-
-            with open(savename, 'wb') as f:
-                pickle.dump(sourcedata, f)
-
+        sourcedata = SourceData()
+        cls._populateTableLoader(sourcedata, 'SourceData', get_source_csvs_dir(), tables=tables,
+                                 lazy=lazy, max_loaded_tables=max_loaded_tables, shared=shared,
+                                 categorical=categorical, workers=workers, csv_engine=csv_engine)
         return sourcedata
 
     @classmethod
-    def loadInMetaDataFromSQL(cls):
-        """Loads in the metadata from a pickle object,
-        or if it doesn't exist, makes a pickle file from the csv files.
+    def loadInMetaDataFromSQL(cls, tables=None, lazy=False, max_loaded_tables=None, shared=False,
+                              workers=None, csv_engine=None):
+        """Loads in the metadata from the per-table cache,
+        or if a table isn't cached yet, reads it from its csv file and adds it to the cache.
+
+        Args:
+            tables (list of str): names of the tables to load. Defaults to all of the Metadata tables.
+            lazy (bool): If True, tables are not loaded now, but instead the first time each one is accessed.
+            max_loaded_tables (int): (lazy mode only) maximum number of tables to hold in memory at once.
+            shared (bool): If True, tables are attached (read-only) from a node-local shared memory store.
+            workers (int): number of threads used to read/ingest tables concurrently. Defaults to min(8, ncpus).
+            csv_engine (str): pandas.read_csv engine used when ingesting csv files (e.g. 'pyarrow').
 
         Returns:
             a sqlMetaData object
         """
-        savename = os.path.join(get_source_pickles_dir(), 'MetaData.obj')
-        if os.path.exists(savename):
-            with open(savename, 'rb') as f:
-                metadata = pickle.load(f)
+        metadata = sqlMetaData()
+        cls._populateTableLoader(metadata, 'MetaData', get_metadata_csvs_dir(), tables=tables,
+                                 lazy=lazy, max_loaded_tables=max_loaded_tables, shared=shared,
+                                 workers=workers, csv_engine=csv_engine)
+        return metadata
+
+    @classmethod
+    def _populateTableLoader(cls, tableloader, cachename, csvdir, tables=None,
+                             lazy=False, max_loaded_tables=None, shared=False, categorical=False,
+                             workers=None, csv_engine=None):
+        """Sets up where a TableLoader (SourceData or Metadata) gets its tables from, and (unless lazy) loads them
+
+        Args:
+            tableloader (TableLoader): the object to which tables are added
+            cachename (str): name of the per-table cache directory (and of the shared memory store)
+            csvdir (str): directory with the csv files, used for tables that aren't cached yet
+            tables (list of str): names of the tables to load. Defaults to all of the tableloader's tables.
+            lazy (bool): If True, tables are read the first time each one is accessed.
+            max_loaded_tables (int): (lazy mode only) maximum number of tables to hold in memory at once.
+            shared (bool): If True, tables are attached from a node-local shared memory store,
+                which is populated from the per-table cache by the first process that needs it.
+            categorical (bool): If True, name columns are encoded as categoricals, with the dictionaries
+                taken from the master tables (see SharedCategories).
+            workers (int): number of threads used to read/ingest tables concurrently. Defaults to min(8, ncpus).
+            csv_engine (str): pandas.read_csv engine used when ingesting csv files (e.g. 'pyarrow').
+        """
+        cache = TableCache(os.path.join(get_source_pickles_dir(), cachename))
+        reader = partial(cls._readTable, cache, csvdir, engine=csv_engine)
+
+        if shared:
+            # The store's name includes a fingerprint of the cached tables, so a refreshed csv extract gets a new store.
+            cls._refreshCache(cache, csvdir, tableloader.getTblList(), workers=workers, engine=csv_engine)
+            store = SharedTableStore(cls._sharedStoreName(cachename, cache.fingerprint(tableloader.getTblList())))
+            if not store.is_populated():
+                store.populate(reader, tableloader.getTblList())
+                # Stores of earlier code versions or extracts would otherwise be left in (RAM-backed) shared memory.
+                store.clear_superseded(cls._sharedStoreName(cachename, '*', version='*'))
+            reader = store.read_table
+
+        if categorical:
+            # Tables are cached (and shared) as they are, and only encoded once they've been read.
+            reader = partial(cls._readEncodedTable, reader, SharedCategories.from_master_tables(reader))
+
+        if lazy:
+            tableloader.setTableReader(reader, maxLoadedTables=max_loaded_tables)
         else:
-            logger.info('<%s object does not exist yet. Generating...>' % sqlMetaData.__name__)
-            # Source tables are loaded.
-            metadata = sqlMetaData()
-            tbllist = metadata.getTblList()
-            for tblName in tbllist:
-                # for tblName in tbllist:
-                # print("loading source:", tblName)
-                df = cls.loadDataframe(tblName, get_metadata_csvs_dir())
-                metadata.addTable(tblName, df)
-
-            with open(savename, 'wb') as f:
-                pickle.dump(metadata, f)
+            start = time.perf_counter()
+            timings = cls._loadTables(tableloader, reader, tables=tables, workers=workers)
+            logger.info('<%s: loaded %d tables in %.2f s (slowest: %s)>'
+                        % (cachename, len(timings), time.perf_counter() - start,
+                           ', '.join('%s %.2f s' % (t, timings[t])
+                                     for t in sorted(timings, key=timings.get, reverse=True)[:3])))
 
-        return metadata
+    @staticmethod
+    def _sharedStoreName(cachename, fingerprint, version=version):
+        """ Shared memory stores are specific to a user, code version, and version of the cached tables """
+        return 'bayota_%s_%s_%s_%s' % (version, getpass.getuser(), cachename, fingerprint)
+
+    @classmethod
+    def refreshTableCaches(cls, workers=None, csv_engine=None):
+        """Regenerates the cached source and metadata tables whose csv files have changed (and only those)
+
+        Args:
+            workers (int): number of threads used to ingest tables concurrently. Defaults to min(8, ncpus).
+            csv_engine (str): pandas.read_csv engine used when ingesting csv files (e.g. 'pyarrow').
+
+        Returns:
+            list of str: names of the tables that were regenerated
+        """
+        refreshed = cls._refreshCache(TableCache(os.path.join(get_source_pickles_dir(), 'SourceData')),
+                                      get_source_csvs_dir(), SourceData().getTblList(),
+                                      workers=workers, engine=csv_engine)
+        refreshed += cls._refreshCache(TableCache(os.path.join(get_source_pickles_dir(), 'MetaData')),
+                                       get_metadata_csvs_dir(), sqlMetaData().getTblList(),
+                                       workers=workers, engine=csv_engine)
+        return refreshed
+
+    @classmethod
+    def _refreshCache(cls, cache, csvdir, tblNames, workers=None, engine=None):
+        """Regenerates the tables in a TableCache that are missing or whose csv files have changed
+
+        Returns:
+            list of str: names of the tables that were regenerated
+        """
+        refreshed = [tblName for tblName in tblNames
+                     if not cache.is_current(tblName, os.path.join(csvdir, tblName + ".csv"))]
+        timings = {tblName: seconds for tblName, _, seconds in
+                   cls._mapTables(partial(cls._ingestTable, cache, csvdir, engine=engine), refreshed, workers)}
+        for tblName in refreshed:
+            logger.info('<%s table ingested in %.2f s>' % (tblName, timings[tblName]))
+        return refreshed
+
+    @classmethod
+    def _loadTables(cls, tableloader, reader, tables=None, workers=None):
+        """Adds tables to a TableLoader (SourceData or Metadata), reading them concurrently
+
+        Args:
+            tableloader (TableLoader): the object to which tables are added
+            reader (callable): called as reader(tblName), and returns that table as a pandas.DataFrame
+            tables (list of str): names of the tables to load. Defaults to all of the tableloader's tables.
+            workers (int): number of threads used to read tables concurrently. Defaults to min(8, ncpus).
+
+        Returns:
+            dict: {tblName: seconds taken to read that table}
+        """
+        tbllist = tableloader.getTblList() if tables is None else tables
+        timings = {}
+        # Tables are added from this thread only; the TableLoader itself isn't guarded against concurrent writes.
+        for tblName, df, seconds in cls._mapTables(reader, tbllist, workers):
+            tableloader.addTable(tblName, df)
+            timings[tblName] = seconds
+            logger.debug('<%s table read in %.2f s>' % (tblName, seconds))
+        return timings
+
+    @staticmethod
+    def _mapTables(func, tblNames, workers=None):
+        """Calls func(tblName) for each table, using a pool of threads if workers > 1
+
+        Reading csv, feather and pickle files spends most of its time in C code that releases the GIL,
+        so threads are enough to read tables in parallel without copying them between processes.
+
+        Yields:
+            tuples of (tblName, func(tblName), seconds taken), in the same order as tblNames
+        """
+        def timed(tblName):
+            start = time.perf_counter()
+            retval = func(tblName)
+            return tblName, retval, time.perf_counter() - start
+
+        workers = DEFAULT_INGEST_WORKERS if workers is None else workers
+        if (workers <= 1) or (len(tblNames) <= 1):
+            for tblName in tblNames:
+                yield timed(tblName)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(tblNames))) as executor:
+            yield from executor.map(timed, tblNames)
+
+    @classmethod
+    def _readTable(cls, cache, csvdir, tblName, engine=None):
+        """Reads one table from a TableCache, or from its csv file (adding it to the cache)
+        if it isn't cached yet or the csv file has changed since it was cached
+        """
+        if cache.is_current(tblName, os.path.join(csvdir, tblName + ".csv")):
+            return cache.read_table(tblName)
+        return cls._ingestTable(cache, csvdir, tblName, engine=engine)
+
+    @staticmethod
+    def _readEncodedTable(reader, categories, tblName):
+        """Reads one table with a reader, and encodes its name columns as shared categoricals
+        """
+        return categories.encode(reader(tblName), tblName)
+
+    @classmethod
+    def _ingestTable(cls, cache, csvdir, tblName, engine=None):
+        """Reads one table from its csv file and (re)writes it to a TableCache, along with the csv's fingerprint
+        """
+        csvpath = os.path.join(csvdir, tblName + ".csv")
+        if cache.has_table(tblName):
+            logger.info('<%s table has changed since it was cached. Regenerating...>' % tblName)
+        else:
+            logger.info('<%s table is not cached yet. Generating...>' % tblName)
+        fingerprint = file_fingerprint(csvpath)
+        # Dtypes profiled by the catalog (see sourcetable_explorer.py) are used instead of being inferred again.
+        dtypes = TableCatalog(os.path.join(cache.cachedir, CATALOG_NAME)).csv_dtypes(tblName, csvpath)
+        df = cls.loadDataframe(tblName, csvdir, engine=engine, dtypes=dtypes)
+        cache.write_table(tblName, df, source=fingerprint)
+        return df
 
     @staticmethod
-    def loadDataframe(tblName, loc):
-        """ """
-        dtype_dict = {}
+    def loadDataframe(tblName, loc, categories=None, engine=None, dtypes=None):
+        """ Reads one table from its csv file (optionally encoding name columns with a SharedCategories object)
+
+        The pandas.read_csv engine can be chosen with 'engine', e.g. 'pyarrow' for a multithreaded parser.
+        Known column dtypes (by csv header name, e.g. from a TableCatalog) can be given with 'dtypes'.
+        """
+        dtype_dict = dict(dtypes) if dtypes else {}
         if tblName == "ImpBmpSubmittedManureTransport":
             dtype_dict["fipsfrom"] = np.str
 
         fileLocation = os.path.join(loc, tblName + ".csv")
 
-        df = pd.read_csv(fileLocation, dtype=dtype_dict, encoding="utf-8")
+        df = pd.read_csv(fileLocation, dtype=dtype_dict, encoding="utf-8", engine=engine)
 
         # Added by DEKAUFMAN to read csv in chunks instead of all at once
         # tp = pd.read_csv(fileLocation, header=None, encoding="utf-8", chunksize=500000)
@@ -142,4 +449,7 @@ class Jeeves:
 
         if tblName == "TblBmpGroup":
             df["ruleset"] = df["ruleset"].astype(str).str.lower()
+
+        if categories is not None:
+            df = categories.encode(df, tblName)
         return df
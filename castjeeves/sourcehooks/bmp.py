@@ -58,6 +58,9 @@ class Bmp(SourceHook):
 
     # Methods to append BMPids to loadsource tables
     def append_animal_bmpids(self, SourceCountyAgencyIDtable=None, baseconditionid=None):
+        if self.engine is not None:
+            return self._append_animal_bmpids_sql(SourceCountyAgencyIDtable, baseconditionid)
+
         TblAnimalPopulation = self.source.TblAnimalPopulation
         TblAnimalGroupAnimal = self.source.TblAnimalGroupAnimal
         TblBmp = self.source.TblBmp
@@ -106,12 +109,45 @@ class Bmp(SourceHook):
 
         return tblsubset
 
+    def _append_animal_bmpids_sql(self, SourceCountyAgencyIDtable, baseconditionid):
+        """ The same query, run as a single join by the embedded SQL engine
+
+        Note: rows may be in a different order than from the pandas version.
+        """
+        popcolumns = ['baseconditionid', 'countyid', 'loadsourceid', 'animalid', 'animalcount', 'animalunits']
+        sca_table = SourceCountyAgencyIDtable.copy()
+        sca_table.loc[:, 'baseconditionid'] = int(baseconditionid['baseconditionid'])
+        joincols = [c for c in sca_table.columns if c in popcolumns]
+        extracols = [c for c in sca_table.columns if c not in popcolumns]
+
+        # For Animals, only the NONFED agency matters.
+        # BMPs are associated with AnimalGroupIDs not AnimalIDs, but
+        # !! Use the table assumption that animalgroupid is equal to animalid for each individual animal !!
+        sql = f"""
+            SELECT g.loadsourcegroupid, p.bmpid,
+                   {', '.join('p.' + c for c in popcolumns if c != 'loadsourceid')}
+                   {''.join(', p.' + c for c in extracols)}
+            FROM (SELECT DISTINCT bag.bmpid, {', '.join('ap.' + c for c in popcolumns)}
+                                  {''.join(', sca.' + c for c in extracols)}
+                  FROM TblAnimalPopulation AS ap
+                  JOIN sca ON {' AND '.join(f'ap.{c} = sca.{c}' for c in joincols)}
+                  JOIN TblBmpAnimalGroup AS bag ON bag.animalgroupid = ap.animalid
+                  JOIN TblBmp AS b ON b.bmpid = bag.bmpid
+                  JOIN TblBmpType AS bt ON bt.bmptypeid = b.bmptypeid
+                  WHERE bt.bmptype = 'Animal Manure'
+                    AND sca.agencyid IN (SELECT agencyid FROM TblAgency WHERE agencycode = 'NONFED')) AS p
+            JOIN TblLoadSourceGroupLoadSource AS g ON g.loadsourceid = p.loadsourceid
+        """
+        return self.engine.query(sql, tables=['TblAnimalPopulation', 'TblBmpAnimalGroup', 'TblBmp', 'TblBmpType',
+                                              'TblAgency', 'TblLoadSourceGroupLoadSource'],
+                                 sca=sca_table)
+
     def append_land_bmpids(self, table_with_loadsourceids):
         TblBmpLoadSourceFromTo = self.source.TblBmpLoadSourceFromTo
 
-        TblBmpLoadSourceFromTo.rename(columns={'fromloadsourceid': 'loadsourceid'}, inplace=True)
-        columnmask = ['bmpid', 'loadsourceid']
-        tblsubset = TblBmpLoadSourceFromTo.loc[:, columnmask].merge(table_with_loadsourceids, how='inner')
+        columnmask = ['bmpid', 'fromloadsourceid']
+        tblsubset = TblBmpLoadSourceFromTo.loc[:, columnmask].rename(columns={'fromloadsourceid': 'loadsourceid'})
+        tblsubset = tblsubset.merge(table_with_loadsourceids, how='inner')
 
         return tblsubset
 
@@ -227,10 +263,10 @@ class Bmp(SourceHook):
     def appendBmpType_to_table_with_bmpshortnames(self, bmpshortnamestable):
         TblBmp = self.source.TblBmp
 
-        bmpshortnamestable.rename(columns={'BmpShortname': 'bmpshortname'}, inplace=True)
+        shortnames = bmpshortnamestable.rename(columns={'BmpShortname': 'bmpshortname'})
 
         columnmask = ['bmpshortname', 'bmpid']
-        tblsubset = TblBmp.loc[:, columnmask].merge(bmpshortnamestable, how='inner')
+        tblsubset = TblBmp.loc[:, columnmask].merge(shortnames, how='inner')
 
         tblsubset = self.appendBmpType_to_table_with_bmpid(tblsubset)
         tblsubset.drop(['bmpid'], axis=1, inplace=True)
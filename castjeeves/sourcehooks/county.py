@@ -50,33 +50,44 @@ class County(SourceHook):
                             % countystatestrs).with_traceback(e.__traceback__)
 
     def countyid_from_countystatestrs(self, getfrom=None, astype=None, append=False):
-        TblCounty = self.source.TblCounty  # get relevant source data
+        """ County ids of "County, ST" names, in the order given (names that aren't found are left out)
 
-        rowmask = self.validate_countystatestrs(getfrom)
-        rowmask['countyname'] = rowmask['countyname'].str.lower()
-        columnmask = ['countyid', 'countyname', 'stateabbreviation']
-        subtbl = TblCounty.loc[:, columnmask]
-        subtbl['countyname'] = subtbl['countyname'].str.lower()
-        countyids = subtbl.merge(rowmask, how='inner').loc[:, 'countyid']
+        Names are matched regardless of case and spacing (e.g. 'adams,  pa'), and aliases such as
+        'Washington, DC' are accepted (see castjeeves.sourcehooks.indexes.GEOGRAPHY_NAME_ALIASES).
+        """
+        if not isinstance(getfrom, (list, pd.Series)):
+            raise TypeError(f"unexpected type <{type(getfrom)}>")
+
+        resolver = self._geography_name_resolver()
+        positions = resolver.county_positions(getfrom)
+        countyids = pd.Series(resolver.countyids[positions[positions >= 0]], name='countyid')
 
         if isinstance(getfrom, list):
             countyids = countyids.tolist()
-        elif isinstance(getfrom, pd.Series):
-            pass
-        else:
-            raise TypeError(f"unexpected type <{type(getfrom)}>")
 
         if astype:
             return self.type_convert(orig=countyids, astype=astype)
         else:
             return countyids
 
+    def resolve_countystatestrs(self, countystatestrs) -> pd.DataFrame:
+        """ The county id and name (as it is in the source tables) of each "County, ST" name
+
+        Raises:
+            ValueError: listing all of the names that aren't counties
+        """
+        resolver = self._geography_name_resolver()
+        positions = resolver.resolved_county_positions(countystatestrs)
+        return pd.DataFrame({'countyid': resolver.countyids[positions],
+                             'countystatestr': resolver.countystatestrs[positions]})
+
     def add_lrsegs_to_counties(self, countystatestrs=None):
-        countyids = self.countyid_from_countystatestrs(getfrom=countystatestrs)
-        strnospaces = [''.join(x.split(', ')).replace(" ", "") for x in countystatestrs]
+        """ The land river segments of each of the counties, with the county id and ('CountyST') name
 
-        df = pd.DataFrame(countyids, columns=['countyid'])
-        df['countystatestr'] = strnospaces
+        Raises:
+            ValueError: listing all of the names that aren't counties (see resolve_countystatestrs())
+        """
+        df = self.resolve_countystatestrs(countystatestrs)
+        df['countystatestr'] = [''.join(x.split(', ')).replace(" ", "") for x in df['countystatestr']]
 
         return self.lrseg.append_lrsegs_to_counties(tablewithcountyids=df)
-
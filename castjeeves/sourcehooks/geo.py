@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import warnings
 
@@ -77,17 +78,7 @@ class Geo(SourceHook):
 
     def geonames_from_lrsegid(self, lrsegids=None):
         geotypeid_to = self.geotypeid_from_geotypename(['Land River Segment indicating if in or out of CBWS'])[0]
-        lrsegid_df = pd.DataFrame(list(zip(lrsegids, [geotypeid_to]*len(lrsegids))),
-                                  columns=['lrsegid', 'geographytypeid'])
-
-        lrsegid_df = self.append_column_to_table(df_to_append_to=lrsegid_df,
-                                                 sourcetbl='TblGeographyLrSeg',
-                                                 commoncol='lrsegid',
-                                                 appendcol='geographyid')
-
-        include_cols = ['geographytypeid', 'geographyid', 'geographyfullname']
-        geo_df = self.source.TblGeography.loc[:, include_cols].merge(lrsegid_df, how='inner')
-        return geo_df.loc[:, 'geographyfullname'].tolist()
+        return self._geography_hierarchy().geographyfullnames_of_lrsegs(lrsegids, geographytypeid=geotypeid_to)
 
     def lrsegids_from(self, lrsegnames=None, countystatestrs=None, countyid=None):
         kwargs = (lrsegnames, countystatestrs, countyid)
@@ -123,6 +114,10 @@ class Geo(SourceHook):
         return self.__lrsegids_from_countyid(getfrom=countyids, todict=True)
 
     def __lrsegids_from_countyid(self, getfrom=None, todict=True, flatten_to_set=False):
+        if todict and (not flatten_to_set) and (not isinstance(getfrom, str)):
+            if isinstance(getfrom, pd.DataFrame):
+                getfrom = getfrom['countyid']
+            return self._geography_hierarchy().lrsegids_of_counties(getfrom)
         return self._map_using_sourcetbl(getfrom, tbl='TblLandRiverSegment',
                                          fromcol='countyid', tocol='lrsegid',
                                          todict=todict, flatten_to_set=flatten_to_set)
@@ -131,12 +126,22 @@ class Geo(SourceHook):
         if scale == 'County':
             return self.lrsegids_from(countystatestrs=areanames)
         elif scale == "Land River Segment indicating if in or out of CBWS":
-            segstrlist = [x.split("-")[1].split("(")[0] for x in areanames]
-            return self.singleconvert(sourcetbl='TblLandRiverSegment',
-                                      toandfromheaders=['lrsegid', 'landriversegment'],
-                                      fromtable=self.forceToSingleColumnDataFrame(segstrlist,
-                                                                                  colname='landriversegment'),
-                                      toname='lrsegid')
+            resolver = self._geography_name_resolver()
+            positions = resolver.lrseg_positions(areanames)
+            return pd.DataFrame({'lrsegid': resolver.lrsegids[np.sort(positions[positions >= 0])]})
+        else:
+            raise ValueError('The specified scale ("%s") is unsupported' % scale)
+
+    def resolve_geographies(self, scale='', areanames=None):
+        """ Ids of county ("County, ST") or land river segment names, in the order given
+
+        Raises:
+            ValueError: listing all of the names that couldn't be resolved (instead of leaving them out)
+        """
+        if scale == 'County':
+            return self.county.resolve_countystatestrs(areanames)['countyid'].tolist()
+        elif scale in ('Land River Segment', "Land River Segment indicating if in or out of CBWS"):
+            return self._geography_name_resolver().resolve_lrsegs(areanames).tolist()
         else:
             raise ValueError('The specified scale ("%s") is unsupported' % scale)
 
@@ -0,0 +1,440 @@
+""" Prebuilt lookup structures over the source tables, built once per SourceData object
+"""
+
+# Generic/Built-in
+import weakref
+import threading
+from functools import partial
+
+# Computation
+import numpy as np
+import pandas as pd
+
+
+class TranslationIndex:
+    """ A prebuilt mapping from the values in one column of a source table to the values in another column
+
+    Attributes:
+        fromcol (str): name of the column that has values to convert FROM
+        tocol (str): name of the column that has values to convert TO
+        series (pd.Series): the 'tocol' values, indexed by the 'fromcol' values
+        has_duplicates (bool): whether any 'fromcol' value maps to more than one row
+        pairs (pd.DataFrame): the ['tocol', 'fromcol'] columns of the source table, used for merges
+
+    """
+    def __init__(self, sourcetable, fromcol, tocol):
+        self.fromcol = fromcol
+        self.tocol = tocol
+        self.pairs = sourcetable.loc[:, [tocol, fromcol]]
+        self.series = pd.Series(sourcetable[tocol].values, index=sourcetable[fromcol])
+        self.has_duplicates = bool(self.series.index.duplicated().any())
+
+        self._mapping = None
+        self._grouped = None
+        self._lookup = None
+
+    @property
+    def mapping(self) -> dict:
+        """ {fromvalue: tovalue} (for duplicated 'fromcol' values, the last row is used) """
+        if self._mapping is None:
+            self._mapping = self.series.to_dict()
+        return self._mapping
+
+    @property
+    def grouped(self) -> dict:
+        """ {fromvalue: [tovalues]} """
+        if self._grouped is None:
+            self._grouped = self.pairs.groupby(self.fromcol)[self.tocol].apply(list).to_dict()
+        return self._grouped
+
+    def lists_for(self, vals) -> dict:
+        """ {fromvalue: [tovalues]} for each of the values in 'vals' (raises KeyError for a missing value) """
+        grouped = self.grouped
+        return {v: list(grouped[v]) for v in vals}
+
+    def flattened_set_for(self, vals) -> set:
+        """ The set of all 'tocol' values that correspond to any of the values in 'vals' """
+        grouped = self.grouped
+        return set([item for v in vals for item in grouped[v]])
+
+    def positions(self, values) -> np.ndarray:
+        """ The row (in 'series') for each of the values, or -1 where a value isn't in the index
+
+        Numeric values are located with a binary search over the sorted keys, and other values (e.g. strings)
+        with a hash lookup. For a Categorical, only its categories are looked up and then mapped through its codes.
+        """
+        if self.has_duplicates:
+            raise ValueError(f"cannot translate an array from <{self.fromcol}> to <{self.tocol}> "
+                             f"because values of <{self.fromcol}> are duplicated")
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.array
+        if isinstance(values, pd.Categorical):
+            # (an extra -1 at the end means that missing values, i.e. code -1, are not found)
+            category_positions = np.append(self.positions(np.asarray(values.categories)), -1)
+            return category_positions[values.codes]
+
+        values = np.asarray(values)
+        keys, sorter, hashed = self._get_lookup()
+        if np.issubdtype(keys.dtype, np.number) and np.issubdtype(values.dtype, np.number):
+            if len(keys) == 0:
+                return np.full(len(values), -1, dtype=np.intp)
+            sortedkeys = keys[sorter]
+            idx = np.searchsorted(sortedkeys, values).clip(max=len(keys) - 1)
+            return np.where(sortedkeys[idx] == values, sorter[idx], -1)
+        return hashed.get_indexer(values)
+
+    def _get_lookup(self):
+        if self._lookup is None:
+            keys = self.series.index.to_numpy()
+            sorter = np.argsort(keys, kind='stable') if np.issubdtype(keys.dtype, np.number) else None
+            self._lookup = (keys, sorter, pd.Index(keys))
+        return self._lookup
+
+    def translate_array(self, values, fill_value=None) -> np.ndarray:
+        """ Translate a whole array (list, numpy array, Series, or Categorical) of 'fromcol' values at once
+
+        Args:
+            values: the values to translate
+            fill_value: value to use where a value isn't found. If None (the default), a KeyError is raised instead.
+
+        Returns:
+            numpy.ndarray of 'tocol' values, with the same length and order as 'values'
+        """
+        return translate_array_along([self], values, fill_value=fill_value)
+
+
+def translate_array_along(indexes, values, fill_value=None) -> np.ndarray:
+    """ Translate an array through a sequence of TranslationIndexes (e.g. lrsegid -> stateid -> stateabbreviation)
+
+    Args:
+        indexes (list of TranslationIndex): the 'tocol' of each index is the 'fromcol' of the next
+        values: the values to translate (list, numpy array, Series, or Categorical)
+        fill_value: value to use where a value isn't found. If None (the default), a KeyError is raised instead.
+
+    Returns:
+        numpy.ndarray of the last index's 'tocol' values, with the same length and order as 'values'
+    """
+    original = values
+    found = None
+    for index in indexes:
+        pos = index.positions(values)
+        found = (pos >= 0) if found is None else (found & (pos >= 0))
+        targets = index.series.to_numpy()
+        values = targets.take(np.where(pos >= 0, pos, 0)) if len(targets) else np.empty(len(pos), targets.dtype)
+
+    if not found.all():
+        if fill_value is None:
+            missing = pd.unique(np.asarray(original, dtype=object)[~found])
+            raise KeyError(f"{len(missing)} value(s) could not be translated, e.g. {list(missing[:5])}")
+        values = np.where(found, values, fill_value)
+    return values
+
+
+_indexes_by_sourcedata = weakref.WeakKeyDictionary()
+# Guards the cache, so that hooks called from several threads build each index only once.
+# (Reentrant, because chained indexes are built from single-table indexes.)
+_indexes_lock = threading.RLock()
+
+
+def _memoized(sourcedata, key, tables, build):
+    """ The cached index for a SourceData object and key, built with build() if it isn't cached yet
+
+    Indexes keep references to (the arrays of) the tables they are built from, so an index is dropped
+    when any of those tables is released from memory (see TableLoader.setTableReader()), and is then
+    rebuilt from the re-read table the next time it's requested.
+    """
+    with _indexes_lock:
+        indexes = _indexes_by_sourcedata.get(sourcedata)
+        if indexes is None:
+            indexes = _indexes_by_sourcedata[sourcedata] = {}
+            if hasattr(sourcedata, 'addReleaseListener'):
+                # (a weak reference, so that the listener doesn't keep the SourceData object alive)
+                sourcedata.addReleaseListener(partial(_drop_indexes_built_from, weakref.ref(sourcedata)))
+        if key not in indexes:
+            indexes[key] = (frozenset(tables), build())
+        return indexes[key][1]
+
+
+def _drop_indexes_built_from(sourcedata_ref, tblName):
+    sourcedata = sourcedata_ref()
+    if sourcedata is None:
+        return
+    with _indexes_lock:
+        indexes = _indexes_by_sourcedata.get(sourcedata, {})
+        for key in [k for k, (tables, _) in indexes.items() if tblName in tables]:
+            del indexes[key]
+
+
+def translation_index_for(sourcedata, tbl, fromcol, tocol) -> TranslationIndex:
+    """ Get the TranslationIndex for two columns of a source table, building it the first time it's requested
+
+    Indexes are cached per SourceData object (and are dropped along with it), so every SourceHook that
+    shares a SourceData object also shares its indexes.
+    """
+    return _memoized(sourcedata, (tbl, fromcol, tocol), [tbl],
+                     lambda: TranslationIndex(getattr(sourcedata, tbl), fromcol=fromcol, tocol=tocol))
+
+
+def chained_translation_index_for(sourcedata, tbls, column_sequence) -> TranslationIndex:
+    """ Get a TranslationIndex straight from the first to the last column of a chain of source tables
+
+    E.g. for tbls=['TblLandRiverSegment', 'TblState'] and column_sequence=['lrsegid', 'stateid', 'stateabbreviation'],
+    the index maps lrsegids directly to state abbreviations, so translating along the chain is a single lookup.
+    The end-to-end pairs are computed once (by joining each table's pairs on the columns they share),
+    and are cached per SourceData object, along with the single-table indexes.
+
+    Args:
+        sourcedata (SourceData): the source tables
+        tbls (list of str): name(s) of the source table(s) used for each step of the translation
+        column_sequence (list of str): the column to translate FROM, then the column each step translates TO
+    """
+    if len(tbls) == 1:
+        return translation_index_for(sourcedata, tbls[0], fromcol=column_sequence[0], tocol=column_sequence[1])
+
+    def build():
+        hops = [translation_index_for(sourcedata, t, fromcol=column_sequence[i], tocol=column_sequence[i+1])
+                for i, t in enumerate(tbls)]
+        # Joined from the last table backwards, so rows keep the order the step-by-step merges gave them.
+        chain = hops[-1].pairs
+        for hop in reversed(hops[:-1]):
+            chain = chain.merge(hop.pairs, how='inner', on=hop.tocol)
+        return TranslationIndex(chain, fromcol=column_sequence[0], tocol=column_sequence[-1])
+
+    return _memoized(sourcedata, (tuple(tbls), tuple(column_sequence)), tbls, build)
+
+
+def _group_positions(parents, nparents=None):
+    """ CSR-style grouping of child positions by parent
+
+    Args:
+        parents (np.ndarray): the parent of each child; either any values, or (if nparents is given)
+            parent positions in range(nparents)
+
+    Returns:
+        tuple of (parent values, or None if nparents was given; offsets; child positions, grouped by parent)
+        The children of the i-th parent are childpositions[offsets[i]:offsets[i+1]], in their original order.
+    """
+    order = np.argsort(parents, kind='stable')
+    if nparents is None:
+        values, starts = np.unique(parents[order], return_index=True)
+        return values, np.append(starts, len(parents)), order
+    return None, np.concatenate([[0], np.cumsum(np.bincount(parents, minlength=nparents))]), order
+
+
+def _expand(offsets, children, parentpositions):
+    """ The children of each parent position, concatenated, along with which parent position each came from """
+    starts = offsets[parentpositions]
+    counts = offsets[parentpositions + 1] - starts
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return children[np.repeat(starts, counts) + within], np.repeat(np.arange(len(parentpositions)), counts)
+
+
+class GeographyHierarchy:
+    """ The state -> county -> land river segment -> geography hierarchy, as CSR-style parent/child arrays
+
+    Built once per SourceData object (see geography_hierarchy_for()), from TblLandRiverSegment,
+    TblGeographyLrSeg and TblGeography. Finding the children or parent of an entity is then an array slice
+    or a hash lookup, instead of a merge over the source tables.
+
+    Attributes:
+        lrsegids (np.ndarray): land river segment ids, in TblLandRiverSegment order
+        lrsegnames (np.ndarray): land river segment names, in the same order
+        lrseg_countyids (np.ndarray): the county of each land river segment
+        lrseg_stateids (np.ndarray): the state of each land river segment
+        lrseg_outofcbws (np.ndarray): the 'outofcbws' value of each land river segment
+        countyids (np.ndarray): sorted ids of the counties that have land river segments
+        stateids (np.ndarray): sorted ids of the states that have land river segments
+
+    """
+    def __init__(self, TblLandRiverSegment, TblGeographyLrSeg, TblGeography):
+        self.lrsegids = TblLandRiverSegment['lrsegid'].to_numpy()
+        self.lrsegnames = TblLandRiverSegment['landriversegment'].to_numpy()
+        self.lrseg_countyids = TblLandRiverSegment['countyid'].to_numpy()
+        self.lrseg_stateids = TblLandRiverSegment['stateid'].to_numpy()
+        self.lrseg_outofcbws = TblLandRiverSegment['outofcbws'].to_numpy()
+        self._lrseg_index = pd.Index(self.lrsegids)
+        self._lrsegname_index = pd.Index(self.lrsegnames)
+
+        # county -> land river segments, and state -> counties
+        self.countyids, self._county_offsets, self._county_children = _group_positions(self.lrseg_countyids)
+        self._county_index = pd.Index(self.countyids)
+        county_stateids = self.lrseg_stateids[self._county_children[self._county_offsets[:-1]]]
+        self.stateids, self._state_offsets, self._state_children = _group_positions(county_stateids)
+        self._state_index = pd.Index(self.stateids)
+
+        # land river segment -> geographies
+        self.geographytypeids = TblGeography['geographytypeid'].to_numpy()
+        self.geographyfullnames = TblGeography['geographyfullname'].to_numpy()
+        geopositions = pd.Index(TblGeography['geographyid']).get_indexer(TblGeographyLrSeg['geographyid'])
+        lrsegpositions = self._lrseg_index.get_indexer(TblGeographyLrSeg['lrsegid'])
+        valid = (geopositions >= 0) & (lrsegpositions >= 0)
+        _, self._geo_offsets, order = _group_positions(lrsegpositions[valid], nparents=len(self.lrsegids))
+        self._geo_children = geopositions[valid][order]
+
+    def lrseg_positions(self, lrsegids=None, lrsegnames=None) -> np.ndarray:
+        """ The row of each land river segment (given by id or by name), or -1 where it isn't found """
+        if lrsegids is not None:
+            return self._lrseg_index.get_indexer(np.asarray(lrsegids))
+        return self._lrsegname_index.get_indexer(np.asarray(lrsegnames, dtype=object))
+
+    def lrsegids_of_county(self, countyid) -> np.ndarray:
+        """ The land river segments in a county (raises KeyError for an unknown county) """
+        i = self._county_index.get_loc(countyid)
+        return self.lrsegids[self._county_children[self._county_offsets[i]:self._county_offsets[i + 1]]]
+
+    def lrsegids_of_counties(self, countyids) -> dict:
+        """ {countyid: [lrsegids]} for each of the counties (raises KeyError for an unknown county) """
+        return {c: self.lrsegids_of_county(c).tolist() for c in countyids}
+
+    def lrseg_positions_of_counties(self, countyids):
+        """ The land river segments of each of the counties, concatenated
+
+        Returns:
+            tuple of (land river segment rows, and the position in 'countyids' that each one belongs to)
+            Unknown counties have no land river segments.
+        """
+        countypositions = self._county_index.get_indexer(np.asarray(countyids))
+        found = np.flatnonzero(countypositions >= 0)
+        positions, which = _expand(self._county_offsets, self._county_children, countypositions[found])
+        return positions, found[which]
+
+    def countyids_of_state(self, stateid) -> np.ndarray:
+        """ The counties (with land river segments) in a state (raises KeyError for an unknown state) """
+        i = self._state_index.get_loc(stateid)
+        return self.countyids[self._state_children[self._state_offsets[i]:self._state_offsets[i + 1]]]
+
+    def county_of(self, lrsegids) -> np.ndarray:
+        return self.lrseg_countyids[self._found_positions(lrsegids)]
+
+    def state_of(self, lrsegids) -> np.ndarray:
+        return self.lrseg_stateids[self._found_positions(lrsegids)]
+
+    def _found_positions(self, lrsegids) -> np.ndarray:
+        positions = self.lrseg_positions(lrsegids=lrsegids)
+        if (positions < 0).any():
+            missing = np.asarray(lrsegids)[positions < 0]
+            raise KeyError(f"{len(missing)} land river segment id(s) not found, e.g. {list(missing[:5])}")
+        return positions
+
+    def geographyfullnames_of_lrsegs(self, lrsegids, geographytypeid=None) -> list:
+        """ The names of the geographies that contain each land river segment (optionally only of one type)
+
+        Unknown land river segments have no geographies.
+        """
+        positions = self.lrseg_positions(lrsegids=lrsegids)
+        geos, _ = _expand(self._geo_offsets, self._geo_children, positions[positions >= 0])
+        if geographytypeid is not None:
+            geos = geos[self.geographytypeids[geos] == geographytypeid]
+        return self.geographyfullnames[geos].tolist()
+
+
+def geography_hierarchy_for(sourcedata) -> GeographyHierarchy:
+    """ Get the GeographyHierarchy for the source tables, building it the first time it's requested """
+    return _memoized(sourcedata, 'geography_hierarchy',
+                     ['TblLandRiverSegment', 'TblGeographyLrSeg', 'TblGeography'],
+                     lambda: GeographyHierarchy(sourcedata.TblLandRiverSegment,
+                                                sourcedata.TblGeographyLrSeg,
+                                                sourcedata.TblGeography))
+
+
+# Names that are used for a geography (after normalization), and the name it has in the source tables
+GEOGRAPHY_NAME_ALIASES = {'washington, dc': 'district of columbia, dc'}
+
+
+def normalize_geography_names(names) -> pd.Series:
+    """ Lower-cased, single-spaced versions of geography names, with ', ' between parts and aliases replaced """
+    names = pd.Series(np.asarray(names, dtype=object))
+    normalized = (names.astype(str).str.strip().str.lower()
+                  .str.replace(r'\s*,\s*', ', ', regex=True)
+                  .str.replace(r'\s+', ' ', regex=True))
+    return normalized.replace(GEOGRAPHY_NAME_ALIASES)
+
+
+def normalize_lrseg_names(names) -> pd.Series:
+    """ Lower-cased land river segment names, also accepting geography names like 'MD-N24003XU3_4650_0001(CBWS)' """
+    return (pd.Series(np.asarray(names, dtype=object)).astype(str).str.strip().str.lower()
+            .str.replace(r'^[a-z]{2}-', '', regex=True)
+            .str.replace(r'\(.*\)$', '', regex=True))
+
+
+class GeographyNameResolver:
+    """ Resolves large lists of county ("County, ST") and land river segment names to ids in one vectorized pass
+
+    Names are normalized (see normalize_geography_names() and normalize_lrseg_names()) and then located
+    with hash lookups in tables of the normalized source table names, which are built once per SourceData
+    object (see geography_name_resolver_for()).
+
+    Attributes:
+        countyids (np.ndarray): county ids, in TblCounty order
+        countystatestrs (np.ndarray): "County, ST" names of the counties, as they are in TblCounty
+        lrsegids (np.ndarray): land river segment ids, in TblLandRiverSegment order
+
+    """
+    def __init__(self, TblCounty, TblLandRiverSegment):
+        self.countyids = TblCounty['countyid'].to_numpy()
+        self.countystatestrs = (TblCounty['countyname'].astype(str) + ', ' +
+                                TblCounty['stateabbreviation'].astype(str)).to_numpy()
+        self._county_keys = self._first_occurrences(normalize_geography_names(self.countystatestrs))
+
+        self.lrsegids = TblLandRiverSegment['lrsegid'].to_numpy()
+        self._lrseg_keys = self._first_occurrences(normalize_lrseg_names(TblLandRiverSegment['landriversegment']))
+
+    @staticmethod
+    def _first_occurrences(keys):
+        # (a name that appears more than once resolves to its first row)
+        first = ~keys.duplicated().to_numpy()
+        return pd.Index(keys[first]), np.flatnonzero(first)
+
+    @staticmethod
+    def _positions(keys, names) -> np.ndarray:
+        index, rows = keys
+        found = index.get_indexer(names)
+        return np.where(found >= 0, rows[found], -1)
+
+    def county_positions(self, countystatestrs) -> np.ndarray:
+        """ The TblCounty row of each "County, ST" name, or -1 where it isn't found
+
+        Raises:
+            ValueError: for names that aren't of the form "County, ST"
+        """
+        normalized = normalize_geography_names(countystatestrs)
+        malformed = normalized.str.count(', ') != 1
+        if malformed.any():
+            raise ValueError('** Invalid County Input **\n'
+                             '   %s is invalid'
+                             '   -- Must be list of comma-separated strings'
+                             '   -- e.g. [\'Adams, PA\', \'Hardy, WV\']'
+                             % list(np.asarray(countystatestrs, dtype=object)[malformed.to_numpy()]))
+        return self._positions(self._county_keys, normalized)
+
+    def lrseg_positions(self, lrsegnames) -> np.ndarray:
+        """ The TblLandRiverSegment row of each land river segment (or geography) name, or -1 where it isn't found """
+        return self._positions(self._lrseg_keys, normalize_lrseg_names(lrsegnames))
+
+    def resolved_county_positions(self, countystatestrs) -> np.ndarray:
+        """ The TblCounty row of each "County, ST" name (raises a ValueError listing every name that isn't found) """
+        positions = self.county_positions(countystatestrs)
+        self._raise_for_unresolved(countystatestrs, positions, 'county')
+        return positions
+
+    def resolve_counties(self, countystatestrs) -> np.ndarray:
+        """ The county id of each "County, ST" name (raises a ValueError listing every name that isn't found) """
+        return self.countyids[self.resolved_county_positions(countystatestrs)]
+
+    def resolve_lrsegs(self, lrsegnames) -> np.ndarray:
+        """ The id of each land river segment name (raises a ValueError listing every name that isn't found) """
+        positions = self.lrseg_positions(lrsegnames)
+        self._raise_for_unresolved(lrsegnames, positions, 'land river segment')
+        return self.lrsegids[positions]
+
+    @staticmethod
+    def _raise_for_unresolved(names, positions, typename):
+        if (positions < 0).any():
+            unresolved = list(np.asarray(names, dtype=object)[positions < 0])
+            raise ValueError(f"{len(unresolved)} {typename} name(s) could not be resolved: {unresolved}")
+
+
+def geography_name_resolver_for(sourcedata) -> GeographyNameResolver:
+    """ Get the GeographyNameResolver for the source tables, building it the first time it's requested """
+    return _memoized(sourcedata, 'geography_name_resolver', ['TblCounty', 'TblLandRiverSegment'],
+                     lambda: GeographyNameResolver(sourcedata.TblCounty, sourcedata.TblLandRiverSegment))
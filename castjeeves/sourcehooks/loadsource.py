@@ -73,6 +73,9 @@ class LoadSource(SourceHook):
     def sourceLrsegAgencyIDtable_from_lrsegAgencySectorids(self, lrsegagencyidtable=None, sectorids=None):
         """Get the load sources present (whether zero acres or not) in the specified lrseg-agency-sectors
         """
+        if self.engine is not None:
+            return self._sourceLrsegAgencyIDtable_from_lrsegAgencySectorids_sql(lrsegagencyidtable, sectorids)
+
         # get relevant source data
         TblLandRiverSegmentAgencyLoadSource = self.source.TblLandRiverSegmentAgencyLoadSource
 
@@ -101,6 +104,30 @@ class LoadSource(SourceHook):
 
         return tblsubset
 
+    def _sourceLrsegAgencyIDtable_from_lrsegAgencySectorids_sql(self, lrsegagencyidtable, sectorids):
+        """ The same query, run as a single join (with the sector filters pushed down) by the embedded SQL engine
+
+        Note: rows may be in a different order than from the pandas version.
+        """
+        columnmask = ['lrsegid', 'agencyid', 'loadsourceid', 'unitid']
+        joincols = [c for c in lrsegagencyidtable.columns if c in columnmask]
+        extracols = [c for c in lrsegagencyidtable.columns if c not in columnmask]
+        sql = f"""
+            SELECT {', '.join(['t.' + c for c in columnmask] + ['i.' + c for c in extracols])}
+            FROM TblLandRiverSegmentAgencyLoadSource AS t
+            JOIN lrsegagency AS i ON {' AND '.join(f't.{c} = i.{c}' for c in joincols)}
+            WHERE t.loadsourceid IN (SELECT ls.loadsourceid FROM TblLoadSource AS ls
+                                     JOIN sectors AS s ON ls.sectorid = s.sectorid)
+              -- LoadSources that are of the Ag or Septic sector only go on NONFED agency parcels
+              AND NOT (t.loadsourceid IN (SELECT ls.loadsourceid FROM TblLoadSource AS ls
+                                          JOIN TblSector AS sc ON ls.sectorid = sc.sectorid
+                                          WHERE sc.sector IN ('Agriculture', 'Septic'))
+                       AND t.agencyid NOT IN (SELECT agencyid FROM TblAgency WHERE agencycode = 'NONFED'))
+        """
+        return self.engine.query(sql, tables=['TblLandRiverSegmentAgencyLoadSource', 'TblLoadSource',
+                                              'TblSector', 'TblAgency'],
+                                 lrsegagency=lrsegagencyidtable, sectors=sectorids.loc[:, ['sectorid']])
+
     def sourceCountyAgencyIDtable_from_sourceLrsegAgencyIDtable(self, sourceAgencyLrsegIDtable=None):
         # get relevant source data
         TblLandRiverSegment = self.source.TblLandRiverSegment
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import warnings
 
@@ -44,9 +45,22 @@ class Lrseg(SourceHook):
         return list(subtbl['totalacres'])
 
     def append_lrsegs_to_counties(self, tablewithcountyids):
+        """ One row for each land river segment in each county of the table (in TblLandRiverSegment order) """
         TblLandRiverSegment = self.source.TblLandRiverSegment  # get relevant source data
 
         columnmask = ['countyid', 'lrsegid', 'landriversegment']
+        if [c for c in tablewithcountyids.columns if c in columnmask] == ['countyid']:
+            hierarchy = self._geography_hierarchy()
+            positions, rows = hierarchy.lrseg_positions_of_counties(tablewithcountyids['countyid'])
+            # (in TblLandRiverSegment order, like the merge below)
+            order = np.lexsort((rows, positions))
+            positions, rows = positions[order], rows[order]
+            lrsegs = pd.DataFrame({'countyid': hierarchy.lrseg_countyids[positions],
+                                   'lrsegid': hierarchy.lrsegids[positions],
+                                   'landriversegment': hierarchy.lrsegnames[positions]})
+            others = tablewithcountyids.drop(columns='countyid').iloc[rows].reset_index(drop=True)
+            return pd.concat([lrsegs, others], axis=1)
+
         tblsubset = TblLandRiverSegment.loc[:, columnmask].merge(tablewithcountyids, how='inner')
 
         return tblsubset
@@ -54,7 +68,13 @@ class Lrseg(SourceHook):
     def remove_outofcbws_lrsegs(self, lrseglist=None, lrsegdf=None):
         TblLandRiverSegment = self.source.TblLandRiverSegment  # get relevant source data
 
-        if lrseglist is not None:
+        if (lrseglist is not None) and isinstance(lrseglist, list):
+            hierarchy = self._geography_hierarchy()
+            positions = hierarchy.lrseg_positions(lrsegnames=lrseglist)
+            # (in TblLandRiverSegment order, like the merge below)
+            return [lrseglist[i] for i in np.argsort(positions, kind='mergesort')
+                    if (positions[i] >= 0) and (hierarchy.lrseg_outofcbws[positions[i]] != True)]
+        elif lrseglist is not None:
             tablewithlrsegs = self.forceToSingleColumnDataFrame(lrseglist, colname='landriversegment')
 
             columnmask = ['landriversegment', 'outofcbws']
@@ -63,6 +83,19 @@ class Lrseg(SourceHook):
             newsubset = tblsubset.loc[tblsubset['outofcbws'] != True, 'landriversegment'].tolist()
 
             return newsubset
+        elif (lrsegdf is not None) and \
+                ([c for c in lrsegdf.columns if c in ['landriversegment', 'outofcbws']] == ['landriversegment']):
+            hierarchy = self._geography_hierarchy()
+            positions = hierarchy.lrseg_positions(lrsegnames=lrsegdf['landriversegment'])
+            found = positions >= 0
+            outofcbws = hierarchy.lrseg_outofcbws[np.where(found, positions, 0)]
+            keep = found & (outofcbws != True)
+            # (in TblLandRiverSegment order, like the merge below)
+            order = np.flatnonzero(keep)[np.argsort(positions[keep], kind='mergesort')]
+            newsubset = lrsegdf.iloc[order].reset_index(drop=True)
+            newsubset['outofcbws'] = outofcbws[order]
+            return newsubset.loc[:, ['landriversegment', 'outofcbws'] +
+                                 [c for c in lrsegdf.columns if c != 'landriversegment']]
         elif lrsegdf is not None:
             tablewithlrsegs = lrsegdf
 
@@ -6,14 +6,21 @@ from itertools import permutations
 import warnings
 from typing import List
 
+from .indexes import TranslationIndex, GeographyHierarchy, GeographyNameResolver, translation_index_for, \
+    chained_translation_index_for, geography_hierarchy_for, geography_name_resolver_for
+
 
 class SourceHook:
+    # An optional embedded SQL database (see castjeeves.sqltables.QueryEngine); set by Jeeves(sql_backend=...)
+    engine = None
+
     def __init__(self, sourcedata=None, metadata=None):
         """Base Class for CAST data queries.
 
         Attributes:
             source (SourceData): The source object contains all of the data tables
             metadata_tables (MetaData): The metadata object contains all of the metadata tables
+            engine (QueryEngine): if set, some multi-table queries are run as SQL joins instead of pandas merges
 
         Required Methods:
             all_names()
@@ -92,14 +99,12 @@ class SourceHook:
         """
         assert len(column_sequence) == (len(tbls) + 1)
 
-        newvalues = values.copy()
-        for i, t in enumerate(tbls):
-            sourcetable = getattr(self.source, t)
-            newvalues = self._method_dict_for_mapping_type[type(values)](newvalues, sourcetable,
-                                                                         fromcol=column_sequence[i],
-                                                                         tocol=column_sequence[i+1])
-
-        return newvalues
+        # The end-to-end mapping is precomputed (once per SourceData object), so this is a single translation.
+        translation_index = chained_translation_index_for(self.source, tbls, column_sequence)
+        return self._method_dict_for_mapping_type[type(values)](values, translation_index.pairs,
+                                                                fromcol=column_sequence[0],
+                                                                tocol=column_sequence[-1],
+                                                                translation_index=translation_index)
 
     def _map_using_sourcetbl(self, values,
                              tbl: str,
@@ -124,7 +129,24 @@ class SourceHook:
 
         return self._method_dict_for_mapping_type[type(values)](values, sourcetable,
                                                                 tocol, fromcol,
-                                                                todict=todict, flatten_to_set=flatten_to_set)
+                                                                todict=todict, flatten_to_set=flatten_to_set,
+                                                                translation_index=self._translation_index(
+                                                                    tbl, fromcol=fromcol, tocol=tocol))
+
+    def _translation_index(self, tbl: str, fromcol: str, tocol: str) -> TranslationIndex:
+        """ The (memoized) index for translating values of 'fromcol' to values of 'tocol' in the Source table 'tbl'
+
+        Indexes are built once per SourceData object, and are shared by all of the hooks that use it.
+        """
+        return translation_index_for(self.source, tbl, fromcol=fromcol, tocol=tocol)
+
+    def _geography_hierarchy(self) -> GeographyHierarchy:
+        """ The (memoized) state -> county -> land river segment -> geography hierarchy of the Source tables """
+        return geography_hierarchy_for(self.source)
+
+    def _geography_name_resolver(self) -> GeographyNameResolver:
+        """ The (memoized) resolver of county ("County, ST") and land river segment names to ids """
+        return geography_name_resolver_for(self.source)
 
     @staticmethod
     def _map_STR_using_sourcetbl(vals: str,
@@ -132,7 +154,8 @@ class SourceHook:
                                  tocol: str,
                                  fromcol: str,
                                  todict=False,
-                                 flatten_to_set=False):
+                                 flatten_to_set=False,
+                                 translation_index=None):
         """ Return a value string that has been translated using two columns in a source table """
         if not isinstance(vals, str):
             raise TypeError(f"unexpected type <{type(vals)}>")
@@ -140,24 +163,20 @@ class SourceHook:
             raise ValueError(f"todict and flatten_to_set arguments are mutually exclusive; "
                              f"only one can be set to True")
 
-        translate_series = pd.Series(sourcetable[tocol].values, index=sourcetable[fromcol])
+        if translation_index is None:
+            translation_index = TranslationIndex(sourcetable, fromcol=fromcol, tocol=tocol)
 
-        if any(translate_series.index.duplicated()) & (not todict) & (not flatten_to_set):
+        if translation_index.has_duplicates & (not todict) & (not flatten_to_set):
             raise ValueError('duplicate values in the tocol will be dropped when translating a list! '
                              'try setting todict=True or flatten=True, '
                              'or using a Series or DataFrame instead of a list')
 
         if todict:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return my_series.loc[vals].to_dict()
+            return translation_index.lists_for([vals])
         elif flatten_to_set:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return set([item for sublist in my_series.loc[vals] for item in sublist])
+            return translation_index.flattened_set_for([vals])
         else:
-            translate_dict = translate_series.to_dict()
-            return translate_dict[vals]
+            return translation_index.mapping[vals]
 
     @staticmethod
     def _map_LIST_using_sourcetbl(vals: list,
@@ -165,7 +184,8 @@ class SourceHook:
                                   tocol: str,
                                   fromcol: str,
                                   todict=False,
-                                  flatten_to_set=False):
+                                  flatten_to_set=False,
+                                  translation_index=None):
         """ Return a list of values that have been translated using two columns in a source table """
         if not isinstance(vals, list):
             raise TypeError(f"unexpected type <{type(vals)}>")
@@ -173,23 +193,20 @@ class SourceHook:
             raise ValueError(f"todict and flatten_to_set arguments are mutually exclusive; "
                              f"only one can be set to True")
 
-        translate_series = pd.Series(sourcetable[tocol].values, index=sourcetable[fromcol])
+        if translation_index is None:
+            translation_index = TranslationIndex(sourcetable, fromcol=fromcol, tocol=tocol)
 
-        if any(translate_series.index.duplicated()) & (not todict) & (not flatten_to_set):
+        if translation_index.has_duplicates & (not todict) & (not flatten_to_set):
             raise ValueError('duplicate values in the tocol will be dropped when translating a list! '
                              'try setting todict=True or flatten=True, '
                              'or using a Series or DataFrame instead of a list')
 
         if todict:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return my_series.loc[vals].to_dict()
+            return translation_index.lists_for(vals)
         elif flatten_to_set:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return set([item for sublist in my_series.loc[vals] for item in sublist])
+            return translation_index.flattened_set_for(vals)
         else:
-            translate_dict = translate_series.to_dict()
+            translate_dict = translation_index.mapping
             return [translate_dict[v] for v in vals]
 
     @staticmethod
@@ -198,21 +215,21 @@ class SourceHook:
                                        tocol: str,
                                        fromcol: str,
                                        todict=False,
-                                       flatten_to_set=False):
+                                       flatten_to_set=False,
+                                       translation_index=None):
         """ Return a DataFrame of values that have been translated using two columns in a source table """
         if not isinstance(vals, pd.DataFrame):
             raise TypeError(f"unexpected type <{type(vals)}>")
 
-        my_table = sourcetable.loc[:, [tocol, fromcol]]
+        if translation_index is None:
+            translation_index = TranslationIndex(sourcetable, fromcol=fromcol, tocol=tocol)
 
         if todict:
-            my_series = my_table.groupby(fromcol)[tocol].apply(list)
-            return my_series.loc[vals[fromcol]].to_dict()
+            return translation_index.lists_for(vals[fromcol])
         elif flatten_to_set:
-            my_series = my_table.groupby(fromcol)[tocol].apply(list)
-            return set([item for sublist in my_series.loc[vals[fromcol]] for item in sublist])
+            return translation_index.flattened_set_for(vals[fromcol])
         else:
-            return my_table.merge(vals, how='inner').loc[:, [tocol]]  # pass column name as list so return type is pandas.DataFrame
+            return translation_index.pairs.merge(vals, how='inner').loc[:, [tocol]]  # pass column name as list so return type is pandas.DataFrame
 
     @staticmethod
     def _map_SERIES_using_sourcetbl(vals: pd.Series,
@@ -220,22 +237,21 @@ class SourceHook:
                                     tocol: str,
                                     fromcol: str,
                                     todict=False,
-                                    flatten_to_set=False):
+                                    flatten_to_set=False,
+                                    translation_index=None):
         """ Return a Series of values that have been translated using two columns in a source table """
         if not isinstance(vals, pd.Series):
             raise TypeError(f"unexpected type <{type(vals)}>")
 
+        if translation_index is None:
+            translation_index = TranslationIndex(sourcetable, fromcol=fromcol, tocol=tocol)
+
         if todict:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return my_series.loc[vals].to_dict()
+            return translation_index.lists_for(vals)
         elif flatten_to_set:
-            df = sourcetable.loc[:, [fromcol, tocol]]
-            my_series = df.groupby(fromcol)[tocol].apply(list)
-            return set([item for sublist in my_series.loc[vals] for item in sublist])
+            return translation_index.flattened_set_for(vals)
         else:
-            my_series = pd.Series(sourcetable[tocol].values, index=sourcetable[fromcol])
-            return vals.map(my_series.to_dict())
+            return vals.map(translation_index.mapping)
 
     def grab_sourcetbl_column(self,
                              tbl: str,
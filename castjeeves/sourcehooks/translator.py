@@ -12,29 +12,32 @@ class Translator(SourceHook):
 
     # Translation methods (from IDs to NAMEs)
     def translate_slabidtable_to_slabnametable(self, slabidtable=None):
-        newtable = slabidtable.copy()
-
-        # Get relevant source data tables
-        TblLandRiverSegment = self.source.TblLandRiverSegment
-        TblState = self.source.TblState
-        TblAgency = self.source.TblAgency
-        TblLoadSource = self.source.TblLoadSource
-        TblBmp = self.source.TblBmp
-
-        # Translate lrsegid to GeographyName
-        columnmask = ['landriversegment', 'stateid', 'lrsegid']
-        newtable = TblLandRiverSegment.loc[:, columnmask].merge(newtable, how='inner')
-        columnmask = ['stateabbreviation', 'stateid']
-        newtable = TblState.loc[:, columnmask].merge(newtable, how='inner')
-        # Translate to Agency codes
-        columnmask = ['agencycode', 'agencyid']
-        newtable = TblAgency.loc[:, columnmask].merge(newtable, how='inner')
-        # Translate to LoadSource names
-        columnmask = ['loadsourceshortname', 'loadsourceid']
-        newtable = TblLoadSource.loc[:, columnmask].merge(newtable, how='inner')
-        # Translate to BMP names
-        columnmask = ['bmpshortname', 'bmpid']
-        newtable = TblBmp.loc[:, columnmask].merge(newtable, how='inner')
+        if self.engine is not None:
+            newtable = self._slabidtable_with_names_sql(slabidtable)
+        else:
+            newtable = slabidtable.copy()
+
+            # Get relevant source data tables
+            TblLandRiverSegment = self.source.TblLandRiverSegment
+            TblState = self.source.TblState
+            TblAgency = self.source.TblAgency
+            TblLoadSource = self.source.TblLoadSource
+            TblBmp = self.source.TblBmp
+
+            # Translate lrsegid to GeographyName
+            columnmask = ['landriversegment', 'stateid', 'lrsegid']
+            newtable = TblLandRiverSegment.loc[:, columnmask].merge(newtable, how='inner')
+            columnmask = ['stateabbreviation', 'stateid']
+            newtable = TblState.loc[:, columnmask].merge(newtable, how='inner')
+            # Translate to Agency codes
+            columnmask = ['agencycode', 'agencyid']
+            newtable = TblAgency.loc[:, columnmask].merge(newtable, how='inner')
+            # Translate to LoadSource names
+            columnmask = ['loadsourceshortname', 'loadsourceid']
+            newtable = TblLoadSource.loc[:, columnmask].merge(newtable, how='inner')
+            # Translate to BMP names
+            columnmask = ['bmpshortname', 'bmpid']
+            newtable = TblBmp.loc[:, columnmask].merge(newtable, how='inner')
 
         newtable.drop(['lrsegid', 'stateid', 'agencyid', 'loadsourceid', 'bmpid'], axis=1, inplace=True)
         newtable.rename(columns={'landriversegment': 'GeographyName',
@@ -54,6 +57,28 @@ class Translator(SourceHook):
 
         return newtable
 
+    def _slabidtable_with_names_sql(self, slabidtable):
+        """ The name columns for an lrseg-agency-loadsource-bmp id table, joined by the embedded SQL engine
+
+        Note: rows may be in a different order than from the pandas version.
+        """
+        idcolumns = ['lrsegid', 'stateid', 'agencyid', 'loadsourceid', 'bmpid']
+        extracols = [c for c in slabidtable.columns if c not in idcolumns]
+        sql = f"""
+            SELECT b.bmpshortname, b.bmpid, ls.loadsourceshortname, ls.loadsourceid, a.agencycode, a.agencyid,
+                   st.stateabbreviation, st.stateid, l.landriversegment, l.lrsegid
+                   {''.join(', i.' + c for c in extracols)}
+            FROM slab AS i
+            JOIN TblLandRiverSegment AS l ON l.lrsegid = i.lrsegid
+            JOIN TblState AS st ON st.stateid = l.stateid
+            JOIN TblAgency AS a ON a.agencyid = i.agencyid
+            JOIN TblLoadSource AS ls ON ls.loadsourceid = i.loadsourceid
+            JOIN TblBmp AS b ON b.bmpid = i.bmpid
+        """
+        return self.engine.query(sql, tables=['TblLandRiverSegment', 'TblState', 'TblAgency',
+                                              'TblLoadSource', 'TblBmp'],
+                                 slab=slabidtable)
+
     def translate_scabidtable_to_scabnametable(self, scabidtable=None):
         newtable = scabidtable.copy()
 
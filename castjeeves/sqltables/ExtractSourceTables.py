@@ -1,15 +1,35 @@
 """ An example of how we can extract source tables from SQL Server using python
 
+Each table is streamed in chunks into partitioned columnar files (in <source dir>/partitions),
+and then written to <source dir>/<table>.csv one partition at a time. Re-running the script
+resumes an interrupted extraction (of a table with a primary key, whose rows are ordered by it),
+and skips the tables that were already extracted.
+
 Example:
     `python ExtractSourceTables.py <server> <databasename> <source dir> <userpwdfile>`
     `python ExtractSourceTables.py SQL2T ScenarioBuilderV3Source ../../data/test_source userpwdfile
 
 """
+import os
 import sys
 import pyodbc
-import pandas as pd
 import time
 from castjeeves.sqltables import SourceData
+from castjeeves.sqltables import TableExtractor
+
+
+def primary_key(cnxn, tblName, schema='dbo'):
+    """ The primary key columns of a table, as an ORDER BY clause (or None if it has no primary key) """
+    cursor = cnxn.cursor()
+    cursor.execute("SELECT kcu.COLUMN_NAME"
+                   " FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc"
+                   " JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu"
+                   "   ON (kcu.CONSTRAINT_NAME = tc.CONSTRAINT_NAME) AND (kcu.TABLE_SCHEMA = tc.TABLE_SCHEMA)"
+                   " WHERE (tc.CONSTRAINT_TYPE = 'PRIMARY KEY') AND (tc.TABLE_SCHEMA = ?) AND (tc.TABLE_NAME = ?)"
+                   " ORDER BY kcu.ORDINAL_POSITION", schema, tblName)
+    columns = [row[0] for row in cursor.fetchall()]
+    return ', '.join('[%s]' % c for c in columns) if columns else None
+
 
 if len(sys.argv) < 5:
     raise ValueError("We need server, database name, output directory path, and a user/password file!")
@@ -37,6 +57,7 @@ cnxn = pyodbc.connect('DRIVER={ODBC Driver 17 for SQL Server}' +
                       ';pwd=' + password)
 
 sourcedata = SourceData()
+extractor = TableExtractor(cnxn, os.path.join(SOURCE_PATH, 'partitions'), chunksize=500000)
 skipLargest = False  # to skip the largest (>120 MB) files
 for tblName in sourcedata.getTblList():
     print("extracting table:", tblName)
@@ -50,15 +71,14 @@ for tblName in sourcedata.getTblList():
     # To read tables all at once
     # df = pd.read_sql(query, cnxn)
 
-    # To read in chunks
-    df = pd.DataFrame()
-    for chunks in pd.read_sql(query, con=cnxn, chunksize=500000):
-        df = df.append(chunks)
-
-    df = df.rename(columns={column: column.lower() for column in df.columns})
-    if tblName == "TblBmpGroup":
-        df["ruleset"] = df["ruleset"].astype(str).str.lower()
+    # Stream in chunks, each written straight to its own partition
+    # (rows are ordered by the primary key, so that an interrupted extraction can be resumed)
+    order_by = primary_key(cnxn, tblName)
+    if order_by is None:
+        print('  (no primary key, so an interrupted extraction of this table will start over)')
+    nrows = extractor.extract(tblName, query=query, order_by=order_by)
+    print(f"  {nrows} rows in {len(extractor.partitions(tblName))} partitions")
 
     output_file = SOURCE_PATH+"/"+tblName+".csv"
-    df.to_csv(output_file, sep=',', encoding='utf-8', index=False)
+    extractor.write_csv(tblName, output_file)
     time.sleep(0.1)
@@ -0,0 +1,116 @@
+""" Store a large, land-river-segment-keyed table as one file per county, so a study only reads its own geography
+"""
+
+# Generic/Built-in
+import os
+import shutil
+import logging
+import threading
+
+# Computation
+import pandas as pd
+
+from castjeeves.sqltables.TableCache import TableCache
+
+logger = logging.getLogger(__name__)
+
+UNASSIGNED = -1  # state/county key for rows whose lrsegid isn't in the land river segment table
+
+
+def partition_name(stateid, countyid) -> str:
+    return 'state%d_county%d' % (stateid, countyid)
+
+
+class PartitionedTable:
+    """ A table (e.g. TblBmpEfficiency or TblLandUsePreBmp) split by state and county into a TableCache directory.
+
+    Each partition holds the rows for the land river segments of one county, and its manifest entry records
+    the stateid, countyid and lrsegids it contains. Reading with a list of lrsegids only opens the partitions
+    that contain any of them, and then keeps only the rows for those lrsegids.
+
+    Partitions are written to a temporary directory that is renamed into place once complete,
+    so a partially written table is never read (by this or any other process or thread).
+
+    Attributes:
+        partdir (str): directory holding the partitions
+
+    """
+    def __init__(self, partdir):
+        self.partdir = partdir
+        self._cache = None
+
+    def __repr__(self):
+        return f"PartitionedTable(<{self.partdir}>)"
+
+    def is_populated(self) -> bool:
+        return os.path.isdir(self.partdir)
+
+    @property
+    def cache(self) -> TableCache:
+        if self._cache is None:
+            if not self.is_populated():
+                raise KeyError(f"partitioned table at <{self.partdir}> has not been populated")
+            self._cache = TableCache(self.partdir)
+        return self._cache
+
+    def populate(self, df, TblLandRiverSegment):
+        """ Split a table by the state and county of each row's lrsegid, and write each part as a partition
+
+        Args:
+            df (pd.DataFrame): the table, with an 'lrsegid' column
+            TblLandRiverSegment (pd.DataFrame): with 'lrsegid', 'stateid' and 'countyid' columns
+        """
+        tmpdir = self.partdir + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        if os.path.isdir(tmpdir):
+            shutil.rmtree(tmpdir)
+        cache = TableCache(tmpdir)
+
+        lrsegs = TblLandRiverSegment.set_index('lrsegid')
+        statekey = df['lrsegid'].map(lrsegs['stateid']).fillna(UNASSIGNED).astype(int)
+        countykey = df['lrsegid'].map(lrsegs['countyid']).fillna(UNASSIGNED).astype(int)
+        for (stateid, countyid), part in df.groupby([statekey.values, countykey.values], sort=True):
+            cache.write_table(partition_name(stateid, countyid), part.reset_index(drop=True),
+                              stateid=int(stateid), countyid=int(countyid),
+                              lrsegids=sorted(int(x) for x in part['lrsegid'].unique()))
+        if df.empty:
+            cache.write_table(partition_name(UNASSIGNED, UNASSIGNED), df.reset_index(drop=True),
+                              stateid=UNASSIGNED, countyid=UNASSIGNED, lrsegids=[])
+
+        try:
+            os.rename(tmpdir, self.partdir)
+        except OSError:
+            # Another process populated it first; its partitions are used instead.
+            logger.info('<%s was populated by another process>' % self.partdir)
+            shutil.rmtree(tmpdir)
+        self._cache = None
+
+    def partitions_for(self, lrsegids=None) -> list:
+        """ Names of the partitions that hold any of the given lrsegids (or all of them, if lrsegids is None) """
+        manifest = self.cache.manifest
+        if lrsegids is None:
+            return self.cache.tables()
+        lrsegids = set(int(x) for x in lrsegids)
+        return [p for p in self.cache.tables() if not lrsegids.isdisjoint(manifest[p]['lrsegids'])]
+
+    def read(self, lrsegids=None, columns=None) -> pd.DataFrame:
+        """ Read the rows for the given lrsegids (or all rows, if lrsegids is None), opening only their partitions
+
+        Args:
+            lrsegids (list of int): land river segment ids to read
+            columns (list of str): if specified, only these columns are read
+        """
+        readcolumns = columns
+        if (columns is not None) and ('lrsegid' not in columns):
+            readcolumns = list(columns) + ['lrsegid']
+
+        partitions = self.partitions_for(lrsegids)
+        if not partitions:
+            # Keep the table's columns and dtypes, even when there are no rows for this geography.
+            return self.cache.read_table(self.cache.tables()[0], columns=columns).iloc[0:0]
+
+        df = pd.concat([self.cache.read_table(p, columns=readcolumns) for p in partitions], ignore_index=True)
+        if lrsegids is not None:
+            df = df[df['lrsegid'].isin(lrsegids)].reset_index(drop=True)
+        if readcolumns is not columns:
+            df = df.loc[:, columns]
+        return df
@@ -0,0 +1,173 @@
+""" Run multi-table source data queries in an embedded, file-backed SQL database (DuckDB or SQLite)
+"""
+
+# Generic/Built-in
+import os
+import sqlite3
+import logging
+import threading
+
+# Computation
+import pandas as pd
+
+try:
+    import duckdb
+    _HAS_DUCKDB = True
+except ImportError:
+    _HAS_DUCKDB = False
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('duckdb', 'sqlite')
+LOADED_TABLES_NAME = '_bayota_loaded_tables'
+
+
+def default_backend() -> str:
+    """ SQLite, which is always available and lets every process on a node use the same database file
+
+    (A DuckDB database file can only be opened by one read-write process at a time, so DuckDB has to be
+    chosen explicitly.)
+    """
+    return 'sqlite'
+
+
+def quote_identifier(name) -> str:
+    """ A table or column name quoted for use in SQL, e.g. for names that are keywords or contain spaces """
+    return '"%s"' % str(name).replace('"', '""')
+
+
+class QueryEngine:
+    """ A file-backed SQL database holding copies of source tables, for joins that are slow as chains of pandas merges.
+
+    Source tables are copied into the database the first time a query needs them, and every column
+    named '...id' is indexed (SQLite; DuckDB relies on its own zone maps instead). Callers pass their
+    own input DataFrames as named arguments to query(), and these become temporary tables for that query.
+    No database service is needed: the database is a single file next to the table cache.
+
+    Any number of processes can share an SQLite database file. A DuckDB database file can only be opened
+    by one process at a time, so a process that finds it in use by another one uses its own in-memory
+    DuckDB database instead (and copies the tables it needs into that).
+
+    Attributes:
+        dbpath (str): path of the database file
+        backend (str): 'duckdb' or 'sqlite'
+
+    Args:
+        dbpath (str): path of the database file (created if it doesn't exist)
+        reader (callable): called as reader(tblName), and returns that source table as a pandas.DataFrame
+        backend (str): 'duckdb' or 'sqlite'. Defaults to 'sqlite' (see default_backend()).
+
+    """
+    def __init__(self, dbpath, reader, backend=None):
+        if backend is None:
+            backend = default_backend()
+        if backend not in BACKENDS:
+            raise ValueError(f"unexpected query engine backend <{backend}>")
+        if (backend == 'duckdb') and (not _HAS_DUCKDB):
+            raise ImportError("the 'duckdb' query engine backend requires duckdb")
+        self.backend = backend
+        self.dbpath = dbpath
+        self._reader = reader
+
+        os.makedirs(os.path.dirname(os.path.abspath(dbpath)), exist_ok=True)
+        # One connection, shared by the threads of this process; queries are serialized by the lock.
+        self._lock = threading.RLock()
+        if backend == 'duckdb':
+            try:
+                self._con = duckdb.connect(dbpath)
+            except duckdb.IOException as e:
+                logger.warning('<query engine database %s is in use by another process (%s); '
+                               'using an in-memory database instead>' % (dbpath, e))
+                self._con = duckdb.connect(':memory:')
+        else:
+            self._con = sqlite3.connect(dbpath, check_same_thread=False, timeout=600)
+        self._execute(f"CREATE TABLE IF NOT EXISTS {LOADED_TABLES_NAME} (tblname VARCHAR PRIMARY KEY)")
+        self._commit()
+
+    def __repr__(self):
+        return f"QueryEngine(<{self.dbpath}>, backend={self.backend})"
+
+    def _execute(self, sql, params=()):
+        return self._con.execute(sql, params)
+
+    def _commit(self):
+        if self.backend == 'sqlite':
+            self._con.commit()
+
+    def loaded_tables(self) -> list:
+        with self._lock:
+            return sorted(r[0] for r in self._execute(f"SELECT tblname FROM {LOADED_TABLES_NAME}").fetchall())
+
+    def ensure_tables(self, *tblNames):
+        """ Copy source tables into the database (with indexes on their id columns), if they aren't there already
+
+        The tables are copied in a transaction that holds the database's write lock, so that when several processes
+        share the database, only one of them copies a table (and the others wait for it, then find it there).
+        """
+        with self._lock:
+            if set(tblNames) <= set(self.loaded_tables()):
+                return
+            self._execute('BEGIN IMMEDIATE' if self.backend == 'sqlite' else 'BEGIN TRANSACTION')
+            try:
+                # (checked again, since another process may have copied them while this one waited for the lock)
+                loaded = set(self.loaded_tables())
+                for tblName in tblNames:
+                    if tblName in loaded:
+                        continue
+                    logger.info('<%s table is not in the query engine database yet. Copying...>' % tblName)
+                    df = self._reader(tblName)
+                    self._execute(f"DROP TABLE IF EXISTS {quote_identifier(tblName)}")
+                    self._create_table(tblName, df, temporary=False)
+                    if self.backend == 'sqlite':
+                        for col in df.columns:
+                            if col.endswith('id'):
+                                self._execute(f"CREATE INDEX IF NOT EXISTS "
+                                              f"{quote_identifier('ix_%s_%s' % (tblName, col))}"
+                                              f" ON {quote_identifier(tblName)} ({quote_identifier(col)})")
+                    self._execute(f"INSERT OR IGNORE INTO {LOADED_TABLES_NAME} VALUES (?)", (tblName,))
+                    loaded.add(tblName)
+                self._execute('COMMIT')
+            except BaseException:
+                self._execute('ROLLBACK')
+                raise
+
+    def _create_table(self, name, df, temporary):
+        table = quote_identifier(name)
+        if self.backend == 'duckdb':
+            self._con.register('_bayota_frame', df)
+            self._execute(f"CREATE {'TEMP ' if temporary else ''}TABLE {table} AS SELECT * FROM _bayota_frame")
+            self._con.unregister('_bayota_frame')
+        else:
+            columns = ', '.join(quote_identifier(col) for col in df.columns)
+            self._execute(f"CREATE {'TEMP ' if temporary else ''}TABLE {table} ({columns})")
+            # Converting to object gives Python scalars (which sqlite3 can bind) instead of numpy ones.
+            rows = df.astype(object).where(df.notnull(), None).values.tolist()
+            self._con.executemany(f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(df.columns))})", rows)
+
+    def query(self, sql, tables=(), **frames) -> pd.DataFrame:
+        """ Run a query against source tables and (temporary tables made from) input DataFrames
+
+        Args:
+            sql (str): the query
+            tables (list of str): names of the source tables the query uses
+            **frames: input DataFrames, each available to the query as a table with the argument's name
+
+        Returns:
+            pd.DataFrame with the query results
+        """
+        with self._lock:
+            self.ensure_tables(*tables)
+            try:
+                for name, df in frames.items():
+                    self._create_table(name, df, temporary=True)
+                if self.backend == 'duckdb':
+                    return self._execute(sql).df()
+                return pd.read_sql_query(sql, self._con)
+            finally:
+                for name in frames:
+                    self._execute(f"DROP TABLE IF EXISTS {quote_identifier(name)}")
+                self._commit()
+
+    def close(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,76 @@
+""" Encode the commonly-merged name columns of the source tables as categoricals with one shared dictionary each
+"""
+
+# Generic/Built-in
+import logging
+
+# Computation
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Each encoded column takes its dictionary (the set of categories) from the column of the same name in a master table.
+MASTER_TABLES = {'bmpshortname': 'TblBmp',
+                 'loadsourceshortname': 'TblLoadSource',
+                 'landriversegment': 'TblLandRiverSegment',
+                 'agencycode': 'TblAgency',
+                 'geographyfullname': 'TblGeography'}
+
+
+class SharedCategories:
+    """ One global dictionary (a pandas CategoricalDtype) per entity type, e.g. bmp short names or lrseg names.
+
+    Every table encoded with the same SharedCategories object has identical dtypes for these columns,
+    so merges and comparisons between tables operate on integer codes instead of Python strings.
+
+    Note:
+        groupby() on a categorical column includes unobserved categories unless called with observed=True,
+        which is why encoding is opt-in.
+
+    Attributes:
+        dtypes (dict): {column name: pd.CategoricalDtype}
+
+    """
+    def __init__(self, dtypes=None):
+        self.dtypes = {} if dtypes is None else dict(dtypes)
+
+    def __repr__(self):
+        return f"SharedCategories({ {k: len(v.categories) for k, v in self.dtypes.items()} })"
+
+    @classmethod
+    def from_master_tables(cls, reader):
+        """ Build the dictionaries from the master tables
+
+        Args:
+            reader (callable): called as reader(tblName), and returns that table as a pandas.DataFrame
+        """
+        categories = cls()
+        for column, tblName in MASTER_TABLES.items():
+            categories.add_column(column, reader(tblName)[column])
+        return categories
+
+    def add_column(self, column, values):
+        """ Set the dictionary for a column name to the (sorted) unique, non-null values """
+        self.dtypes[column] = pd.CategoricalDtype(categories=sorted(pd.Series(values).dropna().unique()))
+
+    def encode(self, df, tblName=''):
+        """ Convert the entity columns of a table to their shared categoricals
+
+        A column with values that aren't in its dictionary is left as it is (with a warning), since
+        encoding it would turn those values into missing values.
+
+        Returns:
+            pandas.DataFrame
+        """
+        for column in df.columns:
+            dtype = self.dtypes.get(column)
+            if (dtype is None) or (df[column].dtype == dtype):
+                continue
+            values = df[column]
+            unknown = ~values.isin(dtype.categories) & values.notna()
+            if unknown.any():
+                logger.warning('<%s.%s has %d value(s) that are not in its dictionary (e.g. %r); not encoding it>'
+                               % (tblName, column, unknown.sum(), values[unknown].iloc[0]))
+                continue
+            df[column] = values.astype(dtype)
+        return df
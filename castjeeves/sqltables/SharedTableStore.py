@@ -0,0 +1,166 @@
+""" Share one read-only copy of the source tables among all the processes on a node
+"""
+
+# Generic/Built-in
+import os
+import glob
+import time
+import shutil
+import logging
+import tempfile
+
+try:
+    import pyarrow.feather as feather
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+READY_MARKER = '_READY'
+LOCK_NAME = '_LOCK'
+
+
+def default_shm_dir() -> str:
+    """ Node-local shared memory (tmpfs) if available, otherwise the system temporary directory """
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _pid_is_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # the process exists, but belongs to someone else
+    return True
+
+
+class SharedTableStore:
+    """ A node-local, read-only table store in shared memory that many processes can attach to.
+
+    One process populates the store by writing each table as an uncompressed Arrow IPC file into a
+    tmpfs directory (e.g. /dev/shm). Other processes memory-map those files, so the pages holding
+    numeric columns are shared by every process on the node instead of being copied into each one.
+    (String columns are still converted to Python objects in each process.)
+
+    Attributes:
+        storedir (str): the directory that holds the shared tables
+
+    Args:
+        name (str): name of the store; processes that use the same name share the same tables
+        shmdir (str): parent directory for the store. Defaults to /dev/shm (if it exists).
+
+    """
+    def __init__(self, name, shmdir=None):
+        if not _HAS_PYARROW:
+            raise ImportError("a SharedTableStore requires pyarrow")
+        if shmdir is None:
+            shmdir = default_shm_dir()
+        self.storedir = os.path.join(shmdir, name)
+
+    def __repr__(self):
+        return f"SharedTableStore(<{self.storedir}>, populated={self.is_populated()})"
+
+    def is_populated(self) -> bool:
+        return os.path.exists(os.path.join(self.storedir, READY_MARKER))
+
+    def table_path(self, tblName) -> str:
+        return os.path.join(self.storedir, tblName + '.arrow')
+
+    def populate(self, reader, tblNames, timeout=600, poll_interval=0.5):
+        """ Write the tables into shared memory, unless another process has already done (or is doing) so
+
+        Args:
+            reader (callable): called as reader(tblName), and returns that table as a pandas.DataFrame
+            tblNames (list of str): names of the tables to share
+            timeout (float): seconds to wait for another process that is populating the store
+            poll_interval (float): seconds between checks on another process that is populating the store
+
+        """
+        os.makedirs(self.storedir, exist_ok=True)
+        lockpath = os.path.join(self.storedir, LOCK_NAME)
+        starttime = time.time()
+        while not self.is_populated():
+            try:
+                fd = os.open(lockpath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._break_lock_if_stale(lockpath)
+                if (time.time() - starttime) > timeout:
+                    raise TimeoutError(f"timed out waiting for <{self.storedir}> to be populated")
+                time.sleep(poll_interval)
+                continue
+
+            # This process holds the lock, and so it populates the store.
+            try:
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                logger.info('<populating shared table store at %s>' % self.storedir)
+                for tblName in tblNames:
+                    # Written under a temporary name, so attaching processes never see a partial file.
+                    tmppath = self.table_path(tblName) + '.tmp'
+                    feather.write_feather(reader(tblName).reset_index(drop=True), tmppath,
+                                          compression='uncompressed')
+                    os.replace(tmppath, self.table_path(tblName))
+                open(os.path.join(self.storedir, READY_MARKER), 'w').close()
+            finally:
+                os.remove(lockpath)
+
+    @staticmethod
+    def _lock_holder(lockpath) -> int:
+        """ The process id written in a lock file (or 0, if there is no lock or it has no process id yet) """
+        try:
+            with open(lockpath, 'r') as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @classmethod
+    def _break_lock_if_stale(cls, lockpath):
+        """ Remove the lock if the process that held it is gone (e.g. it was killed while populating) """
+        pid = cls._lock_holder(lockpath)
+        if pid and not _pid_is_alive(pid):
+            logger.warning('<removing stale shared table store lock held by process %d>' % pid)
+            try:
+                os.remove(lockpath)
+            except FileNotFoundError:
+                pass
+
+    def read_table(self, tblName):
+        """ Attach to a table in the store (read-only, memory-mapped)
+
+        Returns:
+            pandas.DataFrame whose numeric columns are (where possible) views onto the shared memory
+        """
+        if not self.is_populated():
+            raise KeyError(f"shared table store <{self.storedir}> has not been populated")
+        table = feather.read_table(self.table_path(tblName), memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    def clear(self):
+        """ Remove the store, e.g. after the source data has been updated """
+        shutil.rmtree(self.storedir, ignore_errors=True)
+
+    def clear_superseded(self, pattern) -> list:
+        """ Remove the other stores (next to this one) whose names match a glob pattern, e.g. the stores of
+        earlier versions of the same tables, except any that a live process is still populating
+
+        Processes that are still attached to a removed store can keep reading it, since its memory is only
+        freed once they have unmapped its files.
+
+        Returns:
+            list of str: the directories that were removed
+        """
+        removed = []
+        for storedir in glob.glob(os.path.join(os.path.dirname(self.storedir), pattern)):
+            if (os.path.abspath(storedir) == os.path.abspath(self.storedir)) or (not os.path.isdir(storedir)):
+                continue
+            pid = self._lock_holder(os.path.join(storedir, LOCK_NAME))
+            if pid and _pid_is_alive(pid):
+                continue
+            logger.info('<removing superseded shared table store at %s>' % storedir)
+            shutil.rmtree(storedir, ignore_errors=True)
+            removed.append(storedir)
+        return removed
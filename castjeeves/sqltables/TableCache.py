@@ -0,0 +1,247 @@
+""" Keep each source table in its own columnar file, so that a run only opens the tables it needs
+"""
+
+# Generic/Built-in
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # e.g. on Windows, where only threads (not processes) share a cache safely
+    fcntl = None
+
+# Computation
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 -- only needed for the feather (Arrow IPC) format
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'manifest.json.lock'
+FILE_EXTENSIONS = {'feather': '.feather', 'pickle': '.pkl'}
+
+
+def write_frame(df, filepath, fmt):
+    """ Write a DataFrame to disk in the given format ('feather' or 'pickle') """
+    if fmt == 'feather':
+        df.reset_index(drop=True).to_feather(filepath)
+    elif fmt == 'pickle':
+        df.to_pickle(filepath)
+    else:
+        raise ValueError(f"unexpected table cache format <{fmt}>")
+
+
+def read_frame(filepath, fmt, columns=None):
+    """ Read a DataFrame from disk that was written in the given format ('feather' or 'pickle') """
+    if fmt == 'feather':
+        return pd.read_feather(filepath, columns=columns)
+    elif fmt == 'pickle':
+        df = pd.read_pickle(filepath)
+        return df if columns is None else df.loc[:, columns]
+    else:
+        raise ValueError(f"unexpected table cache format <{fmt}>")
+
+
+def file_fingerprint(filepath, with_hash=True) -> dict:
+    """ The size, modification time and (optionally) sha256 hash of a file, used to tell whether it has changed """
+    st = os.stat(filepath)
+    fingerprint = {'size': int(st.st_size), 'mtime_ns': int(st.st_mtime_ns)}
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        fingerprint['sha256'] = sha.hexdigest()
+    return fingerprint
+
+
+class TableCache:
+    """ A directory of per-table columnar files, described by a json manifest.
+
+    Tables are stored in the Arrow IPC (feather) format when pyarrow is installed, and as
+    individual pandas pickles otherwise. A table whose columns can't be represented in Arrow
+    (e.g. mixed-type object columns) falls back to a pickle; the manifest records which format
+    each table was written with.
+
+    The manifest can also record the fingerprint (size, mtime and sha256) of the file each table
+    was generated from, so that a table is only regenerated when its source file has changed.
+
+    Attributes:
+        cachedir (str): directory holding the table files and the manifest
+        fmt (str): format used for newly written tables, 'feather' or 'pickle'
+        manifest (dict): {tblName: {'file', 'format', 'rows', 'dtypes', ['source']}}
+
+    """
+    def __init__(self, cachedir, fmt=None):
+        self.cachedir = cachedir
+        os.makedirs(self.cachedir, exist_ok=True)
+
+        if fmt is None:
+            fmt = 'feather' if _HAS_PYARROW else 'pickle'
+        if fmt not in FILE_EXTENSIONS:
+            raise ValueError(f"unexpected table cache format <{fmt}>")
+        if (fmt == 'feather') and (not _HAS_PYARROW):
+            raise ImportError("the 'feather' table cache format requires pyarrow")
+        self.fmt = fmt
+
+        self.manifest = self._read_manifest()
+        # Guards the manifest, since tables may be written from several threads at once.
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"TableCache(<{self.cachedir}>, {len(self.manifest)} tables)"
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cachedir, MANIFEST_NAME)
+
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        # Written to a temporary file first, so that concurrent readers never see a partial manifest.
+        tmppath = self.manifest_path + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        with self._lock:
+            with open(tmppath, 'w') as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(tmppath, self.manifest_path)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """ Hold the manifest against other threads, and (where fcntl is available) other processes """
+        with self._lock:
+            with open(os.path.join(self.cachedir, LOCK_NAME), 'a') as lockfile:
+                if fcntl is not None:
+                    fcntl.flock(lockfile, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def _update_manifest(self, entries):
+        """ Record manifest entries, merged into the manifest on disk
+
+        Other processes may be writing tables to the same cache, so only this call's changes are applied
+        to the manifest as it is on disk, rather than overwriting it with this process's copy.
+        """
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            manifest.update(entries)
+            self.manifest = manifest
+            self._write_manifest()
+
+    def tables(self) -> list:
+        return sorted(self.manifest.keys())
+
+    def has_table(self, tblName) -> bool:
+        entry = self.manifest.get(tblName)
+        if entry is None:
+            return False
+        return os.path.exists(os.path.join(self.cachedir, entry['file']))
+
+    def is_current(self, tblName, sourcepath) -> bool:
+        """ Whether a cached table was generated from the current contents of its source file
+
+        The file's size and mtime are checked first; the file is only hashed if its mtime has changed
+        while its size hasn't (e.g. after being copied or touched). A table is considered current if its
+        source file no longer exists, since there is nothing newer to regenerate it from.
+        """
+        if not self.has_table(tblName):
+            return False
+        if not os.path.exists(sourcepath):
+            return True
+        recorded = self.manifest[tblName].get('source')
+        if recorded is None:
+            return False  # cached before source fingerprints were recorded
+
+        current = file_fingerprint(sourcepath, with_hash=False)
+        if current['size'] != recorded['size']:
+            return False
+        if current['mtime_ns'] == recorded['mtime_ns']:
+            return True
+        if file_fingerprint(sourcepath)['sha256'] != recorded.get('sha256'):
+            return False
+
+        # Same contents with a new mtime; record it, so the file isn't hashed again next time.
+        entry = dict(self.manifest[tblName], source=dict(recorded, mtime_ns=current['mtime_ns']))
+        self._update_manifest({tblName: entry})
+        return True
+
+    def fingerprint(self, tblNames=None) -> str:
+        """ A short hash that changes whenever any of the (cached) tables is regenerated """
+        sha = hashlib.sha256()
+        for tblName in (self.tables() if tblNames is None else sorted(tblNames)):
+            entry = self.manifest.get(tblName, {})
+            sha.update(json.dumps([tblName, entry.get('source'), entry.get('rows')], sort_keys=True).encode())
+        return sha.hexdigest()[:12]
+
+    def read_table(self, tblName, columns=None) -> pd.DataFrame:
+        """ Read a single table (optionally only some of its columns) from the cache """
+        if not self.has_table(tblName):
+            raise KeyError(f"table <{tblName}> is not in the cache at <{self.cachedir}>")
+        entry = self.manifest[tblName]
+        return read_frame(os.path.join(self.cachedir, entry['file']), entry['format'], columns=columns)
+
+    def write_table(self, tblName, df, **info):
+        """ Write a single table to the cache and record it in the manifest
+
+        Args:
+            tblName (str): name of the table
+            df (pd.DataFrame): the table
+            **info: any additional (json-serializable) entries to record in the manifest for this table
+
+        """
+        fmt = self.fmt
+        # Written to a temporary file first, so that a concurrent reader never opens a partially written table.
+        tmppath = os.path.join(self.cachedir, tblName + '.%d.%d.tmp' % (os.getpid(), threading.get_ident()))
+        try:
+            try:
+                write_frame(df, tmppath, fmt)
+            except (TypeError, ValueError) as e:  # pyarrow's ArrowInvalid and ArrowTypeError derive from these
+                if fmt == 'pickle':
+                    raise
+                logger.info('<%s could not be written as %s (%s); falling back to pickle>' % (tblName, fmt, e))
+                fmt = 'pickle'
+                write_frame(df, tmppath, fmt)
+            filepath = os.path.join(self.cachedir, tblName + FILE_EXTENSIONS[fmt])
+            os.replace(tmppath, filepath)
+        finally:
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+
+        entry = {'file': os.path.basename(filepath),
+                 'format': fmt,
+                 'rows': int(len(df)),
+                 'dtypes': {str(k): str(v) for k, v in df.dtypes.items()}}
+        entry.update(info)
+        self._update_manifest({tblName: entry})
+
+        # Remove a stale file left over from an earlier write in the other format.
+        for otherfmt, ext in FILE_EXTENSIONS.items():
+            otherpath = os.path.join(self.cachedir, tblName + ext)
+            if (otherfmt != fmt) and os.path.exists(otherpath):
+                os.remove(otherpath)
+
+    def remove_tables(self, tblNames):
+        """ Remove tables (their files and their manifest entries) from the cache """
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            for tblName in tblNames:
+                entry = manifest.pop(tblName, None)
+                if (entry is not None) and os.path.exists(os.path.join(self.cachedir, entry['file'])):
+                    os.remove(os.path.join(self.cachedir, entry['file']))
+            self.manifest = manifest
+            self._write_manifest()
@@ -0,0 +1,161 @@
+""" Keep a persistent catalog of the csv tables in a data drop (row counts, columns, dtypes, null counts, min/max)
+"""
+
+# Generic/Built-in
+import io
+import os
+import csv
+import json
+import logging
+import threading
+
+# Computation
+import pandas as pd
+
+from castjeeves.sqltables.TableCache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAME = 'catalog.json'
+BLOCK_SIZE = 1 << 22
+# Dtypes that can be passed to pandas.read_csv in place of type inference.
+CSV_DTYPES = ('int64', 'float64', 'bool', 'object')
+
+
+def scan_csv(filepath) -> dict:
+    """ The header and number of data rows of a csv file, from a scan of its raw bytes
+
+    Rows are counted as newline bytes, so a quoted field that contains a newline is counted as an extra row.
+    """
+    with open(filepath, 'rb') as f:
+        header = next(csv.reader(io.TextIOWrapper(io.BytesIO(f.readline()), encoding='utf-8-sig')), [])
+        f.seek(0)
+        newlines = 0
+        lastbyte = b'\n'
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            newlines += block.count(b'\n')
+            lastbyte = block[-1:]
+    if lastbyte != b'\n':
+        newlines += 1  # the last line has no newline
+    return {'columns': header, 'rows': max(newlines - 1, 0)}
+
+
+def profile_frame(df) -> dict:
+    """ The dtype, null count and (for numeric columns) min and max of each column of a DataFrame """
+    profile = {}
+    nulls = df.isnull().sum()
+    for column in df.columns:
+        series = df[column]
+        entry = {'dtype': str(series.dtype), 'nulls': int(nulls[column])}
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series) \
+                and (entry['nulls'] < len(series)):
+            entry['min'] = series.min().item()
+            entry['max'] = series.max().item()
+        profile[str(column)] = entry
+    return profile
+
+
+class TableCatalog:
+    """ A json catalog describing each csv table in a directory, reused until the csv file changes.
+
+    The quick scan of a table (its byte size, column names and row count) only reads the raw bytes of the
+    csv file. A profile (dtypes, null counts and min/max) is taken from the columnar TableCache copy of the
+    table when that is current, and only parses the csv when it isn't. Each entry records the size and mtime
+    of the csv it describes, so it is only recomputed after the csv file changes.
+
+    Jeeves uses the recorded dtypes (see csv_dtypes()) when it ingests a csv, instead of inferring them.
+
+    Attributes:
+        catalogpath (str): path of the catalog json file
+        entries (dict): {tblName: {'source', 'bytes', 'rows', 'columns', ['profile']}}
+
+    """
+    def __init__(self, catalogpath):
+        self.catalogpath = catalogpath
+        self.entries = self._read()
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"TableCatalog(<{self.catalogpath}>, {len(self.entries)} tables)"
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.catalogpath):
+            return {}
+        with open(self.catalogpath, 'r') as f:
+            return json.load(f)
+
+    def save(self):
+        # Written to a temporary file first, so that concurrent readers never see a partial catalog.
+        os.makedirs(os.path.dirname(os.path.abspath(self.catalogpath)), exist_ok=True)
+        tmppath = self.catalogpath + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        with self._lock:
+            with open(tmppath, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmppath, self.catalogpath)
+
+    def tables(self) -> list:
+        return sorted(self.entries.keys())
+
+    def is_current(self, tblName, csvpath, profiled=False) -> bool:
+        """ Whether the catalog entry for a table (and its profile, if profiled=True) describes the current csv file """
+        entry = self.entries.get(tblName)
+        if (entry is None) or (profiled and ('profile' not in entry)):
+            return False
+        current = file_fingerprint(csvpath, with_hash=False)
+        return (current['size'] == entry['source']['size']) and (current['mtime_ns'] == entry['source']['mtime_ns'])
+
+    def describe(self, tblName, csvpath, profile=False, cache=None, reader=None) -> dict:
+        """ The catalog entry for a table, (re)computing it if the csv file has changed
+
+        Args:
+            tblName (str): name of the table
+            csvpath (str): path of its csv file
+            profile (bool): if True, the entry also includes the dtype, null count and min/max of each column
+            cache (TableCache): if specified, a current cached copy of the table is profiled instead of the csv
+            reader (callable): called as reader(tblName) to parse the csv, if it needs to be profiled
+                (defaults to pandas.read_csv with lower-cased column names, like Jeeves.loadDataframe)
+
+        Returns:
+            dict
+        """
+        if self.is_current(tblName, csvpath, profiled=profile):
+            return self.entries[tblName]
+
+        entry = {'source': file_fingerprint(csvpath, with_hash=False)}
+        entry['bytes'] = entry['source']['size']
+        entry.update(scan_csv(csvpath))
+        if profile:
+            if (cache is not None) and cache.is_current(tblName, csvpath):
+                df = cache.read_table(tblName)
+            elif reader is not None:
+                df = reader(tblName)
+            else:
+                df = pd.read_csv(csvpath, encoding="utf-8")
+                df = df.rename(columns={column: column.lower() for column in df.columns})
+            entry['profile'] = profile_frame(df)
+            entry['rows'] = int(len(df))
+
+        with self._lock:
+            self.entries[tblName] = entry
+        return entry
+
+    def describe_directory(self, csvdir, profile=False, cache=None) -> dict:
+        """ Describe every csv table in a directory (see describe()), and save the catalog """
+        tblNames = sorted(os.path.splitext(f)[0] for f in os.listdir(csvdir) if f.endswith('.csv'))
+        described = {tblName: self.describe(tblName, os.path.join(csvdir, tblName + '.csv'),
+                                            profile=profile, cache=cache)
+                     for tblName in tblNames}
+        self.save()
+        return described
+
+    def csv_dtypes(self, tblName, csvpath) -> dict:
+        """ The profiled dtype of each csv column (by its name in the csv header), to pass to pandas.read_csv
+
+        Returns an empty dict if the table hasn't been profiled since its csv file last changed.
+        """
+        if not self.is_current(tblName, csvpath, profiled=True):
+            return {}
+        entry = self.entries[tblName]
+        profile = entry['profile']
+        return {column: profile[column.lower()]['dtype'] for column in entry['columns']
+                if profile.get(column.lower(), {}).get('dtype') in CSV_DTYPES}
@@ -0,0 +1,194 @@
+""" Stream tables out of a SQL database into partitioned columnar files, one chunk at a time
+"""
+
+# Generic/Built-in
+import os
+import csv
+import json
+import logging
+
+# Computation
+import pandas as pd
+
+from castjeeves.sqltables.TableCache import TableCache
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_NAME = '_extract.json'
+PART_FORMAT = 'part-%05d'
+
+
+def clean_source_columns(df, tblName) -> pd.DataFrame:
+    """ The same clean-up that Jeeves.loadDataframe applies to a table read from csv """
+    df = df.rename(columns={column: column.lower() for column in df.columns})
+    if tblName == "TblBmpGroup":
+        df["ruleset"] = df["ruleset"].astype(str).str.lower()
+    return df
+
+
+def partition_dtypes(df) -> dict:
+    """ The dtype to store each column of a table's partitions with, taken from its first partition
+
+    Integer (and boolean) columns are stored with pandas' nullable dtypes, so that a later partition with a
+    NULL in the column has the same dtype as the first one, instead of being inferred as float.
+    """
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[str(column)] = 'boolean'
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[str(column)] = 'Int64'
+        else:
+            dtypes[str(column)] = str(dtype)
+    return dtypes
+
+
+class TableExtractor:
+    """ Extract tables from a DB-API connection (e.g. pyodbc, or sqlite3 in tests) without holding them in memory.
+
+    Each table is fetched `chunksize` rows at a time, and every chunk is written straight away as one
+    partition of a per-table TableCache directory (<outdir>/<tblName>/part-00000.feather, ...).
+    A small progress file records the query and chunk size used, the column dtypes, and whether the table
+    is complete, so an interrupted extraction can be resumed: the partitions already on disk are fetched
+    again (the database has to send them in order to reach the rest) but are not converted or rewritten.
+
+    The dtypes of the columns are fixed by the first partition (see partition_dtypes()), so that every
+    partition of a table is written with the same dtypes.
+
+    Note:
+        Resuming needs the query to return rows in the same order each time, which SQL only guarantees
+        with an ORDER BY. So an interrupted extraction is only resumed if `order_by` is given; otherwise
+        the table is extracted again from the start.
+
+    Attributes:
+        cnxn: an open DB-API connection
+        outdir (str): directory with one subdirectory of partitions per table
+        chunksize (int): number of rows fetched and written per partition
+
+    """
+    def __init__(self, cnxn, outdir, chunksize=500000):
+        self.cnxn = cnxn
+        self.outdir = outdir
+        self.chunksize = chunksize
+        os.makedirs(self.outdir, exist_ok=True)
+
+    def __repr__(self):
+        return f"TableExtractor(<{self.outdir}>, chunksize={self.chunksize})"
+
+    def tabledir(self, tblName) -> str:
+        return os.path.join(self.outdir, tblName)
+
+    def _progress_path(self, tblName) -> str:
+        return os.path.join(self.tabledir(tblName), PROGRESS_NAME)
+
+    def _read_progress(self, tblName) -> dict:
+        if not os.path.exists(self._progress_path(tblName)):
+            return {}
+        with open(self._progress_path(tblName), 'r') as f:
+            return json.load(f)
+
+    def _write_progress(self, tblName, progress):
+        # Written to a temporary file first, so that an interruption never leaves a partial progress file.
+        tmppath = self._progress_path(tblName) + '.%d.tmp' % os.getpid()
+        with open(tmppath, 'w') as f:
+            json.dump(progress, f, indent=2, sort_keys=True)
+        os.replace(tmppath, self._progress_path(tblName))
+
+    def is_complete(self, tblName) -> bool:
+        return self._read_progress(tblName).get('complete', False)
+
+    def partitions(self, tblName) -> list:
+        """ Names of the partitions of a table that have been written so far, in order """
+        if not os.path.isdir(self.tabledir(tblName)):
+            return []
+        return TableCache(self.tabledir(tblName)).tables()
+
+    def extract(self, tblName, query=None, order_by=None) -> int:
+        """ Extract one table, resuming from its last written partition if an earlier extraction was interrupted
+
+        Args:
+            tblName (str): name of the table
+            query (str): the query to run. Defaults to "SELECT * FROM dbo.<tblName>".
+            order_by (str): column(s) to order the rows by, so that a resumed extraction sees the same chunks.
+                If None, an interrupted extraction of the table is started over instead of being resumed.
+
+        Returns:
+            int: number of rows in the table
+        """
+        if query is None:
+            query = f"SELECT * FROM dbo.{tblName}"
+        if order_by is not None:
+            query += f" ORDER BY {order_by}"
+
+        progress = self._read_progress(tblName)
+        if progress.get('complete') and (progress.get('query') == query):
+            logger.info('<%s table has already been extracted>' % tblName)
+            return progress['rows']
+
+        cache = TableCache(self.tabledir(tblName))
+        if ((progress.get('query'), progress.get('chunksize')) != (query, self.chunksize)) or (order_by is None):
+            # A different query or chunk size (or rows in no particular order)
+            # means the partitions on disk can't be resumed from.
+            self._clear(tblName, cache)
+            progress = {'query': query, 'chunksize': self.chunksize, 'complete': False}
+            self._write_progress(tblName, progress)
+        nwritten = len(cache.tables())
+        if nwritten:
+            logger.info('<%s: resuming after %d extracted partitions>' % (tblName, nwritten))
+
+        cursor = self.cnxn.cursor()
+        cursor.execute(query)
+        columns = [d[0] for d in cursor.description]
+
+        rows = 0
+        ipart = 0
+        while True:
+            results = cursor.fetchmany(self.chunksize)
+            if not results:
+                break
+            if ipart < nwritten:
+                rows += cache.manifest[PART_FORMAT % ipart]['rows']
+            else:
+                df = clean_source_columns(pd.DataFrame.from_records([tuple(r) for r in results], columns=columns),
+                                          tblName)
+                if 'dtypes' not in progress:
+                    progress['dtypes'] = partition_dtypes(df)
+                    self._write_progress(tblName, progress)
+                df = df.astype(progress['dtypes'])
+                cache.write_table(PART_FORMAT % ipart, df)
+                rows += len(df)
+                logger.debug('<%s: wrote partition %d (%d rows)>' % (tblName, ipart, len(df)))
+            ipart += 1
+
+        if ipart == 0:
+            # Keep an empty partition, so that the table's columns are still known.
+            cache.write_table(PART_FORMAT % 0, clean_source_columns(pd.DataFrame(columns=columns), tblName))
+
+        progress.update({'complete': True, 'rows': rows})
+        self._write_progress(tblName, progress)
+        return rows
+
+    def _clear(self, tblName, cache):
+        cache.remove_tables(cache.tables())
+        if os.path.exists(self._progress_path(tblName)):
+            os.remove(self._progress_path(tblName))
+
+    def iter_partitions(self, tblName):
+        """ Yields each partition of a table as a pandas.DataFrame, in order """
+        cache = TableCache(self.tabledir(tblName))
+        for part in cache.tables():
+            yield cache.read_table(part)
+
+    def read_table(self, tblName) -> pd.DataFrame:
+        """ Read a complete table back from its partitions """
+        if not self.is_complete(tblName):
+            raise KeyError(f"table <{tblName}> has not been completely extracted to <{self.outdir}>")
+        return pd.concat(list(self.iter_partitions(tblName)), ignore_index=True)
+
+    def write_csv(self, tblName, csvpath):
+        """ Write a complete table to a single csv file, one partition at a time """
+        if not self.is_complete(tblName):
+            raise KeyError(f"table <{tblName}> has not been completely extracted to <{self.outdir}>")
+        with open(csvpath, 'w', newline='', encoding='utf-8') as f:
+            for i, df in enumerate(self.iter_partitions(tblName)):
+                df.to_csv(f, sep=',', index=False, header=(i == 0), quoting=csv.QUOTE_MINIMAL)
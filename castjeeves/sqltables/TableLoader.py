@@ -1,10 +1,37 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
 
+def make_read_only(df):
+    """ Flag the arrays holding a DataFrame's columns as read-only (in place), and return the DataFrame
+
+    Column selections, merges, and the like still work without copying, but anything that would write into
+    the table's own arrays (e.g. df.loc[...] = ..., or an in-place replace) raises a ValueError instead.
+    """
+    mgr = getattr(df, '_mgr', None)
+    if mgr is None:
+        mgr = df._data  # (pandas < 1.1)
+    for block in mgr.blocks:
+        if isinstance(block.values, np.ndarray):
+            block.values.flags.writeable = False
+    return df
+
+
 class TableLoader(object):
     def __init__(self, tableSet):
         object.__setattr__(self, "tableSet", set(tableSet))
-                
+        # Tables can be read lazily, on first access, if a table reader is set (see setTableReader()).
+        object.__setattr__(self, "_tableReader", None)
+        object.__setattr__(self, "_maxLoadedTables", None)
+        object.__setattr__(self, "_lazilyLoaded", OrderedDict())
+        object.__setattr__(self, "_readOnly", False)
+        object.__setattr__(self, "_releaseListeners", [])
+        # Guards lazy loading and releasing, so that tables can be accessed from several threads at once.
+        object.__setattr__(self, "_lock", threading.RLock())
+
     def __getattribute__(self, attr):
         if attr == "tableSet":
             raise AttributeError("instance <attr>:tableSet is not directly accessible, use <method>:getTblList instead")
@@ -23,31 +50,48 @@ class TableLoader(object):
             try:
                 item = object.__getattribute__(self, attr)
                 if attr in tableSet:
+                    lazilyLoaded = object.__getattribute__(self, '__dict__').get('_lazilyLoaded')
+                    if lazilyLoaded and (attr in lazilyLoaded):
+                        with object.__getattribute__(self, '_lock'):
+                            if attr in lazilyLoaded:
+                                lazilyLoaded.move_to_end(attr)  # keep track of the least recently used tables
                     return item  # pd.DataFrame.copy(item)
                 else:
                     return item
             except AttributeError:
                 if attr in tableSet:
+                    if object.__getattribute__(self, '__dict__').get('_tableReader') is not None:
+                        return object.__getattribute__(self, '_loadTableOnFirstAccess')(attr)
                     raise AttributeError("use <method>:addTable to add <attr>:{:s}".format(attr))
                 else:
                     raise AttributeError("invalid attribute specification")
-                
+
     def __setattr__(self, attr, value):
         if attr == "tableSet":
             raise AttributeError("<attr>:tableSet cannot be changed")
         tableSet = object.__getattribute__(self, "tableSet")
         if attr in tableSet:
-            if hasattr(self, attr):
+            if attr in object.__getattribute__(self, '__dict__'):
                 raise AttributeError("attribute has already been set and may not be changed")
             else:
+                if object.__getattribute__(self, '__dict__').get('_readOnly') and isinstance(value, pd.DataFrame):
+                    make_read_only(value)
                 object.__setattr__(self, attr, value)
         else:
             raise AttributeError("invalid attribute specification")
-    
+
     def getTblList(self):
         tableSet = object.__getattribute__(self, "tableSet")
         return sorted(list(tableSet))
-        
+
+    def getLoadedTblList(self):
+        """ Get the names of the tables that are currently held in memory """
+        tableSet = object.__getattribute__(self, "tableSet")
+        return sorted([k for k in object.__getattribute__(self, '__dict__').keys() if k in tableSet])
+
+    def isLoaded(self, tblName):
+        return tblName in object.__getattribute__(self, '__dict__')
+
     def addTable(self, tblName, tbl):
         if not isinstance(tbl, pd.DataFrame):
             raise TypeError("<arg>:tbl should be of type pandas.DataFrame")
@@ -55,3 +99,83 @@ class TableLoader(object):
             self.__setattr__(tblName, tbl)
         except AttributeError as err:
             raise err
+
+    def setTableReader(self, reader, maxLoadedTables=None):
+        """ Read tables lazily, the first time each one is accessed
+
+        Args:
+            reader (callable): called as reader(tblName), and returns that table as a pandas.DataFrame
+            maxLoadedTables (int): if specified, the least recently used lazily-loaded tables are released
+                                   from memory once more than this number of them are loaded.
+                                   They are read again (using the reader) if they are accessed later.
+        """
+        if (maxLoadedTables is not None) and (maxLoadedTables < 1):
+            raise ValueError("<arg>:maxLoadedTables should be at least 1")
+        object.__setattr__(self, "_tableReader", reader)
+        object.__setattr__(self, "_maxLoadedTables", maxLoadedTables)
+
+    def setReadOnly(self):
+        """ Make the tables read-only, so they can be used without defensive copies (see make_read_only())
+
+        Tables that are already loaded are flagged now, and tables that are added or read later are flagged
+        as they are loaded.
+        """
+        odict = object.__getattribute__(self, '__dict__')
+        object.__setattr__(self, "_readOnly", True)
+        for tblName in self.getLoadedTblList():
+            make_read_only(odict[tblName])
+
+    def addReleaseListener(self, listener):
+        """ Call listener(tblName) whenever a lazily-loaded table is released from memory
+
+        (e.g. so that anything built from the table can be dropped along with it, and rebuilt from the re-read table)
+        """
+        object.__getattribute__(self, '__dict__')['_releaseListeners'].append(listener)
+
+    def _notifyReleased(self, tblNames):
+        # (called without holding the lock, so that listeners may take their own locks and access tables)
+        for listener in list(object.__getattribute__(self, '__dict__')['_releaseListeners']):
+            for tblName in tblNames:
+                listener(tblName)
+
+    def releaseTable(self, tblName):
+        """ Remove a lazily-loaded table from memory; it will be read again if accessed later """
+        odict = object.__getattribute__(self, '__dict__')
+        if odict.get('_tableReader') is None:
+            raise AttributeError("tables can only be released when a table reader has been set")
+        if tblName not in object.__getattribute__(self, "tableSet"):
+            raise AttributeError("invalid attribute specification")
+        with odict['_lock']:
+            odict.pop(tblName, None)
+            odict['_lazilyLoaded'].pop(tblName, None)
+        object.__getattribute__(self, '_notifyReleased')([tblName])
+
+    def releaseAllTables(self):
+        """ Remove all lazily-loaded tables from memory """
+        for tblName in list(object.__getattribute__(self, '__dict__')['_lazilyLoaded'].keys()):
+            self.releaseTable(tblName)
+
+    def _loadTableOnFirstAccess(self, tblName):
+        odict = object.__getattribute__(self, '__dict__')
+        released = []
+        with odict['_lock']:
+            if tblName in odict:
+                return odict[tblName]  # another thread read it while this one was waiting
+            tbl = odict['_tableReader'](tblName)
+            if not isinstance(tbl, pd.DataFrame):
+                raise TypeError("table reader should return a pandas.DataFrame")
+            if odict['_readOnly']:
+                make_read_only(tbl)
+            object.__setattr__(self, tblName, tbl)
+
+            lazilyLoaded = odict['_lazilyLoaded']
+            lazilyLoaded[tblName] = True
+            maxLoadedTables = odict['_maxLoadedTables']
+            if maxLoadedTables is not None:
+                while len(lazilyLoaded) > maxLoadedTables:
+                    leastrecent = next(iter(lazilyLoaded))
+                    odict.pop(leastrecent, None)
+                    lazilyLoaded.pop(leastrecent)
+                    released.append(leastrecent)
+        object.__getattribute__(self, '_notifyReleased')(released)
+        return tbl
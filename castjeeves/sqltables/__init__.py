@@ -1,5 +1,14 @@
-__all__ = ['SourceData', 'Metadata', 'TableLoader']
+__all__ = ['SourceData', 'Metadata', 'TableLoader', 'TableCache', 'SharedTableStore',
+           'SharedCategories', 'TableExtractor', 'PartitionedTable',
+           'QueryEngine', 'TableCatalog']
 
 from .source_data import SourceData
 from .metadata import Metadata
 from .TableLoader import TableLoader
+from .TableCache import TableCache
+from .SharedTableStore import SharedTableStore
+from .SharedCategories import SharedCategories
+from .TableExtractor import TableExtractor
+from .PartitionedTable import PartitionedTable
+from .QueryEngine import QueryEngine
+from .TableCatalog import TableCatalog
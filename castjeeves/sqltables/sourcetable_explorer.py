@@ -1,36 +1,47 @@
-""" For each table in Source, print out a summary (column headers and number of rows) """
+""" For each table in Source, print out a summary (column headers and number of rows)
+
+The summaries are kept in a catalog (see TableCatalog) next to the cached tables, and are only recomputed
+for csv files that have changed. With '--profile', the catalog also records the dtypes, null counts and
+min/max of each column, which Jeeves then uses when it ingests the csv files.
+
+Usage:
+    python sourcetable_explorer.py <source|metadata> [--profile]
+"""
 import os
 import sys
-import pandas as pd
+import time
+
+from bayota_settings.base import get_source_csvs_dir, get_metadata_csvs_dir, get_source_pickles_dir
 
-from bayota_settings.base import get_source_csvs_dir, get_metadata_csvs_dir
+from castjeeves.sqltables import TableCache, TableCatalog
+from castjeeves.sqltables.TableCatalog import CATALOG_NAME
 
 # Input argument is parsed.
 if len(sys.argv) < 2:
     raise ValueError("Usage requires table type: 'source' or 'metadata'!")
 tabletype = sys.argv[1]
+profile = '--profile' in sys.argv[2:]
 
 if tabletype.lower() == 'source':
     directory = get_source_csvs_dir()
+    cachename = 'SourceData'
 elif tabletype.lower() == 'metadata':
     directory = get_metadata_csvs_dir()
+    cachename = 'MetaData'
 else:
     raise ValueError("Usage requires table type: 'source' or 'metadata'!")
 print(f"** Exploring tables from directory <{directory}> **")
 
+start = time.perf_counter()
+cache = TableCache(os.path.join(get_source_pickles_dir(), cachename))
+catalog = TableCatalog(os.path.join(cache.cachedir, CATALOG_NAME))
+described = catalog.describe_directory(directory, profile=profile, cache=cache)
+
 # Tables are looped through, and <number of rows> and <headers> are printed for each.
-for filename in sorted(os.listdir(directory)):
-    if filename.endswith(".csv"):
-        filepath = os.path.join(directory, filename)
-        filename = os.path.splitext(filename)[0]
-
-        # Count the number of rows in the csv
-        fileObj = open(filepath)
-        row_count = sum(1 for row in fileObj)
-
-        # Get the column headers from the csv
-        headers = pd.read_csv(filepath, nrows=1).columns.values
-        print('%s (%d rows): %s\n' % (filename, row_count, ', '.join(headers)))
-        continue
-    else:
-        continue
+for tblName, entry in described.items():
+    print('%s (%d rows, %d bytes): %s\n' % (tblName, entry['rows'], entry['bytes'], ', '.join(entry['columns'])))
+    for column, stats in entry.get('profile', {}).items():
+        print('    %s: %s' % (column, ', '.join('%s=%s' % (k, v) for k, v in stats.items())))
+
+print(f"** {len(described)} tables described in {time.perf_counter() - start:.1f}s; "
+      f"catalog saved to <{catalog.catalogpath}> **")
@@ -2,6 +2,17 @@ import pytest
 from castjeeves.jeeves import Jeeves
 
 
+class CountingReader:
+    """ A table reader that records the tables it is asked for, and returns table(tblName) for each """
+    def __init__(self, table):
+        self.table = table
+        self.calls = []
+
+    def __call__(self, tblName):
+        self.calls.append(tblName)
+        return self.table(tblName)
+
+
 @pytest.fixture(scope='session')
 def source_resource(request):
     # Load the Source Data and Base Condition tables
@@ -1,6 +1,7 @@
 import pytest
 import pandas as pd
 
+from castjeeves.sqltables import SourceData
 from castjeeves.sourcehooks import Bmp
 
 
@@ -23,3 +24,22 @@ def test_bmpid_query_from_a_list_of_shortnames(resource_a):
     test_values = ['watercontstruc']
     retval = resource_a.ids_from_names(test_values)
     assert 36 in retval
+
+
+def test_land_bmpids_query_does_not_change_the_source_table():
+    sourcedata = SourceData()
+    sourcedata.addTable('TblBmpLoadSourceFromTo', pd.DataFrame({'bmpid': [1, 2], 'fromloadsourceid': [10, 20],
+                                                                'toloadsourceid': [20, 30]}))
+    retval = Bmp(sourcedata=sourcedata).append_land_bmpids(pd.DataFrame({'loadsourceid': [20]}))
+    assert list(retval['bmpid']) == [2]
+    assert list(sourcedata.TblBmpLoadSourceFromTo.columns) == ['bmpid', 'fromloadsourceid', 'toloadsourceid']
+
+
+def test_bmptype_query_from_shortnames_does_not_change_the_argument():
+    sourcedata = SourceData()
+    sourcedata.addTable('TblBmp', pd.DataFrame({'bmpid': [1, 2], 'bmpshortname': ['a', 'b'], 'bmptypeid': [5, 6]}))
+    sourcedata.addTable('TblBmpType', pd.DataFrame({'bmptypeid': [5, 6], 'bmptype': ['x', 'y']}))
+    shortnames = pd.DataFrame({'BmpShortname': ['b']})
+    retval = Bmp(sourcedata=sourcedata).appendBmpType_to_table_with_bmpshortnames(shortnames)
+    assert list(retval['bmptype']) == ['y'] and list(retval['BmpShortname']) == ['b']
+    assert list(shortnames.columns) == ['BmpShortname']
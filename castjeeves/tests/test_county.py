@@ -21,6 +21,19 @@ def test_countyid_query_from_SERIES_of_countystatestrs(resource_a):
     assert {11, 194} == set(retval) and isinstance(retval, pd.Series)
 
 
+def test_countystatestrs_resolve_regardless_of_case_spacing_and_aliases(resource_a):
+    retval = resource_a.resolve_countystatestrs(['anne arundel,  md', 'ADAMS, PA', 'Washington, DC'])
+    assert list(retval['countyid'][:2]) == [194, 11]
+    assert list(retval['countystatestr']) == ['Anne Arundel, MD', 'Adams, PA', 'District of Columbia, DC']
+
+
+def test_all_unknown_countystatestrs_are_reported_in_one_error(resource_a):
+    with pytest.raises(ValueError, match="Nowhere, VA.*Adamz, PA"):
+        resource_a.resolve_countystatestrs(['Adams, PA', 'Nowhere, VA', 'Adamz, PA'])
+    with pytest.raises(ValueError, match="Nowhere, VA"):
+        resource_a.add_lrsegs_to_counties(countystatestrs=['Adams, PA', 'Nowhere, VA'])
+
+
 def test_all_names_query_contains_AnneArundel_as_list(resource_a):
     retval = resource_a.all_names(astype=list)
     assert ('Anne Arundel' in retval) and isinstance(retval, list)
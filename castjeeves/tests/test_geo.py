@@ -67,6 +67,21 @@ def test_lrseg_geographyfullnames_query_from_county_state_str(resource_geo):
     assert ('MD-N24003XU3_4650_0001(CBWS)' in retval) and isinstance(retval, list)
 
 
+def test_resolved_geographies_keep_input_order(resource_geo):
+    assert resource_geo.resolve_geographies(scale='County', areanames=['anne arundel, md', 'Adams,PA']) == [194, 11]
+    assert resource_geo.resolve_geographies(scale='Land River Segment',
+                                            areanames=['n42001pu2_2790_3290', 'MD-N24003XU3_4650_0001(CBWS)'])[0] == 741
+
+
+def test_all_unresolved_geographies_are_reported_in_one_error(resource_geo):
+    with pytest.raises(ValueError, match="Nowhere, VA.*Elsewhere, WV"):
+        resource_geo.resolve_geographies(scale='County', areanames=['Nowhere, VA', 'Adams, PA', 'Elsewhere, WV'])
+    with pytest.raises(ValueError, match="N99999XX0_0000_0000.*N99999XX0_0000_0001"):
+        resource_geo.resolve_geographies(scale='Land River Segment',
+                                         areanames=['N99999XX0_0000_0000', 'N42001PU2_2790_3290',
+                                                    'N99999XX0_0000_0001'])
+
+
 def test_geo_scale_query_contains_COUNTY(resource_geo):
     assert 'County' in resource_geo.all_geotypes().geographytype.tolist()
 
@@ -0,0 +1,244 @@
+import pytest
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from castjeeves.sqltables import SourceData
+from castjeeves.sourcehooks import SourceHook, Lrseg
+from castjeeves.sourcehooks.indexes import TranslationIndex, translation_index_for, translate_array_along, \
+    chained_translation_index_for, GeographyHierarchy, GeographyNameResolver, normalize_geography_names
+
+
+@pytest.fixture(scope='function')
+def sourcedata(request):
+    sourcedata = SourceData()
+    sourcedata.addTable('TblLandRiverSegment', pd.DataFrame({'lrsegid': [1, 2, 3],
+                                                             'landriversegment': ['N1', 'N2', 'N3']}))
+    sourcedata.addTable('TblLandRiverSegmentAgency', pd.DataFrame({'lrsegid': [1, 1, 2, 3],
+                                                                   'agencyid': [10, 20, 10, 30]}))
+    return sourcedata
+
+
+def test_index_is_built_once_per_sourcedata(sourcedata):
+    first = translation_index_for(sourcedata, 'TblLandRiverSegment', fromcol='landriversegment', tocol='lrsegid')
+    second = Lrseg(sourcedata=sourcedata)._translation_index('TblLandRiverSegment',
+                                                            fromcol='landriversegment', tocol='lrsegid')
+    assert first is second
+
+
+def test_indexes_are_not_shared_between_sourcedata_objects(sourcedata):
+    other = SourceData()
+    other.addTable('TblLandRiverSegment', pd.DataFrame({'lrsegid': [7], 'landriversegment': ['N7']}))
+    index = translation_index_for(other, 'TblLandRiverSegment', fromcol='landriversegment', tocol='lrsegid')
+    assert index.mapping == {'N7': 7}
+
+
+def test_hook_translations_use_the_index(sourcedata):
+    lrseg = Lrseg(sourcedata=sourcedata)
+    assert lrseg.ids_from_names(['N3', 'N1']) == [3, 1]
+    assert list(lrseg.ids_from_names(pd.Series(['N2']))) == [2]
+
+
+def test_one_to_many_translations_match_unindexed_translations(sourcedata):
+    hook = SourceHook(sourcedata=sourcedata)
+    tbl = sourcedata.TblLandRiverSegmentAgency
+    for vals in ([1, 2], pd.Series([3, 1])):
+        for kwargs in ({'todict': True}, {'flatten_to_set': True}):
+            indexed = hook._map_using_sourcetbl(vals, tbl='TblLandRiverSegmentAgency',
+                                                tocol='agencyid', fromcol='lrsegid', **kwargs)
+            unindexed = hook._method_dict_for_mapping_type[type(vals)](vals, tbl, tocol='agencyid',
+                                                                       fromcol='lrsegid', **kwargs)
+            assert indexed == unindexed
+
+
+def test_list_translation_with_duplicates_still_raises_error(sourcedata):
+    hook = SourceHook(sourcedata=sourcedata)
+    with pytest.raises(ValueError):
+        hook._map_using_sourcetbl([1], tbl='TblLandRiverSegmentAgency', tocol='agencyid', fromcol='lrsegid')
+
+
+def test_returned_lists_do_not_alter_the_index(sourcedata):
+    index = TranslationIndex(sourcedata.TblLandRiverSegmentAgency, fromcol='lrsegid', tocol='agencyid')
+    index.lists_for([1])[1].append(99)
+    assert index.lists_for([1]) == {1: [10, 20]}
+
+
+def test_numeric_array_translation_keeps_input_order(sourcedata):
+    index = translation_index_for(sourcedata, 'TblLandRiverSegment', fromcol='lrsegid', tocol='landriversegment')
+    retval = index.translate_array(np.array([3, 1, 3, 2]))
+    assert list(retval) == ['N3', 'N1', 'N3', 'N2']
+
+
+def test_string_and_categorical_array_translations_match(sourcedata):
+    index = translation_index_for(sourcedata, 'TblLandRiverSegment', fromcol='landriversegment', tocol='lrsegid')
+    names = pd.Series(['N2', 'N1', 'N2', 'N3'])
+    assert list(index.translate_array(names)) == list(index.translate_array(names.astype('category'))) == [2, 1, 2, 3]
+
+
+def test_array_translation_along_multiple_tables(sourcedata):
+    sourcedata.addTable('TblState', pd.DataFrame({'stateid': [5, 6], 'stateabbreviation': ['MD', 'VA']}))
+    sourcedata.TblLandRiverSegment['stateid'] = [6, 5, 6]
+    indexes = [translation_index_for(sourcedata, 'TblLandRiverSegment', fromcol='landriversegment', tocol='stateid'),
+               translation_index_for(sourcedata, 'TblState', fromcol='stateid', tocol='stateabbreviation')]
+    assert list(translate_array_along(indexes, ['N1', 'N2', 'N3'])) == ['VA', 'MD', 'VA']
+
+
+def test_untranslatable_values_raise_error_or_are_filled(sourcedata):
+    index = translation_index_for(sourcedata, 'TblLandRiverSegment', fromcol='landriversegment', tocol='lrsegid')
+    with pytest.raises(KeyError):
+        index.translate_array(['N1', 'N9'])
+    assert np.isnan(index.translate_array(['N1', 'N9'], fill_value=np.nan)[1])
+
+
+def test_array_translation_with_duplicates_raises_error(sourcedata):
+    index = translation_index_for(sourcedata, 'TblLandRiverSegmentAgency', fromcol='lrsegid', tocol='agencyid')
+    with pytest.raises(ValueError):
+        index.translate_array([1, 2])
+
+
+@pytest.fixture(scope='function')
+def statechain(request, sourcedata):
+    sourcedata.addTable('TblState', pd.DataFrame({'stateid': [5, 6], 'stateabbreviation': ['MD', 'VA']}))
+    sourcedata.TblLandRiverSegment['stateid'] = [6, 5, 6]
+    return dict(tbls=['TblLandRiverSegment', 'TblState'], column_sequence=['lrsegid', 'stateid', 'stateabbreviation'])
+
+
+def test_chained_index_is_built_once_and_maps_end_to_end(sourcedata, statechain):
+    index = chained_translation_index_for(sourcedata, **statechain)
+    assert index is chained_translation_index_for(sourcedata, **statechain)
+    assert index.mapping == {1: 'VA', 2: 'MD', 3: 'VA'}
+
+
+def test_multiple_table_translations_match_step_by_step_translations(sourcedata, statechain):
+    hook = SourceHook(sourcedata=sourcedata)
+    for vals in ([3, 1], pd.Series([2, 3, 1])):
+        stepwise = vals
+        for tbl, fromcol, tocol in [('TblLandRiverSegment', 'lrsegid', 'stateid'),
+                                    ('TblState', 'stateid', 'stateabbreviation')]:
+            stepwise = hook._map_using_sourcetbl(stepwise, tbl=tbl, fromcol=fromcol, tocol=tocol)
+        chained = hook._map_using_multiple_sourcetbls(vals, **statechain)
+        assert (list(chained) if isinstance(vals, pd.Series) else chained) == \
+               (list(stepwise) if isinstance(vals, pd.Series) else stepwise)
+
+    retval = hook._map_using_multiple_sourcetbls(pd.DataFrame({'lrsegid': [1, 2]}), **statechain)
+    assert list(retval.columns) == ['stateabbreviation'] and sorted(retval['stateabbreviation']) == ['MD', 'VA']
+
+
+@pytest.fixture(scope='function')
+def hierarchy(request):
+    TblLandRiverSegment = pd.DataFrame({'lrsegid': [1, 2, 3, 4, 5],
+                                        'landriversegment': ['N1', 'N2', 'N3', 'N4', 'N5'],
+                                        'countyid': [20, 10, 20, 30, 10],
+                                        'stateid': [1, 1, 1, 2, 1],
+                                        'outofcbws': [False, False, True, False, False]})
+    TblGeography = pd.DataFrame({'geographyid': [100, 101, 102, 200],
+                                 'geographytypeid': [8, 8, 8, 3],
+                                 'geographyfullname': ['MD-N1(CBWS)', 'MD-N2(CBWS)', 'MD-N3(Outside)', 'Watershed']})
+    TblGeographyLrSeg = pd.DataFrame({'geographyid': [100, 101, 102, 200, 200],
+                                      'lrsegid': [1, 2, 3, 1, 2]})
+    return GeographyHierarchy(TblLandRiverSegment, TblGeographyLrSeg, TblGeography)
+
+
+def test_hierarchy_children_keep_table_order(hierarchy):
+    assert list(hierarchy.lrsegids_of_county(20)) == [1, 3]
+    assert hierarchy.lrsegids_of_counties([10, 30]) == {10: [2, 5], 30: [4]}
+    assert list(hierarchy.countyids_of_state(1)) == [10, 20]
+
+
+def test_hierarchy_parents(hierarchy):
+    assert list(hierarchy.county_of([5, 1])) == [10, 20]
+    assert list(hierarchy.state_of([4])) == [2]
+    with pytest.raises(KeyError):
+        hierarchy.county_of([99])
+
+
+def test_hierarchy_unknown_county_raises_error(hierarchy):
+    with pytest.raises(KeyError):
+        hierarchy.lrsegids_of_county(99)
+
+
+def test_hierarchy_lrsegs_of_several_counties(hierarchy):
+    positions, which = hierarchy.lrseg_positions_of_counties([30, 99, 20])
+    assert list(hierarchy.lrsegids[positions]) == [4, 1, 3] and list(which) == [0, 2, 2]
+
+
+def test_hierarchy_geographies_of_lrsegs(hierarchy):
+    assert hierarchy.geographyfullnames_of_lrsegs([2, 1], geographytypeid=8) == ['MD-N2(CBWS)', 'MD-N1(CBWS)']
+    assert hierarchy.geographyfullnames_of_lrsegs([1]) == ['MD-N1(CBWS)', 'Watershed']
+    assert hierarchy.geographyfullnames_of_lrsegs([4, 99]) == []
+
+
+def test_lrseg_hook_fast_paths_keep_table_order():
+    sourcedata = SourceData()
+    sourcedata.addTable('TblLandRiverSegment', pd.DataFrame({'lrsegid': [1, 2, 3, 4, 5],
+                                                             'landriversegment': ['N1', 'N2', 'N3', 'N4', 'N5'],
+                                                             'countyid': [20, 10, 20, 30, 10],
+                                                             'stateid': [1, 1, 1, 2, 1],
+                                                             'outofcbws': [False, False, True, False, False]}))
+    sourcedata.addTable('TblGeographyLrSeg', pd.DataFrame({'geographyid': [100], 'lrsegid': [1]}))
+    sourcedata.addTable('TblGeography', pd.DataFrame({'geographyid': [100], 'geographytypeid': [8],
+                                                      'geographyfullname': ['MD-N1(CBWS)']}))
+    lrseg = Lrseg(sourcedata=sourcedata)
+
+    counties = pd.DataFrame({'countyid': [30, 10, 20], 'agencyid': [7, 8, 9]})
+    expected = sourcedata.TblLandRiverSegment.loc[:, ['countyid', 'lrsegid', 'landriversegment']].merge(counties)
+    pd.testing.assert_frame_equal(lrseg.append_lrsegs_to_counties(counties), expected, check_dtype=False)
+
+    assert lrseg.remove_outofcbws_lrsegs(lrseglist=['N5', 'N3', 'N1', 'N9']) == ['N1', 'N5']
+    retval = lrseg.remove_outofcbws_lrsegs(lrsegdf=pd.DataFrame({'landriversegment': ['N5', 'N4', 'N1']}))
+    assert list(retval['landriversegment']) == ['N1', 'N4', 'N5']
+
+
+@pytest.fixture(scope='function')
+def resolver(request):
+    TblCounty = pd.DataFrame({'countyid': [10, 20, 30, 40],
+                              'countyname': ['Adams', 'Prince George\'s', 'District of Columbia', 'Adams'],
+                              'stateabbreviation': ['PA', 'MD', 'DC', 'PA']})
+    TblLandRiverSegment = pd.DataFrame({'lrsegid': [1, 2, 3], 'landriversegment': ['N1', 'N2', 'N3']})
+    return GeographyNameResolver(TblCounty, TblLandRiverSegment)
+
+
+def test_geography_names_are_normalized():
+    assert list(normalize_geography_names([' Adams ,PA', 'ADAMS,   pa', 'Washington, DC'])) == \
+           ['adams, pa', 'adams, pa', 'district of columbia, dc']
+
+
+def test_resolved_counties_keep_input_order(resolver):
+    assert list(resolver.resolve_counties(['prince george\'s,md', 'Washington, DC', 'adams, PA'])) == [20, 30, 10]
+    assert list(resolver.resolved_county_positions(['Washington, DC', 'adams, PA'])) == [2, 0]
+
+
+def test_all_unresolved_names_are_reported_together(resolver):
+    with pytest.raises(ValueError, match="Nowhere, VA.*Elsewhere, WV"):
+        resolver.resolve_counties(['Adams, PA', 'Nowhere, VA', 'Elsewhere, WV'])
+    with pytest.raises(ValueError):
+        resolver.county_positions(['Adams PA'])
+
+
+def test_lrsegs_resolve_from_names_or_geography_names(resolver):
+    assert list(resolver.lrseg_positions(['n2', 'MD-N3(CBWS)', 'N9'])) == [1, 2, -1]
+
+
+def test_index_is_built_once_when_requested_from_several_threads(sourcedata):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        indexes = list(pool.map(lambda _: translation_index_for(sourcedata, 'TblLandRiverSegment',
+                                                                fromcol='lrsegid', tocol='landriversegment'),
+                                range(16)))
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_indexes_are_dropped_when_their_tables_are_released():
+    sourcedata = SourceData()
+    tables = {'TblLandRiverSegment': pd.DataFrame({'lrsegid': [1, 2], 'landriversegment': ['N1', 'N2'],
+                                                   'stateid': [5, 6]}),
+              'TblState': pd.DataFrame({'stateid': [5, 6], 'stateabbreviation': ['MD', 'VA']})}
+    sourcedata.setTableReader(lambda tblName: tables[tblName].copy(), maxLoadedTables=1)
+    single = translation_index_for(sourcedata, 'TblState', fromcol='stateid', tocol='stateabbreviation')
+    chained = chained_translation_index_for(sourcedata, ['TblLandRiverSegment', 'TblState'],
+                                            ['lrsegid', 'stateid', 'stateabbreviation'])
+
+    sourcedata.TblLandRiverSegment  # TblState is released
+    assert translation_index_for(sourcedata, 'TblState', fromcol='stateid', tocol='stateabbreviation') is not single
+    rebuilt = chained_translation_index_for(sourcedata, ['TblLandRiverSegment', 'TblState'],
+                                            ['lrsegid', 'stateid', 'stateabbreviation'])
+    assert rebuilt is not chained and rebuilt.mapping == {1: 'MD', 2: 'VA'}
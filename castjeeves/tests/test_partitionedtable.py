@@ -0,0 +1,69 @@
+import os
+import pytest
+import pandas as pd
+
+from castjeeves.jeeves import Jeeves
+from castjeeves.sqltables import PartitionedTable, SourceData
+
+
+@pytest.fixture(scope='function')
+def lrsegtbl(request):
+    return pd.DataFrame({'lrsegid': [1, 2, 3, 4],
+                         'stateid': [1, 1, 1, 2],
+                         'countyid': [10, 10, 11, 20]})
+
+
+@pytest.fixture(scope='function')
+def efficiencytbl(request):
+    return pd.DataFrame({'bmpid': [5, 5, 6, 6, 7, 7],
+                         'lrsegid': [1, 2, 3, 4, 4, 99],
+                         'efficiency': [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]})
+
+
+@pytest.fixture(scope='function')
+def partitioned(request, tmp_path, efficiencytbl, lrsegtbl):
+    table = PartitionedTable(str(tmp_path / 'TblBmpEfficiency'))
+    table.populate(efficiencytbl, lrsegtbl)
+    return table
+
+
+def test_table_is_split_by_state_and_county(partitioned):
+    assert partitioned.partitions_for() == ['state-1_county-1', 'state1_county10', 'state1_county11', 'state2_county20']
+
+
+def test_only_partitions_for_requested_lrsegs_are_read(partitioned):
+    assert partitioned.partitions_for([2, 3]) == ['state1_county10', 'state1_county11']
+
+
+def test_read_returns_only_requested_lrsegs(partitioned, efficiencytbl):
+    expected = efficiencytbl[efficiencytbl['lrsegid'].isin([2, 4])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(partitioned.read([2, 4]), expected)
+
+
+def test_read_all_matches_original_rows(partitioned, efficiencytbl):
+    retval = partitioned.read().sort_values(['lrsegid', 'bmpid']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(retval, efficiencytbl.sort_values(['lrsegid', 'bmpid']).reset_index(drop=True))
+
+
+def test_read_some_columns(partitioned):
+    assert list(partitioned.read([1], columns=['efficiency']).columns) == ['efficiency']
+
+
+def test_read_with_no_matching_lrsegs_keeps_columns(partitioned):
+    retval = partitioned.read([1000])
+    assert retval.empty and list(retval.columns) == ['bmpid', 'lrsegid', 'efficiency']
+
+
+def test_unpopulated_table_raises_error(tmp_path):
+    with pytest.raises(KeyError):
+        PartitionedTable(str(tmp_path / 'missing')).read([1])
+
+
+def test_lazily_loaded_full_table_is_released_after_partitioning(tmp_path, efficiencytbl, lrsegtbl):
+    sourcedata = SourceData()
+    tables = {'TblBmpEfficiency': efficiencytbl, 'TblLandRiverSegment': lrsegtbl}
+    sourcedata.setTableReader(lambda tblName: tables[tblName])
+
+    partitioned = Jeeves._partitionedTable(sourcedata, 'TblBmpEfficiency', partitionsdir=str(tmp_path))
+    assert partitioned.is_populated() and os.path.dirname(partitioned.partdir) == str(tmp_path)
+    assert not sourcedata.isLoaded('TblBmpEfficiency')
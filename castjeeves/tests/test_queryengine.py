@@ -0,0 +1,118 @@
+import pytest
+import pandas as pd
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from castjeeves.sqltables import QueryEngine, SourceData
+from castjeeves.sourcehooks import Bmp, LoadSource, Translator
+
+
+@pytest.fixture(scope='function')
+def sourcedata(request):
+    tables = {'TblLandRiverSegment': pd.DataFrame({'lrsegid': [1, 2, 3], 'stateid': [1, 1, 2], 'countyid': [10, 10, 20],
+                                                   'landriversegment': ['A', 'B', 'C']}),
+              'TblState': pd.DataFrame({'stateid': [1, 2], 'stateabbreviation': ['DE', 'MD']}),
+              'TblAgency': pd.DataFrame({'agencyid': [1, 2], 'agencycode': ['DOD', 'NONFED']}),
+              'TblSector': pd.DataFrame({'sectorid': [1, 2, 3], 'sector': ['Agriculture', 'Developed', 'Septic']}),
+              'TblLoadSource': pd.DataFrame({'loadsourceid': [1, 2, 3, 4], 'sectorid': [1, 2, 3, 2],
+                                             'loadsourceshortname': ['Pasture', 'Roads', 'Septic', 'Turf']}),
+              'TblBmp': pd.DataFrame({'bmpid': [1, 2, 3], 'bmptypeid': [1, 2, 2],
+                                      'bmpshortname': ['Buffer', 'Manure1', 'Manure2']}),
+              'TblBmpType': pd.DataFrame({'bmptypeid': [1, 2], 'bmptype': ['Efficiency', 'Animal Manure']}),
+              'TblLandRiverSegmentAgencyLoadSource': pd.DataFrame({'lrsegid': [1, 1, 1, 2, 2, 3],
+                                                                   'agencyid': [1, 2, 1, 2, 1, 2],
+                                                                   'loadsourceid': [1, 1, 2, 3, 4, 2],
+                                                                   'unitid': [5, 5, 5, 6, 5, 5]}),
+              'TblAnimalPopulation': pd.DataFrame({'baseconditionid': [1, 1, 1, 2], 'countyid': [10, 10, 20, 10],
+                                                   'loadsourceid': [1, 1, 1, 1], 'animalid': [7, 8, 7, 7],
+                                                   'animalcount': [100., 50., 20., 1.],
+                                                   'animalunits': [10., 5., 2., 1.]}),
+              'TblBmpAnimalGroup': pd.DataFrame({'animalgroupid': [7, 7, 8], 'bmpid': [1, 2, 3]}),
+              'TblLoadSourceGroupLoadSource': pd.DataFrame({'loadsourcegroupid': [100, 101], 'loadsourceid': [1, 1]})}
+    sourcedata = SourceData()
+    for tblName, df in tables.items():
+        sourcedata.addTable(tblName, df)
+    return sourcedata
+
+
+@pytest.fixture(scope='function')
+def engine(request, tmp_path, sourcedata):
+    engine = QueryEngine(str(tmp_path / 'source.sqlite'), reader=partial(getattr, sourcedata), backend='sqlite')
+    yield engine
+    engine.close()
+
+
+def sorted_frame(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_tables_are_copied_in_once_when_first_needed(engine):
+    assert engine.loaded_tables() == []
+    engine.query("SELECT * FROM TblState", tables=['TblState'])
+    engine.query("SELECT * FROM TblState", tables=['TblState'])
+    assert engine.loaded_tables() == ['TblState']
+
+
+def test_engines_sharing_a_database_copy_each_table_once(tmp_path, sourcedata):
+    # (each engine has its own connection, like separate processes sharing the file)
+    calls = []
+
+    def reader(tblName):
+        calls.append(tblName)
+        return getattr(sourcedata, tblName)
+
+    engines = [QueryEngine(str(tmp_path / 'shared.sqlite'), reader=reader, backend='sqlite') for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda e: e.query("SELECT COUNT(*) AS n FROM TblState", tables=['TblState']),
+                                    engines))
+    assert [int(df['n'][0]) for df in results] == [2] * 4
+    assert calls == ['TblState']
+    for engine in engines:
+        engine.close()
+
+
+def test_input_frames_are_joined_and_then_dropped(engine):
+    df = engine.query("SELECT s.stateabbreviation FROM TblState AS s JOIN ids ON ids.stateid = s.stateid",
+                      tables=['TblState'], ids=pd.DataFrame({'stateid': [2]}))
+    assert list(df['stateabbreviation']) == ['MD']
+    with pytest.raises(Exception):
+        engine.query("SELECT * FROM ids")
+
+
+def test_names_that_are_sql_keywords_are_quoted(engine):
+    df = engine.query('SELECT "order" FROM "group"', group=pd.DataFrame({'order': [1, 2], 'from id': [3, 4]}))
+    assert list(df['order']) == [1, 2]
+
+
+def test_translate_slabidtable_matches_pandas(sourcedata, engine):
+    slab = pd.DataFrame({'lrsegid': [1, 2, 3], 'agencyid': [1, 2, 2], 'loadsourceid': [1, 3, 2],
+                         'bmpid': [1, 1, 3], 'Amount': [1.5, 2.5, 3.5], 'bmpunitfullname': ['acres'] * 3})
+    expected = Translator(sourcedata=sourcedata).translate_slabidtable_to_slabnametable(slab)
+
+    translator = Translator(sourcedata=sourcedata)
+    translator.engine = engine
+    pd.testing.assert_frame_equal(sorted_frame(translator.translate_slabidtable_to_slabnametable(slab)),
+                                  sorted_frame(expected), check_dtype=False)
+
+
+def test_append_animal_bmpids_matches_pandas(sourcedata, engine):
+    sca = pd.DataFrame({'countyid': [10, 10, 20], 'agencyid': [2, 1, 2], 'loadsourceid': [1, 1, 1]})
+    baseconditionid = pd.DataFrame({'baseconditionid': [1]})
+    expected = Bmp(sourcedata=sourcedata).append_animal_bmpids(sca, baseconditionid)
+
+    bmp = Bmp(sourcedata=sourcedata)
+    bmp.engine = engine
+    retval = bmp.append_animal_bmpids(sca, baseconditionid)
+    assert list(retval.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(sorted_frame(retval), sorted_frame(expected), check_dtype=False)
+
+
+def test_ag_and_septic_loadsources_only_on_nonfed_parcels(sourcedata, engine):
+    loadsource = LoadSource(sourcedata=sourcedata)
+    loadsource.engine = engine
+    retval = loadsource.sourceLrsegAgencyIDtable_from_lrsegAgencySectorids(
+        lrsegagencyidtable=pd.DataFrame({'lrsegid': [1, 1, 2, 2], 'agencyid': [1, 2, 1, 2]}),
+        sectorids=pd.DataFrame({'sectorid': [1, 2, 3]}))
+
+    assert sorted(zip(retval['lrsegid'], retval['agencyid'], retval['loadsourceid'])) == \
+           [(1, 1, 2), (1, 2, 1), (2, 1, 4), (2, 2, 3)]
@@ -0,0 +1,47 @@
+import pytest
+import pandas as pd
+
+from castjeeves.jeeves import Jeeves
+from castjeeves.sqltables import SharedCategories
+from castjeeves.sqltables.SharedCategories import MASTER_TABLES
+
+
+class MasterTableReader:
+    def __call__(self, tblName):
+        column = [k for k, v in MASTER_TABLES.items() if v == tblName][0]
+        if column == 'landriversegment':
+            return pd.DataFrame({'lrsegid': [1, 2, 3], column: ['N3', 'N1', 'N2']})
+        return pd.DataFrame({column: ['x', 'y']})
+
+
+@pytest.fixture(scope='module')
+def categories(request):
+    return SharedCategories.from_master_tables(MasterTableReader())
+
+
+def test_tables_share_the_same_categorical_dtype(categories):
+    tbl1 = categories.encode(pd.DataFrame({'landriversegment': ['N2', 'N1'], 'acres': [1.0, 2.0]}))
+    tbl2 = categories.encode(pd.DataFrame({'landriversegment': ['N3', 'N2', None]}))
+    assert isinstance(tbl1['landriversegment'].dtype, pd.CategoricalDtype) and \
+           (tbl1['landriversegment'].dtype == tbl2['landriversegment'].dtype)
+
+
+def test_merge_on_encoded_columns_matches_merge_on_strings(categories):
+    left = pd.DataFrame({'landriversegment': ['N2', 'N1', 'N2'], 'acres': [1.0, 2.0, 3.0]})
+    right = pd.DataFrame({'landriversegment': ['N1', 'N2'], 'loading': [10.0, 20.0]})
+    expected = left.merge(right)
+    retval = categories.encode(left.copy()).merge(categories.encode(right.copy()))
+    assert isinstance(retval['landriversegment'].dtype, pd.CategoricalDtype)
+    assert retval.astype({'landriversegment': object}).values.tolist() == expected.values.tolist()
+
+
+def test_column_with_unknown_values_is_not_encoded(categories):
+    df = categories.encode(pd.DataFrame({'landriversegment': ['N1', 'NotAnLrseg']}))
+    assert list(df['landriversegment']) == ['N1', 'NotAnLrseg'] and \
+           not isinstance(df['landriversegment'].dtype, pd.CategoricalDtype)
+
+
+def test_jeeves_encodes_tables_as_they_are_read(categories):
+    reader = MasterTableReader()
+    df = Jeeves._readEncodedTable(reader, categories, 'TblLandRiverSegment')
+    assert list(df['landriversegment'].cat.codes) == [2, 0, 1]
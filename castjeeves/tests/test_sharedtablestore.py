@@ -0,0 +1,72 @@
+import os
+import pytest
+import pandas as pd
+
+pytest.importorskip('pyarrow')
+
+from castjeeves.sqltables import SharedTableStore
+from castjeeves.sqltables.SharedTableStore import LOCK_NAME
+from castjeeves.tests.conftest import CountingReader
+
+
+def sample_table(tblName):
+    return pd.DataFrame({'lrsegid': [1, 2, 3], 'acres': [10.0, 20.0, 30.0], 'name': ['a', 'b', 'c']})
+
+
+@pytest.fixture(scope='function')
+def store(request, tmp_path):
+    return SharedTableStore('teststore', shmdir=str(tmp_path))
+
+
+def test_attached_table_matches_original(store):
+    reader = CountingReader(sample_table)
+    store.populate(reader, ['TblA'])
+    pd.testing.assert_frame_equal(store.read_table('TblA'), reader('TblA'))
+
+
+def test_store_is_only_populated_once(store):
+    reader = CountingReader(sample_table)
+    store.populate(reader, ['TblA', 'TblB'])
+    SharedTableStore('teststore', shmdir=os.path.dirname(store.storedir)).populate(reader, ['TblA', 'TblB'])
+    assert reader.calls == ['TblA', 'TblB']
+
+
+def test_attached_numeric_columns_are_read_only(store):
+    store.populate(CountingReader(sample_table), ['TblA'])
+    df = store.read_table('TblA')
+    assert not df['acres'].to_numpy().flags.writeable
+
+
+def test_reading_before_populating_raises_error(store):
+    with pytest.raises(KeyError):
+        store.read_table('TblA')
+
+
+def test_stale_lock_from_dead_process_is_broken(store):
+    os.makedirs(store.storedir)
+    with open(os.path.join(store.storedir, LOCK_NAME), 'w') as f:
+        f.write('999999999')  # not a live pid
+    store.populate(CountingReader(sample_table), ['TblA'], timeout=5, poll_interval=0.01)
+    assert store.is_populated()
+
+
+def test_cleared_store_is_no_longer_populated(store):
+    store.populate(CountingReader(sample_table), ['TblA'])
+    store.clear()
+    assert not store.is_populated()
+
+
+def test_superseded_stores_are_cleared_unless_being_populated(store, tmp_path):
+    store.populate(CountingReader(sample_table), ['TblA'])
+    old = SharedTableStore('teststore_old', shmdir=str(tmp_path))
+    old.populate(CountingReader(sample_table), ['TblA'])
+    busy = SharedTableStore('teststore_busy', shmdir=str(tmp_path))
+    os.makedirs(busy.storedir)
+    with open(os.path.join(busy.storedir, LOCK_NAME), 'w') as f:
+        f.write(str(os.getpid()))  # a live pid
+    other = SharedTableStore('otherstore', shmdir=str(tmp_path))
+    other.populate(CountingReader(sample_table), ['TblA'])
+
+    assert store.clear_superseded('teststore*') == [old.storedir]
+    assert store.is_populated() and other.is_populated() and os.path.isdir(busy.storedir)
+    assert not os.path.exists(old.storedir)
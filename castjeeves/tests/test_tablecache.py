@@ -0,0 +1,147 @@
+import os
+import pytest
+from functools import partial
+import pandas as pd
+
+from castjeeves.jeeves import Jeeves
+from castjeeves.sqltables import SourceData, TableCache
+
+
+@pytest.fixture(scope='function')
+def csvdir(request, tmp_path):
+    pd.DataFrame({'AgencyId': [1, 2, 3],
+                  'AgencyCode': ['DOD', 'NONFED', 'NPS']}).to_csv(tmp_path / 'TblAgency.csv', index=False)
+    pd.DataFrame({'StateId': [1, 2],
+                  'StateAbbreviation': ['DE', 'MD']}).to_csv(tmp_path / 'TblState.csv', index=False)
+    return str(tmp_path)
+
+
+def test_table_roundtrip_preserves_values_and_dtypes(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    df = pd.DataFrame({'lrsegid': [1, 2, 3], 'acres': [0.5, 1.5, 2.5], 'agencycode': ['a', 'b', None]})
+    cache.write_table('TblTest', df)
+
+    retval = TableCache(str(tmp_path / 'cache')).read_table('TblTest')
+    pd.testing.assert_frame_equal(retval, df)
+
+
+def test_manifest_records_rows_and_dtypes(tmp_path):
+    cache = TableCache(str(tmp_path))
+    cache.write_table('TblTest', pd.DataFrame({'lrsegid': [1, 2, 3]}))
+    assert cache.manifest['TblTest']['rows'] == 3 and \
+           cache.manifest['TblTest']['dtypes'] == {'lrsegid': 'int64'}
+
+
+def test_read_only_some_columns(tmp_path):
+    cache = TableCache(str(tmp_path))
+    cache.write_table('TblTest', pd.DataFrame({'a': [1, 2], 'b': ['x', 'y'], 'c': [0.1, 0.2]}))
+    assert list(cache.read_table('TblTest', columns=['a', 'c']).columns) == ['a', 'c']
+
+
+def test_pickle_format_roundtrip(tmp_path):
+    cache = TableCache(str(tmp_path), fmt='pickle')
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 3]})  # mixed-type column
+    cache.write_table('TblTest', df)
+    pd.testing.assert_frame_equal(cache.read_table('TblTest'), df)
+
+
+def test_caches_sharing_a_directory_keep_each_others_tables(tmp_path):
+    first, second = TableCache(str(tmp_path)), TableCache(str(tmp_path))
+    first.write_table('TblA', pd.DataFrame({'a': [1, 2]}))
+    second.write_table('TblB', pd.DataFrame({'b': [3]}))
+
+    assert TableCache(str(tmp_path)).tables() == ['TblA', 'TblB']
+    assert [f for f in os.listdir(tmp_path) if f.endswith('.tmp')] == []
+
+
+def test_removed_tables_are_not_restored_by_later_writes(tmp_path):
+    first, second = TableCache(str(tmp_path)), TableCache(str(tmp_path))
+    first.write_table('TblA', pd.DataFrame({'a': [1, 2]}))
+    second.write_table('TblB', pd.DataFrame({'b': [3]}))
+    first.remove_tables(['TblA'])
+    second.write_table('TblC', pd.DataFrame({'c': [4]}))
+
+    assert TableCache(str(tmp_path)).tables() == ['TblB', 'TblC']
+
+
+def test_reading_uncached_table_raises_error(tmp_path):
+    with pytest.raises(KeyError):
+        TableCache(str(tmp_path)).read_table('TblMissing')
+
+
+def test_jeeves_loads_only_requested_tables_and_fills_cache(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    sourcedata = SourceData()
+    Jeeves._loadTables(sourcedata, partial(Jeeves._readTable, cache, csvdir), tables=['TblAgency'])
+
+    assert list(sourcedata.TblAgency['agencycode']) == ['DOD', 'NONFED', 'NPS']
+    assert cache.tables() == ['TblAgency']
+    with pytest.raises(AttributeError):
+        sourcedata.TblState
+
+
+def test_jeeves_reads_cached_table_without_csv(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    Jeeves._loadTables(SourceData(), partial(Jeeves._readTable, cache, csvdir), tables=['TblAgency'])
+    os.remove(os.path.join(csvdir, 'TblAgency.csv'))
+
+    sourcedata = SourceData()
+    Jeeves._loadTables(sourcedata, partial(Jeeves._readTable, TableCache(str(tmp_path / 'cache')), csvdir),
+                       tables=['TblAgency'])
+    assert list(sourcedata.TblAgency['agencyid']) == [1, 2, 3]
+
+
+def test_changed_csv_is_reingested(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    Jeeves._readTable(cache, csvdir, 'TblAgency')
+    pd.DataFrame({'AgencyId': [1, 2, 3, 4],
+                  'AgencyCode': ['DOD', 'NONFED', 'NPS', 'USFS']}).to_csv(os.path.join(csvdir, 'TblAgency.csv'),
+                                                                          index=False)
+
+    df = Jeeves._readTable(TableCache(str(tmp_path / 'cache')), csvdir, 'TblAgency')
+    assert list(df['agencycode']) == ['DOD', 'NONFED', 'NPS', 'USFS']
+
+
+def test_touched_but_unchanged_csv_is_not_reingested(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    Jeeves._readTable(cache, csvdir, 'TblAgency')
+    cachedfile = os.path.join(cache.cachedir, cache.manifest['TblAgency']['file'])
+    cachedfile_mtime = os.stat(cachedfile).st_mtime_ns
+    csvpath = os.path.join(csvdir, 'TblAgency.csv')
+    os.utime(csvpath, ns=(os.stat(csvpath).st_atime_ns, os.stat(csvpath).st_mtime_ns + 10**9))
+
+    cache = TableCache(str(tmp_path / 'cache'))
+    assert cache.is_current('TblAgency', csvpath)
+    assert os.stat(cachedfile).st_mtime_ns == cachedfile_mtime
+    assert TableCache(str(tmp_path / 'cache')).manifest['TblAgency']['source']['mtime_ns'] == \
+           os.stat(csvpath).st_mtime_ns
+
+
+def test_refresh_only_reingests_changed_tables(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    assert Jeeves._refreshCache(cache, csvdir, ['TblAgency', 'TblState']) == ['TblAgency', 'TblState']
+    fingerprint = cache.fingerprint()
+    pd.DataFrame({'StateId': [1, 2, 3],
+                  'StateAbbreviation': ['DE', 'MD', 'VA']}).to_csv(os.path.join(csvdir, 'TblState.csv'), index=False)
+
+    assert Jeeves._refreshCache(cache, csvdir, ['TblAgency', 'TblState']) == ['TblState']
+    assert cache.fingerprint() != fingerprint
+
+
+def test_parallel_load_matches_serial_load_and_reports_timings(csvdir, tmp_path):
+    serial = SourceData()
+    Jeeves._loadTables(serial, partial(Jeeves._readTable, TableCache(str(tmp_path / 'serial')), csvdir),
+                       tables=['TblAgency', 'TblState'], workers=1)
+    parallel = SourceData()
+    timings = Jeeves._loadTables(parallel, partial(Jeeves._readTable, TableCache(str(tmp_path / 'parallel')), csvdir),
+                                 tables=['TblAgency', 'TblState'], workers=2)
+
+    assert sorted(timings.keys()) == ['TblAgency', 'TblState']
+    pd.testing.assert_frame_equal(parallel.TblAgency, serial.TblAgency)
+    pd.testing.assert_frame_equal(parallel.TblState, serial.TblState)
+    assert TableCache(str(tmp_path / 'parallel')).tables() == ['TblAgency', 'TblState']
+
+
+def test_parallel_refresh_returns_tables_in_order(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    assert Jeeves._refreshCache(cache, csvdir, ['TblState', 'TblAgency'], workers=2) == ['TblState', 'TblAgency']
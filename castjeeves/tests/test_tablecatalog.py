@@ -0,0 +1,70 @@
+import os
+import pytest
+import pandas as pd
+
+from castjeeves.jeeves import Jeeves
+from castjeeves.sqltables import TableCache, TableCatalog
+from castjeeves.sqltables.TableCatalog import scan_csv, CATALOG_NAME
+
+
+@pytest.fixture(scope='function')
+def csvdir(request, tmp_path):
+    pd.DataFrame({'LrsegId': [1, 2, 3],
+                  'Acres': [0.5, None, 2.5],
+                  'LandRiverSegment': ['N1', 'N2', 'N3']}).to_csv(tmp_path / 'TblLandRiverSegment.csv', index=False)
+    return str(tmp_path)
+
+
+def test_byte_scan_counts_rows_and_reads_header(csvdir, tmp_path):
+    assert scan_csv(os.path.join(csvdir, 'TblLandRiverSegment.csv')) == \
+           {'columns': ['LrsegId', 'Acres', 'LandRiverSegment'], 'rows': 3}
+
+    (tmp_path / 'nonewline.csv').write_bytes(b'a,b\n1,2\n3,4')
+    assert scan_csv(str(tmp_path / 'nonewline.csv'))['rows'] == 2
+
+
+def test_profile_records_dtypes_nulls_and_ranges(csvdir, tmp_path):
+    catalog = TableCatalog(str(tmp_path / 'cache' / CATALOG_NAME))
+    entry = catalog.describe('TblLandRiverSegment', os.path.join(csvdir, 'TblLandRiverSegment.csv'), profile=True)
+    assert entry['profile']['lrsegid'] == {'dtype': 'int64', 'nulls': 0, 'min': 1, 'max': 3}
+    assert entry['profile']['acres']['nulls'] == 1 and entry['profile']['acres']['max'] == 2.5
+    assert entry['profile']['landriversegment'] == {'dtype': 'object', 'nulls': 0}
+
+
+def test_saved_catalog_is_reused_until_csv_changes(csvdir, tmp_path):
+    catalogpath = str(tmp_path / 'cache' / CATALOG_NAME)
+    csvpath = os.path.join(csvdir, 'TblLandRiverSegment.csv')
+    TableCatalog(catalogpath).describe_directory(csvdir, profile=True)
+
+    catalog = TableCatalog(catalogpath)
+    assert catalog.tables() == ['TblLandRiverSegment'] and catalog.is_current('TblLandRiverSegment', csvpath, True)
+    pd.DataFrame({'LrsegId': [1]}).to_csv(csvpath, index=False)
+    assert not catalog.is_current('TblLandRiverSegment', csvpath)
+    assert catalog.csv_dtypes('TblLandRiverSegment', csvpath) == {}
+
+
+def test_profile_is_taken_from_current_cached_table(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    Jeeves._ingestTable(cache, csvdir, 'TblLandRiverSegment')
+
+    def reader(tblName):
+        raise AssertionError('the csv should not be parsed')
+
+    catalog = TableCatalog(os.path.join(cache.cachedir, CATALOG_NAME))
+    entry = catalog.describe('TblLandRiverSegment', os.path.join(csvdir, 'TblLandRiverSegment.csv'),
+                             profile=True, cache=cache, reader=reader)
+    assert entry['profile']['lrsegid']['dtype'] == 'int64'
+
+
+def test_ingest_uses_catalog_dtypes(csvdir, tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    csvpath = os.path.join(csvdir, 'TblLandRiverSegment.csv')
+    catalog = TableCatalog(os.path.join(cache.cachedir, CATALOG_NAME))
+    catalog.describe('TblLandRiverSegment', csvpath, profile=True)
+    catalog.save()
+    assert catalog.csv_dtypes('TblLandRiverSegment', csvpath) == \
+           {'LrsegId': 'int64', 'Acres': 'float64', 'LandRiverSegment': 'object'}
+
+    df = Jeeves._ingestTable(cache, csvdir, 'TblLandRiverSegment')
+    assert {k: str(v) for k, v in df.dtypes.items()} == \
+           {'lrsegid': 'int64', 'acres': 'float64', 'landriversegment': 'object'}
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import pytest
+import pandas as pd
+
+from castjeeves.sqltables import TableCache, TableExtractor
+
+
+@pytest.fixture(scope='function')
+def scenariobuilder(request):
+    # A local SQLite stand-in for the ScenarioBuilder source database, with its tables in the 'dbo' schema.
+    cnxn = sqlite3.connect(':memory:')
+    cnxn.execute("ATTACH DATABASE ':memory:' AS dbo")
+    cnxn.execute("CREATE TABLE dbo.TblLandRiverSegment (LrsegId INTEGER, LandRiverSegment TEXT, CountyId INTEGER)")
+    cnxn.executemany("INSERT INTO dbo.TblLandRiverSegment VALUES (?, ?, ?)",
+                     [(i, 'N%05dXL0_0000' % i, i % 7) for i in range(1, 26)])
+    cnxn.execute("CREATE TABLE dbo.TblBmpGroup (BmpGroupId INTEGER, RuleSet TEXT)")
+    cnxn.executemany("INSERT INTO dbo.TblBmpGroup VALUES (?, ?)", [(1, 'Tillage'), (2, 'RUNOFF')])
+    cnxn.execute("CREATE TABLE dbo.TblAgency (AgencyId INTEGER, AgencyCode TEXT)")
+    cnxn.commit()
+    yield cnxn
+    cnxn.close()
+
+
+class InterruptingConnection:
+    """ Raises an error part-way through fetching a table, like a dropped database connection """
+    def __init__(self, cnxn, nfetches):
+        self.cnxn = cnxn
+        self.nfetches = nfetches
+
+    def cursor(self):
+        parent = self
+        cursor = self.cnxn.cursor()
+
+        class Cursor:
+            description = property(lambda self: cursor.description)
+
+            def execute(self, query):
+                return cursor.execute(query)
+
+            def fetchmany(self, size):
+                if parent.nfetches == 0:
+                    raise ConnectionError("connection dropped")
+                parent.nfetches -= 1
+                return cursor.fetchmany(size)
+
+        return Cursor()
+
+
+def test_extracted_table_matches_database_and_is_partitioned(scenariobuilder, tmp_path):
+    extractor = TableExtractor(scenariobuilder, str(tmp_path), chunksize=10)
+    assert extractor.extract('TblLandRiverSegment', order_by='LrsegId') == 25
+
+    expected = pd.read_sql("SELECT * FROM dbo.TblLandRiverSegment ORDER BY LrsegId", scenariobuilder)
+    expected.columns = [c.lower() for c in expected.columns]
+    expected = expected.astype({'lrsegid': 'Int64', 'countyid': 'Int64'})  # (integer columns are nullable)
+    assert len(extractor.partitions('TblLandRiverSegment')) == 3
+    pd.testing.assert_frame_equal(extractor.read_table('TblLandRiverSegment'), expected)
+
+
+def test_interrupted_extraction_resumes_without_rewriting_partitions(scenariobuilder, tmp_path):
+    extractor = TableExtractor(InterruptingConnection(scenariobuilder, nfetches=2), str(tmp_path), chunksize=10)
+    with pytest.raises(ConnectionError):
+        extractor.extract('TblLandRiverSegment', order_by='LrsegId')
+    assert not extractor.is_complete('TblLandRiverSegment')
+    assert len(extractor.partitions('TblLandRiverSegment')) == 2
+    cache = TableCache(extractor.tabledir('TblLandRiverSegment'))
+    firstpart = os.path.join(cache.cachedir, cache.manifest['part-00000']['file'])
+    firstpart_mtime = os.stat(firstpart).st_mtime_ns
+
+    extractor = TableExtractor(scenariobuilder, str(tmp_path), chunksize=10)
+    assert extractor.extract('TblLandRiverSegment', order_by='LrsegId') == 25
+    assert list(extractor.read_table('TblLandRiverSegment')['lrsegid']) == list(range(1, 26))
+    assert os.stat(firstpart).st_mtime_ns == firstpart_mtime
+
+
+def test_completed_table_is_not_extracted_again(scenariobuilder, tmp_path):
+    TableExtractor(scenariobuilder, str(tmp_path), chunksize=10).extract('TblLandRiverSegment', order_by='LrsegId')
+    extractor = TableExtractor(InterruptingConnection(scenariobuilder, nfetches=0), str(tmp_path), chunksize=10)
+    assert extractor.extract('TblLandRiverSegment', order_by='LrsegId') == 25
+
+
+def test_interrupted_extraction_with_new_chunksize_starts_over(scenariobuilder, tmp_path):
+    with pytest.raises(ConnectionError):
+        TableExtractor(InterruptingConnection(scenariobuilder, nfetches=1), str(tmp_path),
+                       chunksize=10).extract('TblLandRiverSegment', order_by='LrsegId')
+    extractor = TableExtractor(scenariobuilder, str(tmp_path), chunksize=20)
+    extractor.extract('TblLandRiverSegment', order_by='LrsegId')
+    assert len(extractor.partitions('TblLandRiverSegment')) == 2
+    assert list(extractor.read_table('TblLandRiverSegment')['lrsegid']) == list(range(1, 26))
+
+
+def test_interrupted_extraction_without_order_starts_over(scenariobuilder, tmp_path):
+    with pytest.raises(ConnectionError):
+        TableExtractor(InterruptingConnection(scenariobuilder, nfetches=2), str(tmp_path),
+                       chunksize=10).extract('TblLandRiverSegment')
+    extractor = TableExtractor(InterruptingConnection(scenariobuilder, nfetches=1), str(tmp_path), chunksize=10)
+    with pytest.raises(ConnectionError):
+        extractor.extract('TblLandRiverSegment')
+    assert len(extractor.partitions('TblLandRiverSegment')) == 1
+
+
+def test_partitions_have_the_dtypes_of_the_first_partition(scenariobuilder, tmp_path):
+    scenariobuilder.execute("UPDATE dbo.TblLandRiverSegment SET CountyId = NULL WHERE LrsegId = 15")
+    extractor = TableExtractor(scenariobuilder, str(tmp_path), chunksize=10)
+    extractor.extract('TblLandRiverSegment', order_by='LrsegId')
+    assert [str(df['countyid'].dtype) for df in extractor.iter_partitions('TblLandRiverSegment')] == ['Int64'] * 3
+    assert extractor.read_table('TblLandRiverSegment')['countyid'].isnull().sum() == 1
+
+
+def test_columns_are_cleaned_like_csv_tables(scenariobuilder, tmp_path):
+    extractor = TableExtractor(scenariobuilder, str(tmp_path))
+    extractor.extract('TblBmpGroup')
+    assert list(extractor.read_table('TblBmpGroup')['ruleset']) == ['tillage', 'runoff']
+
+
+def test_empty_table_keeps_its_columns(scenariobuilder, tmp_path):
+    extractor = TableExtractor(scenariobuilder, str(tmp_path))
+    assert extractor.extract('TblAgency') == 0
+    assert list(extractor.read_table('TblAgency').columns) == ['agencyid', 'agencycode']
+
+
+def test_csv_written_from_partitions(scenariobuilder, tmp_path):
+    extractor = TableExtractor(scenariobuilder, str(tmp_path / 'partitions'), chunksize=10)
+    extractor.extract('TblLandRiverSegment', order_by='LrsegId')
+    extractor.write_csv('TblLandRiverSegment', str(tmp_path / 'TblLandRiverSegment.csv'))
+
+    df = pd.read_csv(str(tmp_path / 'TblLandRiverSegment.csv'))
+    assert len(df) == 25 and list(df.columns) == ['lrsegid', 'landriversegment', 'countyid']
@@ -0,0 +1,121 @@
+import time
+import pytest
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from castjeeves.sqltables import TableLoader
+from castjeeves.tests.conftest import CountingReader
+
+
+def named_table(tblName):
+    return pd.DataFrame({'name': [tblName]})
+
+
+@pytest.fixture(scope='function')
+def lazy_loader(request):
+    loader = TableLoader(['TblA', 'TblB', 'TblC'])
+    reader = CountingReader(named_table)
+    loader.setTableReader(reader)
+    return loader, reader
+
+
+def test_table_is_not_read_until_accessed(lazy_loader):
+    loader, reader = lazy_loader
+    assert reader.calls == [] and loader.getLoadedTblList() == []
+
+
+def test_table_is_read_only_once_on_first_access(lazy_loader):
+    loader, reader = lazy_loader
+    first = loader.TblA
+    second = loader.TblA
+    assert (first is second) and (reader.calls == ['TblA']) and loader.isLoaded('TblA')
+
+
+def test_released_table_is_read_again_when_accessed(lazy_loader):
+    loader, reader = lazy_loader
+    loader.TblA
+    loader.releaseTable('TblA')
+    assert not loader.isLoaded('TblA')
+    loader.TblA
+    assert reader.calls == ['TblA', 'TblA']
+
+
+def test_least_recently_used_table_is_released_beyond_the_maximum():
+    loader = TableLoader(['TblA', 'TblB', 'TblC'])
+    loader.setTableReader(CountingReader(named_table), maxLoadedTables=2)
+    loader.TblA
+    loader.TblB
+    loader.TblA  # TblB is now the least recently used
+    loader.TblC
+    assert loader.getLoadedTblList() == ['TblA', 'TblC']
+
+
+def test_table_released_beyond_the_maximum_is_read_again_when_accessed():
+    loader = TableLoader(['TblA', 'TblB', 'TblC'])
+    reader = CountingReader(named_table)
+    loader.setTableReader(reader, maxLoadedTables=2)
+    loader.TblA
+    loader.TblB
+    loader.TblC  # TblA is released
+    assert list(loader.TblA['name']) == ['TblA']
+    assert reader.calls == ['TblA', 'TblB', 'TblC', 'TblA'] and loader.getLoadedTblList() == ['TblA', 'TblC']
+
+
+def test_release_listeners_are_told_of_released_and_evicted_tables():
+    loader = TableLoader(['TblA', 'TblB', 'TblC'])
+    loader.setTableReader(CountingReader(named_table), maxLoadedTables=2)
+    released = []
+    loader.addReleaseListener(released.append)
+    loader.TblA
+    loader.TblB
+    loader.TblC  # TblA is released
+    loader.releaseTable('TblB')
+    assert released == ['TblA', 'TblB']
+
+
+def test_invalid_table_name_still_raises_error_in_lazy_mode(lazy_loader):
+    loader, reader = lazy_loader
+    with pytest.raises(AttributeError):
+        loader.TblNotThere
+
+
+def test_lazily_loaded_table_may_not_be_replaced(lazy_loader):
+    loader, reader = lazy_loader
+    loader.TblA
+    with pytest.raises(AttributeError):
+        loader.addTable('TblA', pd.DataFrame())
+
+
+def test_unloaded_table_raises_error_without_reader():
+    loader = TableLoader(['TblA'])
+    with pytest.raises(AttributeError):
+        loader.TblA
+
+
+def test_read_only_tables_can_be_used_but_not_modified(lazy_loader):
+    loader, reader = lazy_loader
+    loader.addTable('TblC', pd.DataFrame({'id': [1, 2], 'acres': [0.5, 1.5]}))
+    loader.setReadOnly()
+    for tbl in (loader.TblA, loader.TblC):
+        assert tbl.merge(tbl).shape == tbl.shape
+        with pytest.raises(ValueError):
+            tbl.loc[0, tbl.columns[0]] = 'changed'
+    assert list(loader.TblC['acres']) == [0.5, 1.5]
+
+
+def test_read_only_is_not_set_by_default(lazy_loader):
+    loader, reader = lazy_loader
+    assert loader.TblA['name'].to_numpy().flags.writeable
+
+
+def test_concurrent_first_accesses_read_a_table_once(lazy_loader):
+    loader, reader = lazy_loader
+
+    def slowreader(tblName):
+        time.sleep(0.05)
+        return reader(tblName)
+    loader.setTableReader(slowreader)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tables = list(pool.map(lambda t: getattr(loader, t), ['TblA'] * 8))
+    assert reader.calls == ['TblA'] and all(t is tables[0] for t in tables)